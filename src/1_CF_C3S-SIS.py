@@ -7,7 +7,8 @@ Created on Tue 05 Jan 2021 17:34
 @author: Laurens Stoop - l.p.stoop@uu.nl
 """
 
-# to unpack all files after download use: for z in ./origin/*.zip; do unzip "$z" -d ./unpack/; done
+# every year, month and variable is a separate zip: C3S-SIS_original_grid_YYYYMM_<variable>.zip
+# the zips are read as they are into the store (cf_c3s.ingest_archive), no need to unpack them
     
 
 
@@ -17,9 +18,9 @@ Created on Tue 05 Jan 2021 17:34
 # =============================================================================
 
 # Get the dependencies
-import cdsapi
-import datetime as dt
-import os.path
+import xarray as xr
+from cf_download import variables, split_pieces, download_all, cds_transfer
+from cf_c3s import ingest_archive
 
 #%%
 # =============================================================================
@@ -32,6 +33,15 @@ aggregation = 'original_grid'
 # define the storage location
 file_path = '/media/DataGate2/ERA5-EU_C3S-SIS/origin/'
 
+# The store with all capacity factors on the ERA5 CF grid
+store_path = '/media/DataGate2/ERA5-EU_C3S-SIS/C3S-SIS_CF.zarr'
+
+# An ERA5 file that gives the grid of the store
+grid_file = '/media/DataGate2/ERA5/origin/ERA5-EU_195001.nc'
+
+# The encoding of the store, see cf_io.encoding_profiles
+store_encoding = 'packed'
+
 
 # The year definitions
 years = [   
@@ -60,46 +70,22 @@ years = [
 # Download loop
 # =============================================================================
 
-# Make a shortcut for the CDS download client
-c = cdsapi.Client()
+# Number of requests that run at the same time at the CDS
+in_flight = 4
 
-# Run over the years
-for year in years:
+# The months to retrieve
+months = [
+            '01', '02', '03',
+            '04', '05', '06',
+            '07', '08', '09',
+            '10', '11', '12',
+            ]
 
-    # Let's notify our terminal where we are!
-    print(dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')+' NOTIFY: Starting to retrieve '+year)
-    
-      
-    # Retrieve SSRD
-    file=file_path+'C3S-SIS_'+aggregation+'_'+year+'.zip'
-    
-    # Check if file exist to allow for easy redo
-    if os.path.isfile(file) == True:
+# Retrieve every year, month and variable as a separate piece, the pieces that
+# were done before are skipped (see download_state.json in the file path)
+if __name__ == '__main__':
+    download_all(split_pieces(years, months, variables), file_path, aggregation, cds_transfer, in_flight)
 
-        # Tell us the file exist
-        print('NOTIFY: this file was allready done! '+file)
-    
-    # if file doesn't exist, we download it
-    elif os.path.isfile(file) == False:
-
-        c.retrieve(
-                'sis-energy-derived-reanalysis',
-                {
-                    'format': 'zip',
-                    'temporal_aggregation': 'hourly',
-                    'energy_product_type': 'capacity_factor_ratio',
-                    'variable': [
-                        'solar_photovoltaic_power_generation', 
-                        'wind_power_generation_offshore', 
-                        'wind_power_generation_onshore',
-                        ],
-                    'spatial_aggregation': aggregation,
-                    'month': [
-                        '01', '02', '03',
-                        '04', '05', '06',
-                        '07', '08', '09',
-                        '10', '11', '12',
-                    ],
-                    'year': year
-                },
-                file)
+    # Add the new downloads to the store
+    with xr.open_dataset(grid_file) as ds:
+        ingest_archive(file_path, store_path, ds.latitude.values, ds.longitude.values, store_encoding, aggregation)
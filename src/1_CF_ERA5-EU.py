@@ -20,37 +20,30 @@ import xarray as xr
 import numpy as np
 import datetime
 import os.path
+import functools
+from cf_scheduler import expand_jobs, run_jobs, run_threads
+from cf_kernels import solar_potential_jerez2015, solar_potential_bett2016, wind_potential_batch, shear_exponent
+from cf_io import open_era5, clean_units, product_fields, cf_encoding, check_roundtrip
+from cf_landsea import land_sea_cells, dataset_to_cells, grid_coords
+from cf_zarr import create_store, hourly_times, write_region, is_written, store_encoding, check_store
+from cf_manifest import load_manifest, save_manifest, manifest_entry, is_current, atomic_to_netcdf
+from cf_instrument import stage, run_start, print_summary
+from cf_climatology import new_state, update_state, save_state
+from cf_aggregates import check_period, aggregate_periods, statistics
+from cf_power_curves import load_power_curves, curve_potential
 
 
-# Select the years to run
-years = np.array([
-            '1950', '1951', '1952',
-            '1953', '1954', '1955',
-            '1956', '1957', '1958',
-            '1959', '1960', '1961',
-            '1962', '1963', '1964',
-            '1965', '1966', '1967',
-            '1968', '1969', '1970',
-            # '1971', '1972', '1973',
-            # '1974', '1975', '1976',
-            # '1977', '1978',
-            # '1979', '1980', '1981',
-            # '1982', '1983', '1984',
-            # '1985', '1986', '1987',
-            # '1988', '1989', 
-            # '1990',
-            # '1991', '1992', '1993',
-            # '1994', '1995', '1996',
-            # '1997', '1998', '1999',
-            # '2000', '2001', '2002',
-            # '2003', '2004', '2005',
-            # '2006', '2007', '2008',
-            # '2009', '2010', '2011',
-            # '2012', '2013', '2014',
-            # '2015', '2016', '2017',
-            # '2018', '2019', '2020',
-            # '2021'
-        ])
+# Select the years to run (first and last year included)
+first_year = 1950
+last_year = 1970
+
+# Number of year/month jobs that run at the same time, each job needs the
+# memory for one month of data
+workers = 1
+
+# Number of threads per job that compute the capacity factors of a month at
+# the same time, on the same loaded inputs
+product_threads = 3
 
 
 # File locations
@@ -69,247 +62,483 @@ maxCF_on = 0.95
 maxCF_off = 0.95
 
 
+# Memory budget per job in bytes, with a budget the months are processed lazily
+# in chunks and written to disk chunk by chunk, None loads a month in memory
+memory_budget = None
+# memory_budget = 4e9
+
+# Number of threads used to process the chunks
+dask_threads = 4
+
+# Set up the chunked processing
+if memory_budget is not None:
+    import dask
+    dask.config.set(scheduler='threads', num_workers=dask_threads)
+
+
+# The wind turbines to calculate, evaluated in one batch on the 100 meter windspeed
+turbines = [
+        dict(name='offshore', height=150.0, alpha=0.11, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=maxCF_off),
+        dict(name='onshore', height=120.0, alpha=0.143, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=maxCF_on),
+        ]
+
+# Use the shear exponent of each cell from the 10 and 100 meter windspeed of the
+# month instead of the fixed alpha of the turbines
+shear_from_data = False
+
+# Tabulated power curves (see cf_power_curves.load_power_curves), a turbine with
+# curve='<column>' uses that curve instead of the idealised one, None to only use
+# the idealised curves. Any turbine can have a spatial_sigma to smooth its CF over
+# that many grid cells around every cell, e.g.
+# dict(name='onshore', curve='V112', height=120.0, alpha=0.143, loss=0.9, spatial_sigma=1.0)
+power_curve_file = None
+# power_curve_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'power_curves.csv')
+power_curves = load_power_curves(power_curve_file) if power_curve_file is not None else {}
+
+# The lookup table of a tabulated curve has one shear exponent
+for turbine in turbines:
+    if 'curve' in turbine and turbine['curve'] not in power_curves:
+        raise ValueError('The power curve '+turbine['curve']+' of '+turbine['name']+' is not in the power curve file')
+    if 'curve' in turbine and shear_from_data:
+        raise ValueError('The tabulated power curve of '+turbine['name']+' needs a fixed alpha, not the shear from the data')
+
+
+# The global attributes of the output
+global_attrs = dict(
+        author = 'Laurens Stoop UU/KNMI/TenneT',
+        map_area = 'Europe',
+        data_source = 'ERA5 reanalysis data, contains modified Copernicus Climate Change Service information [28-01-2021]'
+        )
+
+
+# The attributes of the capacity factors, these are also all variables stored
+cf_attrs = dict(
+        # # Solar photovoltaics, Jerez method
+        # solarCF = dict(
+        #         units = ' ',
+        #         short_name = 'solarCF',
+        #         long_name = 'Capacity factor for photovoltaics',
+        #         method = 'Adopted by L.P. Stoop, based on Jerez et al., 2015', 
+        #         description = 'Hourly capacity factor of solar panels'),
+        
+        # Solar photovoltaics, Jerez method
+        solarCF = dict(
+                units = ' ',
+                short_name = 'solarCF',
+                long_name = 'Capacity factor for photovoltaics',
+                method = 'Based on Jerez et al., 2015', 
+                description = 'Hourly capacity factor of solar panels'),
+        
+        # Solar photovoltaics, Bett method
+        solarCF_bett = dict(
+                units = ' ',
+                short_name = 'solarCF_bett',
+                long_name = 'Capacity factor for photovoltaics',
+                method = 'Based on Bett & Thornton, 2016', 
+                description = 'Hourly capacity factor of solar panels'),
+        
+        # Wind onshore
+        windCF_on = dict(
+                units = ' ',
+                short_name = 'windCF_on',
+                long_name = 'Capacity factor for wind onshore with hubheigh 100 meter',
+                method = 'Adopted by L.P. Stoop, based on Jerez et al., 2015', 
+                description = 'Hourly capacity factor of onshore wind turbines'),
+        
+        # Wind offshore
+        windCF_off = dict(
+                units = ' ',
+                short_name = 'windCF_off',
+                long_name = 'Capacity factor for wind offshore with hubheigh 150 meter',
+                method = 'Adopted by L.P. Stoop, based on Jerez et al., 2015', 
+                description = 'Hourly capacity factor of offshore wind turbines'),
+        )
+
+
+# The product each capacity factor is made with: 'solar_jerez', 'solar_bett' or
+# 'wind'. Only these capacity factors are computed and only the ERA5 fields their
+# products need are read from the input (see cf_io.products), every capacity
+# factor here needs its attributes in cf_attrs
+cf_products = dict(solarCF='solar_jerez', solarCF_bett='solar_bett', windCF_on='wind', windCF_off='wind')
+
+# Every capacity factor needs a product and attributes
+if set(cf_products) != set(cf_attrs):
+    raise ValueError('The capacity factors of cf_products and cf_attrs differ')
+
+
+# Where the output goes: 'netcdf' for a file per month in out_path or 'zarr'
+# for one store along time that all workers write their months into
+output_mode = 'netcdf'
+store_path = out_path+'ERA5_CF.zarr'
+
+# How the capacity factors are encoded, one of the profiles in cf_io: 'float'
+# for uncompressed float32 as before, 'packed' or 'packed_zstd' for compressed
+# int16 with a resolution of 1e-4 (round trip error at most 5e-5)
+output_encoding = 'float'
+
+# Check every month that the packing keeps the guaranteed precision before it is
+# written, this reads all data once more
+check_packing = False
+
+
+# Compute solar and wind onshore only on land cells and wind offshore only on
+# sea cells of the land-sea mask, the CFs are then stored per cell with the flat
+# grid index as coordinate and the grid in grid_latitude and grid_longitude
+# (cf_landsea.to_grid puts them back on the grid)
+sparse_cells = False
+lsm_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'ERA5-EU_constant.nc')
+lsm_variable = 'lsm'
+
+# Number of grid cells along the coast that are computed as both land and sea
+coastal_buffer = 1
+
+# The cells each capacity factor is computed on in the sparse mode
+cf_surface = dict(solarCF='land', solarCF_bett='land', windCF_on='land', windCF_off='sea')
+
+# The turbine of each wind capacity factor
+cf_turbine = dict(windCF_off='offshore', windCF_on='onshore')
+
+# The store has no cell layout
+if sparse_cells and output_mode == 'zarr':
+    raise ValueError('The sparse cells can only be stored as netcdf')
+
+# The sparse cells have no neighbours to smooth over
+if sparse_cells and any(turbine.get('spatial_sigma', 0) > 0 for turbine in turbines):
+    raise ValueError('The spatial smoothing of the turbines needs the grid, not the sparse cells')
+
+
+# Folder for the climatology state of every month (cf_climatology), the states
+# are merged afterwards with climatology_from_states, None to skip them
+climatology_path = None
+# climatology_path = out_path+'climatology/'
+
+# The states need the month in memory
+if climatology_path is not None and memory_budget is not None:
+    raise ValueError('The climatology states are only made without a memory budget')
+
+
+# The periods (pandas frequencies) of the aggregates written next to the hourly
+# output, a file per period and month with the mean, min, max and full load
+# hours (flh) of every capacity factor, empty to skip them
+aggregate_freqs = dict()
+# aggregate_freqs = dict(three_hourly='3h', daily='1D', monthly='1MS')
+aggregate_statistics = statistics
+
+# The periods have to fit in a month and the aggregates need the month in memory
+for freq in aggregate_freqs.values():
+    check_period(freq)
+if aggregate_freqs and memory_budget is not None:
+    raise ValueError('The aggregates are only made without a memory budget')
+
+
+# The parameters of the run, months computed with other parameters are redone
+run_params = dict(
+        maxCF_on = maxCF_on,
+        maxCF_off = maxCF_off,
+        turbines = turbines,
+        power_curves = {turbine['curve']: [power.tolist() for power in power_curves[turbine['curve']]]
+                        for turbine in turbines if 'curve' in turbine},
+        products = cf_products,
+        output_mode = output_mode,
+        output_encoding = output_encoding,
+        sparse_cells = sparse_cells,
+        coastal_buffer = coastal_buffer,
+        shear_from_data = shear_from_data,
+        climatology = climatology_path is not None,
+        aggregates = dict(freqs=aggregate_freqs, statistics=aggregate_statistics),
+        )
+
+
+# The manifest of the finished months
+manifest_path = out_path+'manifest.json'
+manifest = load_manifest(manifest_path)
+
+# Also store the sha256 of the inputs and outputs in the manifest, so touched
+# files are recognised by their content. This reads every file once more, by
+# default files are known by size and modification time
+manifest_checksums = False
+
+# The log with the timing and memory of every stage of every month, one JSON
+# record per line
+timing_log = out_path+'timing.jsonl'
+
+
 print('NOTIFY: Basic setup done, defining functions')
 #%%
 # =============================================================================
 # Function definitions
 # =============================================================================
 
-# Function to determine the solar capacity factor as from Jerez 2015
+# The capacity factor functions are defined in cf_kernels.py
+
+
+
+#%%
+# =============================================================================
+# Job definitions
+# =============================================================================
+
+# Function giving the file name of the input of a month
+def input_file(year, month):
+
+    return file_path+'ERA5-EU_'+year+month+'.nc'
+
+
+# Function giving the file name of the output of a month
+def output_file(year, month):
+
+    return out_path+'ERA5_CF_'+year+month+'.nc'
+
+
+# Function giving the file of the climatology state of a capacity factor
+def climatology_file(name, year, month):
+
+    return climatology_path+'ERA5_CF_clim_'+name+'_'+year+month+'.npz'
+
 
-def solar_potential_jerez2015(ds):
+# Function giving the file name of the aggregates of a month, next to the hourly
+# output also when that goes into the store
+def aggregate_file(period, year, month):
 
-    # The constant definitions
-    # Cell temperature constants in [degree C, unitless, degree C * m**2 /W, degree C *s/m
-    c = np.array([4.3, 0.943, 0.028, -1.528])
-    tref = 25  # Reference temperature in degree C
-    gamma = -0.005  # Prefactor to performance rate per degree
-    istd = 1000  # Standard solar panel performance benchmark in W/m**2
+    return out_path+'ERA5_CF_'+period+'_'+year+month+'.nc'
 
-    # Zeorth step: Make a dataset
-    ds_temp = xr.Dataset()
 
-    # First step: calculate cell temperature
-    ds_temp['Tcell'] = c[0] + c[1]*ds.t2m + c[2]*ds.ssrd + c[3]*ds.wspd
+# Function giving the files written for a month, the months in the store are
+# tracked by their region in the manifest
+def output_files(year, month):
 
-    # The second step: Performance ratio of the solar cells
-    ds_temp['solarPR'] = 1 + gamma*(ds_temp.Tcell - tref)
+    files = [output_file(year, month)] if output_mode == 'netcdf' else []
+    if climatology_path is not None:
+        files += [climatology_file(name, year, month) for name in cf_attrs]
+    files += [aggregate_file(period, year, month) for period in aggregate_freqs]
 
-    # The solar energy capcaity factor
-    ds_temp['solarCF'] = ds_temp.solarPR*ds.ssrd/istd
+    return files
 
-    # Force zero as minimal value
-    ds_temp['solarCF'] = ds_temp.solarCF.where(ds_temp.solarCF >= 0, 0)
 
-    return ds_temp.solarCF
+# Function to check if the month is done with the current inputs and parameters,
+# and for the store that its region is still in there
+def is_done(year, month):
 
+    entry = manifest.get(year+month)
+    done = is_current(entry, [input_file(year, month)], run_params, output_files(year, month))
+    if done and output_mode == 'zarr':
+        done = is_written(store_path, entry.get('region'))
 
-# Function to determine the solar capacity factor as from bett & thornton 2016
-def solar_potential_bett2016(ds):
+    return done
 
-    # The constant definitions
-    ALPHA = 4.20 * 10**(-3)  # K**-1
-    BETA = -4.60 * 10**(-3)  # K**-1
-    C1 = 0.033  # [no unit]
-    C2 = -0.092  # [no unit]
-    GSTC = 1000  # W m**-2
-    TSTC = 25  # degree C
-    T0 = 20  # degree C
-    G0 = 800  # W m**-2
-    TNOCT = 48  # degree C
 
-    # Zeorth step: Make a dataset
-    ds_temp = xr.Dataset()
+# Function to store a finished month in the manifest
+def record(year, month, entry):
 
-    # first step is to combined calculation of module temperature and taking the difference between that and the STC conditions
-    ds_temp['DTmod'] = ds.t2m + (TNOCT - T0)*ds.ssrd/G0 - TSTC
+    manifest[year+month] = entry
+    save_manifest(manifest, manifest_path)
 
-    # In the second step the Reletive efficiency is calculated basedon an empirical law, where the derive irradience in taken into account
-    ds_temp['Nrel'] = (1 + ALPHA * ds_temp.DTmod) * (1 + C1*np.log(ds.ssrd /
-                                                                   GSTC) + C2*np.log(ds.ssrd/GSTC)**2 + BETA*ds_temp.DTmod)
 
-    # In the final step the capacity factor is calculated based on the reletive efficiency and the STC irradience conditions
-    ds_temp['solarCF'] = ds_temp.Nrel * ds.ssrd / GSTC
+# Function giving the products whose fields are read for capacity factors, the
+# shear of the wind from the data needs the 10 meter wind as well
+def read_products(names):
 
-    # the use of the logarithm gives rise to NaN values which should be zero, therefore all nan values are set to zero
-    ds_temp = ds_temp.fillna(0)
+    products = set(cf_products[name] for name in names)
+    if shear_from_data and 'wind' in products:
+        products.add('wind_shear')
 
-    # Force zero as minimal value
-    ds_temp['solarCF'] = ds_temp.solarCF.where(ds_temp.solarCF >= 0, 0)
+    return sorted(products)
 
-    return ds_temp.solarCF
 
+# Function doing all the work for one month
+def process_month(year, month):
 
-# Function to determine the windpotential (this is adjusted based on expert judgement)
-def wind_potential(wspd, height, alpha, cut_in_wspd, cut_out_start, cut_out_end, rated_wspd, maxCF):
+    # Define the file name
+    file_save = output_file(year, month)
+
+    # Files to load
+    data_file = input_file(year, month)
+    
+    # Every stage is timed and logged with the year and month
+    timed = functools.partial(stage, timing_log, year=year, month=month)
+    
+    # =============================================================================
+    # Loading in the files
+    # =============================================================================
+     
+    # Combine the data for easiness, in chunks when a memory budget is set, and
+    # only the fields that are needed for the products
+    with timed('load'):
+        ds = open_era5(data_file, memory_budget, dask_threads, read_products(cf_products))
+        if memory_budget is None:
+            ds = ds.load()
+    
+    # =============================================================================
+    # Cleaning the units
+    # =============================================================================
+     
+    # Derive the windspeeds and convert the temperature and radiation
+    with timed('units'):
+        ds = clean_units(ds, read_products(cf_products))
+
+    # =============================================================================
+    # Doing the calculations for capacity factors
+    # =============================================================================
+    
+    # The cells each capacity factor is computed on, in the sparse mode only the
+    # land or sea cells are kept with the fields of the products on them
+    with timed('cells'):
+        if sparse_cells:
+            surfaces = {name: cf_surface[name] for name in cf_products}
+            cells = land_sea_cells(lsm_file, ds.latitude.values, ds.longitude.values, lsm_variable,
+                                   coastal_buffer=coastal_buffer)
+            data = {}
+            for surface in sorted(set(surfaces.values())):
+                _, fields = product_fields(read_products([name for name in surfaces if surfaces[name] == surface]))
+                data[surface] = dataset_to_cells(ds[fields], cells[surface], 'cell_'+surface)
+        else:
+            surfaces = {name: 'grid' for name in cf_products}
+            data = dict(grid = ds)
+    
+    # Function to do the wind capacity factor calculation, all turbines on the
+    # same cells at once: the idealised curves in one batch and the tabulated
+    # curves with one lookup table
+    def wind_products(surface, names):
+        surface_turbines = [turbine for turbine in turbines if turbine['name'] in [cf_turbine[name] for name in names]]
+        if shear_from_data:
+            alpha = shear_exponent(data[surface].wspd, data[surface].wspd100m)
+            surface_turbines = [dict(turbine, alpha=alpha) for turbine in surface_turbines]
+        idealised = [turbine for turbine in surface_turbines if 'curve' not in turbine]
+        tabulated = [dict(turbine, speeds=power_curves[turbine['curve']][0], power=power_curves[turbine['curve']][1])
+                     for turbine in surface_turbines if 'curve' in turbine]
+        windCF = []
+        if len(idealised) > 0:
+            windCF.append(wind_potential_batch(data[surface].wspd100m, idealised))
+        if len(tabulated) > 0:
+            windCF.append(curve_potential(data[surface].wspd100m, tabulated))
+        return xr.concat(windCF, dim='turbine')
+    
+    # The solar methods of the products
+    solar_methods = dict(solar_jerez=solar_potential_jerez2015, solar_bett=solar_potential_bett2016)
+    
+    # The products of the capacity factors that are asked for, a solar product
+    # per method and a wind product per surface with all its turbines. The
+    # products only read the inputs, so they can run at the same time
+    tasks, task_of = {}, {}
+    for name, product in cf_products.items():
+        if product in solar_methods:
+            task_of[name] = product
+            tasks[product] = functools.partial(solar_methods[product], data[surfaces[name]])
+        elif product == 'wind':
+            task_of[name] = 'wind_'+surfaces[name]
+            names = [other for other in cf_products if cf_products[other] == 'wind' and surfaces[other] == surfaces[name]]
+            tasks[task_of[name]] = functools.partial(wind_products, surfaces[name], names)
+        else:
+            raise ValueError('Unknown product '+product+' of '+name)
+    
+    # Function to time a product in its thread, as part of the products stage
+    def timed_product(task):
+        with timed(task, parent='products'):
+            return tasks[task]()
+    
+    # Run them on the threads, the numpy kernels release the GIL
+    with timed('products'):
+        results = run_threads({task: functools.partial(timed_product, task) for task in tasks}, product_threads)
+    
+    # Store the results
+    for name in cf_products:
+        if cf_products[name] == 'wind':
+            ds[name] = results[task_of[name]].sel(turbine=cf_turbine[name], drop=True)
+        else:
+            ds[name] = results[task_of[name]]
+    
+    #diff in cf
+    # ds['solar_diff'] = ds.solarCF_jerez - ds.solarCF_bett
+ 
+    
+    # =============================================================================
+    # Setting the attributes    
+    # =============================================================================
     
-    # First we create a new dataset
-    ds_temp = xr.Dataset()
+    # Set the global atributes
+    ds.attrs.update(global_attrs, created = datetime.datetime.today().strftime('%d-%m-%Y'))
     
-    # Rescaling the windspeed to the requested height
-    wspd_height = wspd * (height / 100)**alpha
+    # Set the attributes of the capacity factors
+    for name in cf_attrs:
+        ds[name].attrs.update(cf_attrs[name])
     
-    # We fill it with the windpotential without considering the information of the wind turbine
-    ds_temp['windCF'] = maxCF* ((wspd_height**3 - cut_in_wspd**3) / (rated_wspd**3 - cut_in_wspd**3))
+    # =============================================================================
+    # Saving the data
+    # =============================================================================
     
-    # Now we reduce the wind potential to 1 above the rated windspeed
-    ds_temp['windCF'] = ds_temp.windCF.where(wspd_height <= rated_wspd, maxCF)
+    # Removing unneeded variables, data on cells keeps the grid it came from
+    grid = grid_coords(ds.latitude.values, ds.longitude.values)
+    ds = ds[list(cf_attrs)]
+    if sparse_cells:
+        ds = ds.assign_coords(grid)
     
-    # Now we set the wind potential to 0 below the cut-in windspeed
-    ds_temp['windCF'] = ds_temp.windCF.where(wspd_height >= cut_in_wspd, 0)
+    # Make sure the packing keeps the guaranteed precision, only checked for data
+    # in memory to not compute the chunked data twice
+    if check_packing and memory_budget is None:
+        with timed('check'):
+            encoding = store_encoding(store_path, cf_attrs) if output_mode == 'zarr' else cf_encoding(ds, cf_attrs, output_encoding)
+            check_roundtrip(ds, cf_attrs, output_encoding, encoding)
     
-    # Now we set the wind potential to 0 above the cut-out windspeed
-    # ds_temp['windCF'] = ds_temp.windCF.where(wspd_height <= cut_out_start, maxCF*((cut_out_end)**3 - wspd_height**3) / ((cut_out_end)**3 -(cut_out_start)**3))
-    ds_temp['windCF'] = ds_temp.windCF.where(wspd_height <= cut_out_start, maxCF*((cut_out_end-wspd_height)/(cut_out_end-cut_out_start)))
-    ds_temp['windCF'] = ds_temp.windCF.where(wspd_height <= cut_out_end, 0)
+    # The climatology state of the month, while the month is in memory
+    if climatology_path is not None:
+        with timed('climatology'):
+            for name in cf_attrs:
+                state = update_state(new_state(ds[name].isel(time=0).shape), ds[name])
+                save_state(state, climatology_file(name, year, month))
     
-    return ds_temp.windCF
+    # The aggregates of every period, while the month is in memory. The mean, min
+    # and max are encoded as the hourly data, the full load hours as floats
+    with timed('aggregates'):
+        for period, freq in aggregate_freqs.items():
+            aggregates = aggregate_periods(ds, cf_attrs, freq, aggregate_statistics)
+            hours = [name for name in aggregates if name.endswith('_flh')]
+            encoding = cf_encoding(aggregates, [name for name in aggregates if name not in hours], output_encoding)
+            encoding.update(cf_encoding(aggregates, hours, 'float'))
+            encoding.update(time = {'units':'days since 1900-01-01'})
+            atomic_to_netcdf(aggregates, aggregate_file(period, year, month), encoding=encoding)
+    
+    # Saving the file, via a temporary file so a killed job leaves no broken output
+    with timed('write'):
+        if output_mode == 'netcdf':
+            encoding = cf_encoding(ds, cf_attrs, output_encoding)
+            encoding.update(time = {'units':'days since 1900-01-01'})
+            atomic_to_netcdf(ds, file_save, encoding=encoding)
+        
+        # Or write the month in its region of the store
+        elif output_mode == 'zarr':
+            region = write_region(store_path, ds)
+    
+    # Closing files
+    ds.close()
+
+    # The description of the finished month for the manifest
+    entry = manifest_entry([data_file], run_params, output_files(year, month), manifest.get(year+month), manifest_checksums)
+    if output_mode == 'zarr':
+        entry['region'] = region
 
+    return entry
 
 
-print('NOTIFY: Starting the mega loop')
 #%%
 # =============================================================================
 # Starting the mega loop
 # =============================================================================
 
-# The mega loop
-for year in years:
-    for month in ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12']:
-        # Define the file name
-        file_save = out_path+'ERA5_CF_'+year+month+'.nc'
-        
-        
-        # Check if file allready exist, then get out
-        if os.path.isfile(file_save) == True:
-            
-            # Tell us the file exist
-            print('NOTIFY: Allready applied for year '+year+month+'!')
-          
-            
-        # IF the file doesn't exist, apply the distribution
-        elif os.path.isfile(file_save) == False:
-            
-            # Tell us the file exist
-            print('NOTIFY: Now starting work on '+year+month+'!')    
-        
-                    
-            # Files to load
-            data_file = file_path+'ERA5-EU_'+year+month+'.nc'
-            
-            print('Working on '+str(year)+': Started to load the files')
-            #%%
-            # =============================================================================
-            # Loading in the files
-            # =============================================================================
-             
-            # Combine the data for easiness
-            ds = xr.open_dataset(data_file)
-            
-            print('                 Cleaning the units')
-            #%%
-            # =============================================================================
-            # Loading in the files
-            # =============================================================================
-             
-            # Combine the u&v component for easiness
-            ds['wspd'] = xr.ufuncs.sqrt(ds.u10**2 + ds.v10**2)
-            ds['wspd100m'] = xr.ufuncs.sqrt(ds.u100**2 + ds.v100**2)
-            ds.wspd.attrs.update(long_name = '10 meter wind speed', units = 'm s**-1')
-            ds.wspd100m.attrs.update(long_name = '100 meter wind speed', units = 'm s**-1')
-            
-            # Conversion to celsius
-            ds['t2m'] = ds.t2m - 273.4
-            ds['t2m'].attrs.update(units = 'degree C')
-                
-            # Setting windspeed in hPa
-            ds['mpsl'] = ds.msl/1e2
-            ds.mpsl.attrs.update(units = 'hPa')
-              
-            # Getting ssrd fixed in units
-            ds['ssrd'] = ds.ssrd/3600.
-            ds['ssrd'].attrs.update(units = 'W m**-2')
-    
-            print('                 Loading done, doing the calculations for the CFs')
-            #%%
-            # =============================================================================
-            # Doing the calculations for capacity factors
-            # =============================================================================
-            
-            # Solar capacity factor calculation Jerez method
-            ds['solarCF'] = solar_potential_jerez2015(ds)
-            
-            # Solar capacity factor calculation Bett method
-            # ds['solarCF'] = solar_potential_bett2016(ds)
-            
-            #diff in cf
-            # ds['solar_diff'] = ds.solarCF_jerez - ds.solarCF_bett
-            
-            # Wind capacity factor calculation for offshore
-            ds['windCF_off'] = wind_potential(ds.wspd100m, height=150.0, alpha=0.11, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=maxCF_off)
-            
-            # Wind capacity factor calculation for onshore
-            ds['windCF_on'] = wind_potential(ds.wspd100m, height=120.0, alpha=0.143, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=maxCF_on)
-         
-            
-            print('                 Adding the correct attributes to the variables')
-            # =============================================================================
-            # Setting the attributes    
-            # =============================================================================
-            
-            # Set the global atributes
-            ds.attrs.update(
-                    author = 'Laurens Stoop UU/KNMI/TenneT',
-                    created = datetime.datetime.today().strftime('%d-%m-%Y'),
-                    map_area = 'Europe',
-                    data_source = 'ERA5 reanalysis data, contains modified Copernicus Climate Change Service information [28-01-2021]'
-                    )
-            
-            # # Set the demand attributes
-            # ds.solarCF.attrs.update(
-            #         units = ' ',
-            #         short_name = 'solarCF',
-            #         long_name = 'Capacity factor for photovoltaics',
-            #         method = 'Adopted by L.P. Stoop, based on Jerez et al., 2015', 
-            #         description = 'Hourly capacity factor of solar panels')
-            
-            # Set the demand attributes
-            ds.solarCF.attrs.update(
-                    units = ' ',
-                    short_name = 'solarCF',
-                    long_name = 'Capacity factor for photovoltaics',
-                    method = 'Based on Jerez et al., 2015', 
-                    description = 'Hourly capacity factor of solar panels')
-        
-            # Set the demand attributes
-            ds.windCF_on.attrs.update(
-                    units = ' ',
-                    short_name = 'windCF_on',
-                    long_name = 'Capacity factor for wind onshore with hubheigh 100 meter',
-                    method = 'Adopted by L.P. Stoop, based on Jerez et al., 2015', 
-                    description = 'Hourly capacity factor of onshore wind turbines')
-            
-            # Set the demand attributes
-            ds.windCF_off.attrs.update(
-                    units = ' ',
-                    short_name = 'windCF_off',
-                    long_name = 'Capacity factor for wind offshore with hubheigh 150 meter',
-                    method = 'Adopted by L.P. Stoop, based on Jerez et al., 2015', 
-                    description = 'Hourly capacity factor of offshore wind turbines')
-            
-            print('                 Storing the data in the defined location')
-            #%%
-            # =============================================================================
-            # Saving the data
-            # =============================================================================
-            
-            # Removing unneeded variables
-            ds = ds.drop(['u10', 'v10', 'u100', 'v100', 'msl', 'ro', 'sro', 'mpsl', 't2m', 'ssrd', 'wspd100m', 'wspd'])
-            
-            # Saving the file
-            ds.to_netcdf(file_save, encoding={'time':{'units':'days since 1900-01-01'}})
-            
-            # Closing files
-            ds.close()
-            
-            print('                 Finished with '+year+' '+month)
\ No newline at end of file
+# The mega loop, run over all year/month jobs
+if __name__ == '__main__':
+
+    # Prepare the store for all months, the grid is taken from the first input
+    if output_mode == 'zarr':
+        with xr.open_dataset(input_file(str(first_year), '01')) as ds:
+            create_store(store_path, hourly_times(first_year, last_year), ds.latitude.values, ds.longitude.values,
+                         cf_attrs, global_attrs, output_encoding)
+
+        # The months that are not written yet should read as missing
+        check_store(store_path, cf_attrs)
+
+    print('NOTIFY: Starting the mega loop')
+    started = run_start()
+    run_jobs(process_month, expand_jobs(first_year, last_year), workers, is_done, record)
+
+    # Where did the time go in this run
+    print_summary(timing_log, since=started)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 10:05
+
+Benchmark of the stages of the monthly CF calculation on a synthetic ERA5-EU
+month, the results are saved per commit so runs can be compared
+
+Run as: python bench_cf_pipeline.py [--hours 168] [--output folder] [--compare results.json]
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import argparse
+import datetime
+import functools
+import json
+import os.path
+import subprocess
+import tempfile
+from era5_synthetic import write_synthetic_month
+from cf_kernels import solar_potential_jerez2015, solar_potential_bett2016, wind_potential_batch
+from cf_io import open_era5, clean_units, cf_encoding
+from cf_manifest import atomic_to_netcdf
+from cf_instrument import stage, load_log
+
+
+# Where the results are saved by default, this folder is not tracked by git
+result_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results', 'output', 'benchmarks')
+
+# The turbines of the mega loop
+turbines = [
+        dict(name='offshore', height=150.0, alpha=0.11, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=0.95),
+        dict(name='onshore', height=120.0, alpha=0.143, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=0.95),
+        ]
+
+# The products of the mega loop
+products = ['solar_jerez', 'solar_bett', 'wind']
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function giving the current commit, to label the results
+def git_commit():
+
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+# Function to run all stages of one month and time them with the stages of
+# cf_instrument, the log file gets the records of the stages. The peak memory of
+# a process only grows, so per stage the growth of the peak is what the stage
+# added and the peak of the process is that of all stages up to it
+def run_stages(data_file, out_file, encoding_profile, log_file):
+
+    # Every stage is timed and logged
+    timed = functools.partial(stage, log_file)
+
+    # Loading in the files
+    with timed('load'):
+        ds = open_era5(data_file, products=products).load()
+
+    # Cleaning the units
+    with timed('units'):
+        ds = clean_units(ds, products).load()
+
+    # The capacity factors
+    with timed('solar_jerez'):
+        ds['solarCF'] = solar_potential_jerez2015(ds)
+    with timed('solar_bett'):
+        ds['solarCF_bett'] = solar_potential_bett2016(ds)
+    with timed('wind'):
+        windCF = wind_potential_batch(ds.wspd100m, turbines)
+    ds['windCF_off'] = windCF.sel(turbine='offshore', drop=True)
+    ds['windCF_on'] = windCF.sel(turbine='onshore', drop=True)
+
+    # Setting the attributes
+    variables = ['solarCF', 'solarCF_bett', 'windCF_on', 'windCF_off']
+    with timed('attributes'):
+        ds.attrs.update(created = datetime.datetime.today().strftime('%d-%m-%Y'))
+        for name in variables:
+            ds[name].attrs.update(units = ' ', short_name = name)
+
+    # Saving the data
+    out = ds[variables]
+    encoding = cf_encoding(out, variables, encoding_profile)
+    with timed('write'):
+        atomic_to_netcdf(out, out_file, encoding=encoding)
+
+    # The throughput of every stage in cell-hours per second
+    cell_hours = ds.sizes['time'] * ds.sizes['latitude'] * ds.sizes['longitude']
+    stages = []
+    for record in load_log(log_file):
+        stages.append(dict(
+            stage = record['stage'],
+            wall_time = record['wall_time'],
+            cpu_time = record['process_cpu_time'],
+            peak_growth_mb = record['peak_growth_mb'],
+            process_peak_rss_mb = record['process_peak_rss_mb'],
+            cell_hours_per_s = cell_hours / max(record['wall_time'], 1e-9),
+            ))
+
+    return stages, cell_hours
+
+
+# Function to print the results, relative to an earlier run when given
+def report(results, compare=None):
+
+    print('NOTIFY: '+results['commit']+' on '+str(results['cell_hours'])+' cell-hours')
+    earlier = {}
+    if compare is not None:
+        earlier = {result['stage']: result for result in compare['stages']}
+        print('                 compared with '+compare['commit'])
+
+    for result in results['stages']:
+        line = '                 {:12s} {:8.3f} s {:12.3e} cell-hours/s {:8.1f} MiB peak growth {:8.1f} MiB process peak'.format(
+            result['stage'], result['wall_time'], result['cell_hours_per_s'], result['peak_growth_mb'], result['process_peak_rss_mb'])
+        if result['stage'] in earlier:
+            line += '  {:5.2f}x'.format(earlier[result['stage']]['wall_time'] / max(result['wall_time'], 1e-9))
+        print(line)
+
+
+#%%
+# =============================================================================
+# Running the benchmark
+# =============================================================================
+
+if __name__ == '__main__':
+
+    # The options of the benchmark
+    parser = argparse.ArgumentParser(description='Benchmark the CF pipeline on a synthetic ERA5-EU month')
+    parser.add_argument('--year', default='2000')
+    parser.add_argument('--month', default='01')
+    parser.add_argument('--hours', type=int, default=None, help='number of hours, a full month by default')
+    parser.add_argument('--encoding', default='float', help='encoding profile of the output')
+    parser.add_argument('--label', default=None, help='name of the results, the commit by default')
+    parser.add_argument('--compare', default=None, help='earlier results to compare with')
+    parser.add_argument('--output', default=result_path, help='folder the results are saved in')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+
+        print('NOTIFY: Generating the synthetic month')
+        data_file = write_synthetic_month(os.path.join(tmp, 'ERA5-EU_'+args.year+args.month+'.nc'),
+                                          args.year, args.month, hours=args.hours)
+
+        print('NOTIFY: Running the stages')
+        stages, cell_hours = run_stages(data_file, os.path.join(tmp, 'ERA5_CF_'+args.year+args.month+'.nc'),
+                                        args.encoding, os.path.join(tmp, 'timing.jsonl'))
+
+    # Save the results
+    results = dict(commit=git_commit(), date=datetime.datetime.now().isoformat(), cell_hours=cell_hours,
+                   hours=args.hours, encoding=args.encoding, stages=stages)
+    os.makedirs(args.output, exist_ok=True)
+    result_file = os.path.join(args.output, (args.label or results['commit'])+'.json')
+    with open(result_file, 'w') as file:
+        json.dump(results, file, indent=1)
+
+    # Show them
+    compare = None
+    if args.compare is not None:
+        with open(args.compare) as file:
+            compare = json.load(file)
+    report(results, compare)
+    print('NOTIFY: Results saved in '+result_file)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Sun 18 Oct 2026 11:02
+
+Benchmark of the fused wind_potential kernel against the old where() chain
+
+Run as: python bench_wind_potential.py
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import multiprocessing as mp
+import resource
+import time
+from cf_kernels import wind_potential
+
+
+# Size of a month of hourly data on the ERA5-EU grid (time, lat, lon)
+shape_month = (744, 183, 422)
+
+# Size of the array used to check that both methods give the same result
+shape_check = (48, 183, 422)
+
+# The onshore turbine used in the mega loop
+turbine = dict(height=120.0, alpha=0.143, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=0.95)
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# The windpotential as it was calculated before the fused kernel, with a full
+# grid temporary for every regime of the power curve
+def wind_potential_where(wspd, height, alpha, cut_in_wspd, cut_out_start, cut_out_end, rated_wspd, maxCF):
+
+    # First we create a new dataset
+    ds_temp = xr.Dataset()
+
+    # Rescaling the windspeed to the requested height
+    wspd_height = wspd * (height / 100)**alpha
+
+    # We fill it with the windpotential without considering the information of the wind turbine
+    ds_temp['windCF'] = maxCF* ((wspd_height**3 - cut_in_wspd**3) / (rated_wspd**3 - cut_in_wspd**3))
+
+    # Now we reduce the wind potential to 1 above the rated windspeed
+    ds_temp['windCF'] = ds_temp.windCF.where(wspd_height <= rated_wspd, maxCF)
+
+    # Now we set the wind potential to 0 below the cut-in windspeed
+    ds_temp['windCF'] = ds_temp.windCF.where(wspd_height >= cut_in_wspd, 0)
+
+    # Now we set the wind potential to 0 above the cut-out windspeed
+    ds_temp['windCF'] = ds_temp.windCF.where(wspd_height <= cut_out_start, maxCF*((cut_out_end-wspd_height)/(cut_out_end-cut_out_start)))
+    ds_temp['windCF'] = ds_temp.windCF.where(wspd_height <= cut_out_end, 0)
+
+    return ds_temp.windCF
+
+
+# Function to make a synthetic 100 meter windspeed field, filled per time step
+# so the generation itself does not set the peak memory
+def synthetic_wspd(shape, seed=0):
+
+    # The random generator
+    rng = np.random.default_rng(seed)
+
+    # Weibull distributed windspeeds with a mean of roughly 8 m/s, including
+    # some values above the cut-out windspeed
+    wspd = np.empty(shape, dtype=np.float32)
+    for i in range(shape[0]):
+        wspd[i] = 9.0 * rng.weibull(2.0, shape[1:])
+
+    return xr.DataArray(wspd, dims=('time', 'latitude', 'longitude'), name='wspd100m')
+
+
+# Function that runs one method in a fresh process and reports time and memory
+def run_method(method, shape, queue):
+
+    # Make the input data
+    wspd = synthetic_wspd(shape)
+
+    # The memory in use before the calculation (kB on linux)
+    rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Time the calculation
+    time_start = time.perf_counter()
+    if method == 'where':
+        wind_potential_where(wspd, **turbine)
+    elif method == 'fused':
+        wind_potential(wspd, **turbine)
+    time_run = time.perf_counter() - time_start
+
+    # The extra peak memory of the calculation
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_start
+
+    queue.put((method, time_run, rss_peak / 1024.))
+
+
+#%%
+# =============================================================================
+# Running the benchmark
+# =============================================================================
+
+if __name__ == '__main__':
+
+    print('NOTIFY: Checking the fused kernel against the where() chain')
+
+    # Both methods should give the same float32 values
+    wspd = synthetic_wspd(shape_check)
+    np.testing.assert_array_equal(wind_potential(wspd, **turbine).values,
+                                  wind_potential_where(wspd, **turbine).values.astype(np.float32))
+
+    print('NOTIFY: Benchmarking on an array of shape '+str(shape_month))
+
+    # Each method runs in its own process to get a clean peak memory
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    results = {}
+    for method in ['where', 'fused']:
+        process = ctx.Process(target=run_method, args=(method, shape_month, queue))
+        process.start()
+        name, time_run, rss_peak = queue.get()
+        process.join()
+        results[name] = (time_run, rss_peak)
+        print('                 {:6s} {:8.2f} s {:10.1f} MiB extra peak RSS'.format(name, time_run, rss_peak))
+
+    # The gain of the fused kernel
+    print('NOTIFY: Speedup {:.1f}x, peak RSS reduction {:.1f}x'.format(
+        results['where'][0] / results['fused'][0],
+        results['where'][1] / max(results['fused'][1], 1.)))
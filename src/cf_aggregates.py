@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 23:10
+
+Temporal aggregates of the hourly capacity factors (e.g. 3-hourly, daily or
+monthly): the mean, minimum, maximum and full load hours of every period, made
+from the month that is in memory in the mega loop so the hourly archive does
+not have to be read again
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import pandas as pd
+
+
+# The statistics of a period, the full load hours (flh) are the sum of the
+# capacity factor times the length of a time step in hours
+statistics = ['mean', 'min', 'max', 'flh']
+
+# The attributes of each statistic
+statistic_attrs = dict(
+        mean = dict(cell_methods='time: mean', description='Mean of the hourly capacity factor over the period'),
+        min = dict(cell_methods='time: minimum', description='Lowest hourly capacity factor of the period'),
+        max = dict(cell_methods='time: maximum', description='Highest hourly capacity factor of the period'),
+        flh = dict(cell_methods='time: sum', units='h', description='Full load hours of the period'),
+        )
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to check that a period (pandas frequency) fits in the months of the
+# mega loop: a whole fraction of a day, or one month
+def check_period(freq):
+
+    offset = pd.tseries.frequencies.to_offset(freq)
+    if isinstance(offset, pd.offsets.Day):
+        fits = offset.n == 1
+    elif isinstance(offset, pd.offsets.Tick):
+        fits = pd.Timedelta(days=1) % pd.Timedelta(offset) == pd.Timedelta(0)
+    else:
+        fits = isinstance(offset, (pd.offsets.MonthBegin, pd.offsets.MonthEnd)) and offset.n == 1
+    if not fits:
+        raise ValueError('The period '+freq+' does not fit in a month')
+
+
+# Function giving the name of the variable with a statistic of a capacity factor
+def aggregate_name(name, statistic):
+
+    return name+'_'+statistic
+
+
+# Function to make the statistics of the capacity factors per period, the
+# periods are labelled with their start. The attributes of the capacity factors
+# are kept, the full load hours are in hours
+def aggregate_periods(ds, variables, freq, statistics=statistics):
+
+    # The length of a time step in hours, for the full load hours
+    step = (ds.time.values[1] - ds.time.values[0]) / np.timedelta64(1, 'h')
+
+    out = xr.Dataset()
+    for name in variables:
+        resampled = ds[name].resample(time=freq)
+        for statistic in statistics:
+            if statistic == 'flh':
+                values = resampled.sum() * step
+            elif statistic in ('mean', 'min', 'max'):
+                values = getattr(resampled, statistic)()
+            else:
+                raise ValueError('Unknown statistic '+statistic)
+            values = values.astype(np.float32)
+            values.attrs.update(ds[name].attrs, short_name=aggregate_name(name, statistic), **statistic_attrs[statistic])
+            out[aggregate_name(name, statistic)] = values
+
+    out.attrs.update(ds.attrs, period=freq)
+
+    return out
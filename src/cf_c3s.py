@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 13:30
+
+Ingest of the downloaded C3S-SIS zip files into one store along time on the
+ERA5 CF grid, the members are read straight from the zip files so nothing is
+unpacked to disk
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import datetime as dt
+import glob
+import os.path
+import re
+import zipfile
+from cf_manifest import load_manifest, save_manifest, file_info, file_matches
+from cf_zarr import create_store, hourly_times, write_region, check_store
+
+
+# The technology codes in the C3S-SIS file names and our capacity factors
+c3s_variables = dict(SPV='solarCF', WON='windCF_on', WOF='windCF_off')
+
+# The attributes of the capacity factors in the store
+c3s_attrs = dict(
+        solarCF = dict(units=' ', long_name='Capacity factor for photovoltaics', source='C3S-SIS'),
+        windCF_on = dict(units=' ', long_name='Capacity factor for wind onshore', source='C3S-SIS'),
+        windCF_off = dict(units=' ', long_name='Capacity factor for wind offshore', source='C3S-SIS'),
+        )
+
+# Hours written to the store at once, a member is never in memory as a whole
+ingest_hours = 31 * 24
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to tell the terminal where we are
+def _notify(message):
+
+    print(dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')+' NOTIFY: '+message)
+
+
+# Function giving the year of a downloaded zip, the yearly files are named
+# C3S-SIS_<aggregation>_YYYY.zip and the pieces C3S-SIS_<aggregation>_YYYYMM_<variable>.zip
+def zip_year(path):
+
+    return re.search(r'_(\d{4})(\d{2})?(_[a-z_]+)?\.zip$', os.path.basename(path)).group(1)
+
+
+# Function to drop the monthly pieces of the years that are in a yearly zip, the
+# yearly zip holds all months and variables so the pieces would store the same
+# hours a second time
+def drop_covered(zip_files):
+
+    yearly = set(zip_year(path) for path in zip_files if re.search(r'_\d{4}\.zip$', os.path.basename(path)))
+    covered = [path for path in zip_files if zip_year(path) in yearly and not re.search(r'_\d{4}\.zip$', os.path.basename(path))]
+    for path in covered:
+        _notify('Skipping '+os.path.basename(path)+', its year is in the yearly zip')
+
+    return [path for path in zip_files if path not in covered]
+
+
+# Function giving our name of the capacity factor in a member, None for members
+# that are not a gridded capacity factor
+def member_variable(member):
+
+    if not member.endswith('.nc'):
+        return None
+    for code, name in c3s_variables.items():
+        if '_'+code+'_' in os.path.basename(member):
+            return name
+
+    return None
+
+
+# Function to open a member of a zip file without unpacking it, netcdf3 files
+# are read by scipy and netcdf4 files by h5netcdf, both read from the stream
+def open_member(archive, member):
+
+    stream = archive.open(member)
+    engine = 'scipy' if stream.read(3) == b'CDF' else 'h5netcdf'
+    stream.seek(0)
+
+    return xr.open_dataset(stream, engine=engine)
+
+
+# Function to put a C3S-SIS field on the ERA5 grid, the grids are the same at
+# 0.25 degree so the cells are matched, cells outside the C3S domain are NaN
+def to_era5_grid(da, latitude, longitude):
+
+    da = da.rename({name: new for name, new in [('lon', 'longitude'), ('lat', 'latitude')] if name in da.dims})
+
+    return da.reindex(latitude=latitude, longitude=longitude, method='nearest', tolerance=1e-3)
+
+
+# Function to stream all capacity factors of one zip file into the store
+def ingest_zip(zip_file, store, latitude, longitude):
+
+    with zipfile.ZipFile(zip_file) as archive:
+        for member in archive.namelist():
+
+            # Only the gridded capacity factors go in the store
+            name = member_variable(member)
+            if name is None:
+                _notify('Skipping '+member)
+                continue
+
+            with open_member(archive, member) as ds:
+
+                # The member has one field, the capacity factor
+                da = ds[list(ds.data_vars)[0]]
+
+                # Write a month at a time, in whole days as the store needs
+                for start in range(0, ds.sizes['time'], ingest_hours):
+                    part = to_era5_grid(da.isel(time=slice(start, start + ingest_hours)), latitude, longitude)
+                    part = part.astype(np.float32).load()
+                    write_region(store, xr.Dataset({name: part}).drop_vars(
+                        [coord for coord in part.coords if coord not in ['time', 'latitude', 'longitude']]))
+
+            _notify('Stored '+member)
+
+
+# Function to ingest all downloaded zip files into the store on the ERA5 grid,
+# zip files that were ingested before and did not change are skipped so new
+# years can be added as they are downloaded. Of a year with a yearly zip the
+# monthly pieces are not ingested
+def ingest_archive(zip_path, store, latitude, longitude, profile='packed', aggregation='original_grid'):
+
+    # The downloaded files and the years they cover
+    zip_files = sorted(glob.glob(os.path.join(zip_path, 'C3S-SIS_'+aggregation+'_*.zip')))
+    if len(zip_files) == 0:
+        raise FileNotFoundError('No C3S-SIS zip files in '+zip_path)
+    zip_files = drop_covered(zip_files)
+    years = sorted(set(zip_year(path) for path in zip_files))
+
+    # The store can only grow at its end, files of years before its start are
+    # found before anything is ingested
+    if os.path.exists(store):
+        first_year = str(xr.open_zarr(store, consolidated=True).time.dt.year.values[0])
+        early = [os.path.basename(path) for path in zip_files if zip_year(path) < first_year]
+        if len(early) > 0:
+            raise ValueError('The store '+store+' starts in '+first_year+', ingest these files into a new store: '+
+                             ', '.join(early))
+
+    # The store covers all years, new years are added at the end
+    create_store(store, hourly_times(years[0], years[-1]), latitude, longitude, c3s_attrs,
+                 dict(data_source='C3S-SIS energy derived reanalysis, capacity factor ratio'), profile)
+    check_store(store, c3s_attrs)
+
+    # The zip files that are in the store already
+    ingested_file = store.rstrip('/')+'.ingested.json'
+    ingested = load_manifest(ingested_file)
+
+    for zip_file in zip_files:
+        key = os.path.basename(zip_file)
+        if file_matches(zip_file, ingested.get(key)):
+            continue
+
+        ingest_zip(zip_file, store, latitude, longitude)
+
+        # Remember the file after all its members are in
+        ingested[key] = file_info(zip_file)
+        save_manifest(ingested, ingested_file)
+        _notify('Finished with '+key)
+
+    return ingested
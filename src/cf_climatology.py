@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 15:50
+
+Climatology and percentiles of the capacity factors in one pass over the
+archive: running moments per hour of the day and month, a histogram per cell
+for the percentiles and the annual means for the year to year variability.
+The states of separate months can be merged, so the mega loop can write the
+state of each month and these are added up afterwards. The percentiles are
+those of all hours of a cell, per month and hour of the day only the moments
+are kept as a histogram per group would need 288 times the memory
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import datetime as dt
+import glob
+import os.path
+
+
+# Number of histogram bins between 0 and the upper bound of the capacity
+# factors. The percentile is placed in the bin that holds it, so it is accurate
+# to one bin (0.005) and not better, the values inside a bin are not known
+bins = 200
+upper = 1.
+
+# Hours counted in the histograms at once
+histogram_block = 7 * 24
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to tell the terminal where we are
+def _notify(message):
+
+    print(dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')+' NOTIFY: '+message)
+
+
+# Function to make an empty state for fields with the given (spatial) shape,
+# the moments of a group (month, hour) and the sums of a year are only made
+# once data of that group or year comes in
+def new_state(shape, bins=bins, upper=upper):
+
+    return dict(
+        shape = tuple(int(size) for size in shape),
+        bins = bins,
+        upper = upper,
+        groups = {},
+        years = {},
+        histogram = np.zeros(tuple(shape) + (bins,), dtype=np.uint32),
+        )
+
+
+# Function to merge the moments (count, mean, m2) of b into a (Chan et al.)
+def _merge_moments(a, b):
+
+    total = a['count'] + b['count']
+    share = b['count'] / np.maximum(total, 1)
+    delta = b['mean'] - a['mean']
+
+    a['m2'] += b['m2'] + delta**2 * a['count'] * share
+    a['mean'] += delta * share
+    a['count'] = total
+
+    return a
+
+
+# Function giving the moments of a block of values (time, ...), missing values
+# are left out
+def _block_moments(values):
+
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0).astype(np.float64)
+    mean = np.where(valid, values, 0.).sum(axis=0, dtype=np.float64) / np.maximum(count, 1)
+    m2 = (np.where(valid, values - mean, 0.)**2).sum(axis=0, dtype=np.float64)
+
+    return dict(count=count, mean=mean, m2=m2)
+
+
+# Function to add a field (time, ...) to the state
+def update_state(state, da):
+
+    da = da.transpose('time', ...)
+    values = da.values
+    months = da.time.dt.month.values
+    hours = da.time.dt.hour.values
+    years = da.time.dt.year.values
+
+    # The moments per month and hour of the day
+    for month, hour in sorted(set(zip(months, hours))):
+        select = (months == month) & (hours == hour)
+        block = _block_moments(values[select])
+        key = (int(month), int(hour))
+        if key in state['groups']:
+            _merge_moments(state['groups'][key], block)
+        else:
+            state['groups'][key] = block
+
+    # The sums per year
+    for year in np.unique(years):
+        part = values[years == year]
+        total = state['years'].setdefault(int(year), dict(sum=np.zeros(state['shape']), count=np.zeros(state['shape'])))
+        total['sum'] += np.nansum(part, axis=0, dtype=np.float64)
+        total['count'] += (~np.isnan(part)).sum(axis=0)
+
+    # The histogram of each cell, all (cell, bin) pairs of a week are counted at once
+    cell_count = int(np.prod(state['shape']))
+    offset = np.arange(cell_count).reshape(state['shape']) * state['bins']
+    for start in range(0, values.shape[0], histogram_block):
+        block = values[start:start + histogram_block]
+        valid = ~np.isnan(block)
+        index = np.clip((np.where(valid, block, 0.) / state['upper'] * state['bins']).astype(np.int64), 0, state['bins'] - 1)
+        index += offset
+        state['histogram'] += np.bincount(index[valid], minlength=cell_count * state['bins']).reshape(
+            state['histogram'].shape).astype(np.uint32)
+
+    return state
+
+
+# Function to merge state b into state a
+def merge_states(a, b):
+
+    if a['shape'] != b['shape'] or a['bins'] != b['bins'] or a['upper'] != b['upper']:
+        raise ValueError('The states are not of the same fields')
+
+    for key, moments in b['groups'].items():
+        if key in a['groups']:
+            _merge_moments(a['groups'][key], moments)
+        else:
+            a['groups'][key] = {name: value.copy() for name, value in moments.items()}
+
+    for year, total in b['years'].items():
+        if year in a['years']:
+            a['years'][year]['sum'] += total['sum']
+            a['years'][year]['count'] += total['count']
+        else:
+            a['years'][year] = {name: value.copy() for name, value in total.items()}
+
+    a['histogram'] += b['histogram']
+
+    return a
+
+
+# Function to save a state as a compressed numpy file
+def save_state(state, path):
+
+    arrays = dict(shape=np.array(state['shape']), bins=state['bins'], upper=state['upper'], histogram=state['histogram'])
+    for (month, hour), moments in state['groups'].items():
+        for name, value in moments.items():
+            arrays['group_{:02d}_{:02d}_{}'.format(month, hour, name)] = value
+    for year, total in state['years'].items():
+        for name, value in total.items():
+            arrays['year_{}_{}'.format(year, name)] = value
+
+    # Via a temporary file so a killed job leaves no broken state
+    with open(path+'.tmp', 'wb') as file:
+        np.savez_compressed(file, **arrays)
+    os.replace(path+'.tmp', path)
+
+
+# Function to load a saved state
+def load_state(path):
+
+    with np.load(path) as arrays:
+        state = new_state(arrays['shape'], int(arrays['bins']), float(arrays['upper']))
+        state['histogram'] = arrays['histogram']
+        for key in arrays.files:
+            parts = key.split('_')
+            if parts[0] == 'group':
+                state['groups'].setdefault((int(parts[1]), int(parts[2])), {})[parts[3]] = arrays[key]
+            elif parts[0] == 'year':
+                state['years'].setdefault(int(parts[1]), {})[parts[2]] = arrays[key]
+
+    return state
+
+
+# Function to give the percentiles from the histograms, linear within a bin
+def state_percentiles(state, quantiles=(0.1, 0.5, 0.9)):
+
+    histogram = state['histogram'].astype(np.float64)
+    cumulative = np.cumsum(histogram, axis=-1)
+    count = cumulative[..., -1]
+
+    result = []
+    for quantile in quantiles:
+        target = quantile * count
+        index = np.minimum((cumulative < target[..., None]).sum(axis=-1), state['bins'] - 1)
+        before = np.where(index > 0, np.take_along_axis(cumulative, np.maximum(index - 1, 0)[..., None], -1)[..., 0], 0.)
+        in_bin = np.take_along_axis(histogram, index[..., None], -1)[..., 0]
+        fraction = np.clip((target - before) / np.where(in_bin > 0, in_bin, 1.), 0., 1.)
+        result.append(np.where(count > 0, (index + fraction) / state['bins'] * state['upper'], np.nan))
+
+    return np.stack(result)
+
+
+# Function to make the climatology of a state: the mean and standard deviation
+# per month and hour of the day, the percentiles, the annual means and their
+# standard deviation. The template gives the spatial dimensions and coordinates
+# (e.g. the field of one time step)
+def climatology(state, template, quantiles=(0.1, 0.5, 0.9)):
+
+    dims = tuple(template.dims)
+    coords = {name: coord for name, coord in template.coords.items() if set(coord.dims) <= set(dims)}
+    nan = np.full(state['shape'], np.nan)
+
+    # The mean and standard deviation per month and hour, NaN where there was no data
+    mean = np.stack([np.stack([state['groups'][(month, hour)]['mean'] if (month, hour) in state['groups'] else nan
+                               for hour in range(24)]) for month in range(1, 13)])
+    variance = np.stack([np.stack([state['groups'][(month, hour)]['m2'] / np.maximum(state['groups'][(month, hour)]['count'] - 1, 1)
+                                   if (month, hour) in state['groups'] else nan for hour in range(24)]) for month in range(1, 13)])
+
+    # The annual means
+    years = sorted(state['years'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        annual = np.stack([state['years'][year]['sum'] / state['years'][year]['count'] for year in years])
+
+    ds = xr.Dataset(coords=dict(coords, month=np.arange(1, 13), hour=np.arange(24), quantile=list(quantiles), year=years))
+    ds['mean'] = (('month', 'hour') + dims, mean.astype(np.float32))
+    ds['std'] = (('month', 'hour') + dims, np.sqrt(variance).astype(np.float32))
+    ds['percentile'] = (('quantile',) + dims, state_percentiles(state, quantiles).astype(np.float32))
+    ds['annual_mean'] = (('year',) + dims, annual.astype(np.float32))
+    ds['interannual_std'] = (dims, np.nanstd(annual, axis=0, ddof=1 if len(years) > 1 else 0).astype(np.float32))
+
+    return ds
+
+
+# Function to make the climatology of the monthly capacity factor files in one
+# pass, the file pattern ends in {year}{month}.nc
+def climatology_archive(file_pattern, variables=('solarCF', 'windCF_on', 'windCF_off'), quantiles=(0.1, 0.5, 0.9)):
+
+    files = sorted(glob.glob(file_pattern.format(year='[0-9]'*4, month='[0-9]'*2)))
+
+    states = {}
+    templates = {}
+    for file in files:
+        with xr.open_dataset(file) as ds:
+            for name in variables:
+                da = ds[name].load()
+                if name not in states:
+                    templates[name] = da.isel(time=0, drop=True)
+                    states[name] = new_state(templates[name].shape)
+                update_state(states[name], da)
+        _notify('Added '+os.path.basename(file))
+
+    return {name: climatology(states[name], templates[name], quantiles) for name in variables}
+
+
+# Function to make the climatology from the states the mega loop saved per month
+def climatology_from_states(state_files, template, quantiles=(0.1, 0.5, 0.9)):
+
+    state = None
+    for path in sorted(state_files):
+        state = load_state(path) if state is None else merge_states(state, load_state(path))
+
+    return climatology(state, template, quantiles)
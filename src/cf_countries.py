@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Sun 18 Oct 2026 18:30
+
+National capacity factor series from the gridded output, using one cached
+sparse weight matrix (grid cell x country) per surface applied as a matrix
+product. The land products are aggregated over the countries, the offshore wind
+over the sea areas of the countries
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import scipy.sparse
+import scipy.spatial
+import datetime as dt
+import functools
+import glob
+import hashlib
+import json
+import os.path
+from cf_scheduler import run_jobs
+from cf_landsea import dataset_grid
+
+
+# The countries as used in the data folder (ScaledInflows/<CC>)
+countries = ['AT', 'BE', 'BG', 'CH', 'CZ', 'DE', 'DK', 'EE', 'EL', 'ES',
+             'FI', 'FR', 'HR', 'HU', 'IE', 'IT', 'LT', 'LU', 'LV', 'NL',
+             'NO', 'PL', 'PT', 'RO', 'SE', 'SI', 'SK', 'UK']
+
+# The names of the countries in the Natural Earth country borders
+country_names = dict(
+        AT='Austria', BE='Belgium', BG='Bulgaria', CH='Switzerland', CZ='Czechia',
+        DE='Germany', DK='Denmark', EE='Estonia', EL='Greece', ES='Spain',
+        FI='Finland', FR='France', HR='Croatia', HU='Hungary', IE='Ireland',
+        IT='Italy', LT='Lithuania', LU='Luxembourg', LV='Latvia', NL='Netherlands',
+        NO='Norway', PL='Poland', PT='Portugal', RO='Romania', SE='Sweden',
+        SI='Slovenia', SK='Slovakia', UK='United Kingdom')
+
+# The surface each capacity factor is aggregated over, the offshore wind over
+# the sea area of the countries
+surfaces = dict(solarCF='land', solarCF_bett='land', windCF_on='land', windCF_off='sea')
+
+# The largest distance in meter of a sea cell to the coast of its country, the
+# 200 nautical miles of the exclusive economic zones
+eez_distance = 370.4e3
+
+# Number of hours aggregated per matrix product
+time_chunk = 744
+
+# The radius of the earth in meter, for the area of the grid cells
+earth_radius = 6371e3
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to tell the terminal where we are
+def _notify(message):
+
+    print(dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')+' NOTIFY: '+message)
+
+
+# Function to give the grid cells the number of the country they are in (NaN at
+# sea) from the Natural Earth borders or other regionmask regions, together with
+# the numbers of the country names. This needs the regionmask package
+def country_regions(latitude, longitude, borders=None):
+
+    import regionmask
+
+    if borders is None:
+        borders = regionmask.defined_regions.natural_earth_v5_0_0.countries_50
+    regions = borders.mask(np.asarray(longitude), np.asarray(latitude)).rename(lon='longitude', lat='latitude')
+
+    return regions, dict(zip(borders.names, borders.numbers))
+
+
+# Function to give the sea cells the region of the nearest land cell within
+# max_distance (meter), land cells and open sea get NaN. The borders between
+# neighbours are then the lines of equal distance to both coasts, which is how
+# most exclusive economic zones are bounded
+def nearest_coast(regions, max_distance=eez_distance):
+
+    # The cells as points on the unit sphere
+    latitude, longitude = np.meshgrid(np.deg2rad(regions.latitude.values), np.deg2rad(regions.longitude.values), indexing='ij')
+    points = np.stack([np.cos(latitude) * np.cos(longitude), np.cos(latitude) * np.sin(longitude), np.sin(latitude)], axis=-1)
+
+    # Without land there is no coast
+    land = regions.notnull().values
+    sea = np.full(land.shape, np.nan)
+    if not land.any():
+        return regions.copy(data=sea)
+
+    # The nearest land cell of every sea cell, the distance as chord of the sphere
+    chord = 2 * np.sin(max_distance / (2 * earth_radius))
+    distance, index = scipy.spatial.cKDTree(points[land]).query(points[~land], distance_upper_bound=chord)
+    found = np.isfinite(distance)
+    values = np.full(found.shape, np.nan)
+    values[found] = regions.values[land][index[found]]
+    sea[~land] = values
+
+    return regions.copy(data=sea)
+
+
+# Function to make the country masks (country, latitude, longitude) from a field
+# of region numbers and the number of each country, countries without a number
+# get no cells
+def region_fractions(regions, numbers):
+
+    fractions = xr.concat([regions == (np.nan if number is None else number) for number in numbers.values()], dim='country')
+
+    return fractions.drop_vars([name for name in fractions.coords if name not in ['latitude', 'longitude']]).assign_coords(
+        country=list(numbers)).astype(np.float32)
+
+
+# Function to make the country masks (country, latitude, longitude) of the land
+# or the sea area of the countries from the Natural Earth borders, the sea area
+# is approximated as the sea within the EEZ distance that is closest to the coast
+# of the country. Exact EEZ masks can be handed to country_weights as fractions
+def country_fractions(latitude, longitude, codes=countries, surface='land', borders=None):
+
+    # The country of every cell
+    regions, numbers = country_regions(latitude, longitude, borders)
+    if surface == 'sea':
+        regions = nearest_coast(regions)
+    elif surface != 'land':
+        raise ValueError('Unknown surface '+surface)
+
+    return region_fractions(regions, {code: numbers.get(country_names[code]) for code in codes})
+
+
+# Function to determine the area of the grid cells in m2 (latitude, longitude),
+# the grid is regular
+def cell_areas(latitude, longitude):
+
+    step_lat = np.deg2rad(abs(latitude[1] - latitude[0]))
+    step_lon = np.deg2rad(abs(longitude[1] - longitude[0]))
+    area = earth_radius**2 * step_lat * step_lon * np.cos(np.deg2rad(latitude))
+
+    return area[:, None] * np.ones(len(longitude))
+
+
+# Function to build the weight matrix (grid cell x country). The cells are
+# weighted by area (cos of latitude) or by an installed capacity field on the
+# grid and each column sums to one, so the product gives the country mean. With
+# the 'sum' weighting the weights are the cell areas in m2 inside the country,
+# so the product of a depth (e.g. runoff in m) gives the volume per country
+def build_weights(fractions, weighting='area', capacity=None):
+
+    # The cell weights on the grid
+    fractions = fractions.transpose('country', 'latitude', 'longitude')
+    if weighting == 'area':
+        cell_weight = np.cos(np.deg2rad(fractions.latitude.values))[:, None] * np.ones(len(fractions.longitude))
+    elif weighting == 'capacity':
+        cell_weight = capacity.transpose('latitude', 'longitude').values
+    elif weighting == 'sum':
+        cell_weight = cell_areas(fractions.latitude.values, fractions.longitude.values)
+    else:
+        raise ValueError('Unknown weighting '+weighting)
+
+    # The weights of all cells per country
+    weights = np.nan_to_num(fractions.values * cell_weight).reshape(fractions.sizes['country'], -1).T
+
+    # Countries without cells, e.g. outside the domain, get missing series
+    empty = [str(code) for code, weight in zip(fractions.country.values, weights.sum(axis=0)) if weight == 0]
+    if empty:
+        _notify('No cells on the grid for '+', '.join(empty)+', their series will be missing')
+
+    # Normalise per country, countries without cells keep zero weights
+    if weighting != 'sum':
+        total = weights.sum(axis=0)
+        weights = weights / np.where(total > 0, total, 1.)
+
+    return scipy.sparse.csr_matrix(weights.astype(np.float32))
+
+
+# Function giving the cache file of the weights of a surface, next to the cache
+# file of the land
+def surface_cache(cache_file, surface):
+
+    root, extension = os.path.splitext(cache_file)
+
+    return cache_file if surface == 'land' else root+'_'+surface+extension
+
+
+# Function to get the weights from the cache (a .npz file), or build and cache
+# them when the grid, countries, weighting, capacity, fractions or surface changed
+def country_weights(cache_file, latitude, longitude, codes=countries, weighting='area', capacity=None, fractions=None,
+                    surface='land'):
+
+    # The key describing the weights
+    key = hashlib.sha256()
+    for array in ([latitude, longitude] + ([capacity.values] if capacity is not None else []) +
+                  ([fractions.values] if fractions is not None else [])):
+        key.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    key.update(json.dumps([list(codes), weighting, surface]).encode())
+    key = key.hexdigest()
+
+    # Use the cache when it is there for the same key
+    if os.path.isfile(cache_file) and os.path.isfile(cache_file+'.json'):
+        with open(cache_file+'.json') as file:
+            if json.load(file)['key'] == key:
+                return scipy.sparse.load_npz(cache_file)
+
+    # Build the weights
+    if fractions is None:
+        fractions = country_fractions(latitude, longitude, codes, surface)
+    weights = build_weights(fractions, weighting, capacity)
+
+    # And store them
+    scipy.sparse.save_npz(cache_file, weights)
+    with open(cache_file+'.json', 'w') as file:
+        json.dump(dict(key=key, countries=list(codes), weighting=weighting, surface=surface), file)
+
+    return weights
+
+
+# Function to aggregate a field to countries, the field is on the grid (time,
+# latitude, longitude) or on cells with their flat grid index (time, cell). As
+# mean the weights are normalised every hour over the cells with data, so
+# missing cells do not pull the mean to zero. As sum (e.g. of volumes) missing
+# cells count as zero. Countries without cells are missing
+def aggregate(da, weights, codes=countries, cell_dim=None, mean=True):
+
+    # Flatten the grid, or pick the rows of the cells from the weights
+    if cell_dim is None:
+        da = da.transpose('time', 'latitude', 'longitude')
+        values = da.values.reshape(da.sizes['time'], -1)
+    else:
+        da = da.transpose('time', cell_dim)
+        values = da.values
+        weights = weights[da[cell_dim].values]
+
+    # The total weight of every country
+    total = np.asarray(weights.sum(axis=0)).ravel()
+
+    # One sparse matrix product per chunk of time, with missing values also one
+    # for the weight of the cells with data
+    result = np.empty((da.sizes['time'], weights.shape[1]), dtype=np.float32)
+    for start in range(0, da.sizes['time'], time_chunk):
+        block = values[start:start + time_chunk]
+        missing = np.isnan(block)
+        summed = (weights.T @ np.where(missing, 0, block).T).T
+        if mean:
+            covered = (weights.T @ (~missing).T.astype(np.float32)).T if missing.any() else total
+            summed = np.divide(summed, covered, out=np.full(summed.shape, np.nan), where=covered > 0)
+        result[start:start + time_chunk] = summed
+    result[:, total == 0] = np.nan
+
+    return xr.DataArray(result, dims=('time', 'country'), coords=dict(time=da.time, country=list(codes)),
+                        name=da.name, attrs=da.attrs)
+
+
+# Function to aggregate all capacity factors of one monthly file, each over the
+# weights of its surface
+def _aggregate_month(file_pattern, cache_file, variables, codes, year, month):
+
+    # The weights were cached before the jobs started
+    weights = {surface: scipy.sparse.load_npz(surface_cache(cache_file, surface))
+               for surface in set(surfaces.get(name, 'land') for name in variables)}
+
+    with xr.open_dataset(file_pattern.format(year=year, month=month)) as ds:
+        cell_dim = lambda name: next((dim for dim in ds[name].dims if dim.startswith('cell')), None)
+        return xr.Dataset({name: aggregate(ds[name], weights[surfaces.get(name, 'land')], codes, cell_dim(name))
+                           for name in variables})
+
+
+# Function to aggregate the whole archive of monthly files to hourly country
+# series, the file pattern ends in {year}{month}.nc. The fractions are masks
+# per surface to use instead of those of country_fractions, e.g. EEZ masks for
+# the sea
+def aggregate_archive(file_pattern, cache_file, variables=('solarCF', 'windCF_on', 'windCF_off'),
+                      codes=countries, weighting='area', capacity=None, fractions=None, workers=1):
+
+    # Find the months of the archive
+    files = sorted(glob.glob(file_pattern.format(year='[0-9]'*4, month='[0-9]'*2)))
+    jobs = [(os.path.basename(file)[-9:-5], os.path.basename(file)[-5:-3]) for file in files]
+
+    # Make sure the weights of every surface are in the cache, on the grid the
+    # cells came from for files on cells
+    fractions = fractions or {}
+    with xr.open_dataset(files[0]) as ds:
+        for surface in set(surfaces.get(name, 'land') for name in variables):
+            country_weights(surface_cache(cache_file, surface), *dataset_grid(ds), codes, weighting, capacity,
+                            fractions.get(surface), surface)
+
+    # Aggregate all months
+    report = run_jobs(functools.partial(_aggregate_month, file_pattern, cache_file, list(variables), list(codes)),
+                      jobs, workers)
+
+    return xr.concat([job['result'] for job in report if job['status'] == 'done'], dim='time').sortby('time')
+
+
+# Function to write the country series as one table per capacity factor
+def to_country_tables(ds, out_path):
+
+    for name in ds.data_vars:
+        ds[name].to_pandas().to_csv(os.path.join(out_path, 'ERA5_'+name+'_countries.csv'))
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 19:20
+
+Electricity demand for the country series: the yearly totals of 'Electricity
+demand.xlsx' read once into a cache, hourly demand from a profile scaled to
+these totals and the alignment of series with different calendars
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import pandas as pd
+import json
+import os
+from cf_manifest import file_info, file_matches, atomic_save_array
+
+
+# The columns of the demand table, the totals in GWh per year and the lowest
+# and highest hourly demand in GW, for the base demand and with electric
+# vehicles (EV), heat pumps (HP) or both
+demand_columns = ['Total_Base_GWh', 'Total_BaseEV_GWh', 'Total_BaseHP_GWh', 'Total_BaseEVHP_GWh',
+                  'Min_Base_GW', 'Min_BaseEV_GW', 'Min_BaseHP_GW', 'Min_BaseEVHP_GW',
+                  'max_Base_GW', 'max_BaseEV_GW', 'max_BaseHP_GW', 'max_BaseEVHP_GW']
+
+# The countries of the table that are together one of our countries
+country_groups = dict(UK=['GB', 'NI'])
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to read the demand table (country x column) from the excel file,
+# this needs the openpyxl package
+def read_demand_table(xlsx_file):
+
+    table = pd.read_excel(xlsx_file, index_col=0)
+    table = table[demand_columns].dropna(how='all')
+    table.index = table.index.astype(str)
+
+    return table
+
+
+# Function to load the demand table from the cache in cache_path, the excel file
+# is only read again when it changed
+def load_demand_table(xlsx_file, cache_path):
+
+    key_file = os.path.join(cache_path, 'demand_table.json')
+    value_file = os.path.join(cache_path, 'demand_table.npy')
+
+    # Check the cache
+    key = {}
+    if os.path.isfile(key_file):
+        with open(key_file) as file:
+            key = json.load(file)
+    current = (key.get('columns') == demand_columns and os.path.isfile(value_file) and
+               file_matches(xlsx_file, key.get('file')))
+
+    # Make the cache again
+    if not current:
+        table = read_demand_table(xlsx_file)
+        os.makedirs(cache_path, exist_ok=True)
+        atomic_save_array(value_file, table.values.astype(np.float64))
+        key = dict(file=file_info(xlsx_file), columns=demand_columns, countries=list(table.index))
+        with open(key_file+'.tmp', 'w') as file:
+            json.dump(key, file, indent=1)
+        os.replace(key_file+'.tmp', key_file)
+
+    return pd.DataFrame(np.load(value_file), index=key['countries'], columns=key['columns'])
+
+
+# Function giving the yearly totals in GWh of our countries for a scenario
+# (Base, BaseEV, BaseHP or BaseEVHP), the countries of a group are added up
+def country_totals(table, codes, scenario='Base'):
+
+    totals = table['Total_'+scenario+'_GWh']
+    return pd.Series([totals.reindex(country_groups.get(code, [code])).sum(min_count=1) for code in codes],
+                     index=list(codes))
+
+
+# Function to make the hourly demand in GW (time, country) from a profile with
+# the same dimensions, every year of the profile is scaled to the yearly total
+# of the scenario. The profile can be in any unit, only its shape is used
+def hourly_demand(profile, table, scenario='Base'):
+
+    profile = profile.transpose('time', 'country')
+    totals = xr.DataArray(country_totals(table, profile.country.values, scenario).values, dims='country',
+                          coords=dict(country=profile.country))
+
+    # The share of every hour in its year, times the total of the year
+    share = profile / profile.groupby('time.year').sum(dim='time').sel(year=profile.time.dt.year).drop_vars('year')
+    demand = (share * totals).astype(np.float32).rename('demand')
+    demand.attrs.update(units='GW', scenario=scenario)
+
+    return demand
+
+
+# Function to store an hourly series (time, country) as numpy files that are
+# memory mapped when loaded again
+def save_hourly(da, cache_path, name):
+
+    os.makedirs(cache_path, exist_ok=True)
+    da = da.transpose('time', 'country')
+    atomic_save_array(os.path.join(cache_path, name+'_values.npy'), da.values)
+    atomic_save_array(os.path.join(cache_path, name+'_time.npy'), da.time.values)
+    with open(os.path.join(cache_path, name+'.json'), 'w') as file:
+        json.dump(dict(countries=[str(code) for code in da.country.values], attrs=da.attrs), file, indent=1)
+
+
+# Function to load a stored hourly series, mapped in memory
+def load_hourly(cache_path, name):
+
+    with open(os.path.join(cache_path, name+'.json')) as file:
+        key = json.load(file)
+
+    return xr.DataArray(np.load(os.path.join(cache_path, name+'_values.npy'), mmap_mode='r'), dims=('time', 'country'),
+                        coords=dict(time=np.load(os.path.join(cache_path, name+'_time.npy')), country=key['countries']),
+                        name=name, attrs=key['attrs'])
+
+
+# Function to put a series on another time axis by the calendar: every target
+# hour gets the value of the same month, day and hour in the series (the 29th of
+# February gets the 28th when the series has no leap day). This lines up e.g.
+# the 2016 inflow profiles with any year of the capacity factors
+def align_calendar(da, times):
+
+    # The calendar key of each hour, as one number
+    source = pd.DatetimeIndex(da.time.values)
+    target = pd.DatetimeIndex(times)
+    source_key = source.month.values * 10000 + source.day.values * 100 + source.hour.values
+    target_key = target.month.values * 10000 + target.day.values * 100 + target.hour.values
+
+    # Without a leap day the 28th of February is used
+    if not np.any((source.month == 2) & (source.day == 29)):
+        target_key = np.where(target_key // 100 == 229, target_key - 100, target_key)
+
+    # Find the hour of every target in the series, all at once
+    order = np.argsort(source_key, kind='stable')
+    position = np.clip(np.searchsorted(source_key[order], target_key), 0, len(order) - 1)
+    index = order[position]
+    if np.any(source_key[index] != target_key):
+        raise ValueError('Not all hours of the target are in the series')
+
+    return da.isel(time=index).assign_coords(time=np.asarray(times))
+
+
+# Function to join series (time, country) on their common hours and countries,
+# e.g. demand, capacity factors and inflows, into one dataset
+def join_series(**series):
+
+    aligned = xr.align(*[da.rename(name) for name, da in series.items()], join='inner')
+
+    return xr.merge(aligned)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 12:00
+
+Download manager for the C3S-SIS energy data, the requests are split per
+year/month/variable and run a few at a time, with retries and a state file
+so an interrupted download continues where it stopped
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import concurrent.futures
+import datetime as dt
+import os
+import random
+import shutil
+import time
+import traceback
+import urllib.parse
+import urllib.request
+from cf_manifest import load_manifest, save_manifest
+
+
+# The dataset of the C3S energy data
+dataset = 'sis-energy-derived-reanalysis'
+
+# The capacity factors that are downloaded
+variables = [
+        'solar_photovoltaic_power_generation',
+        'wind_power_generation_offshore',
+        'wind_power_generation_onshore',
+        ]
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to tell the terminal where we are
+def _notify(message):
+
+    print(dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')+' NOTIFY: '+message)
+
+
+# Function to split the download in pieces of one year, month and variable
+def split_pieces(years, months, variables=variables):
+
+    return [(str(year), month, variable) for year in years for month in months for variable in variables]
+
+
+# Function giving the key of a piece in the state file
+def piece_key(year, month, variable):
+
+    return year+month+'_'+variable
+
+
+# Function giving the file name of a piece
+def piece_file(file_path, aggregation, year, month, variable):
+
+    return os.path.join(file_path, 'C3S-SIS_'+aggregation+'_'+year+month+'_'+variable+'.zip')
+
+
+# Function giving the file name of the yearly downloads of before the split in
+# pieces, one zip with all variables and months of a year
+def yearly_file(file_path, aggregation, year):
+
+    return os.path.join(file_path, 'C3S-SIS_'+aggregation+'_'+year+'.zip')
+
+
+# Function giving the CDS request of a piece
+def piece_request(aggregation, year, month, variable):
+
+    return {
+        'format': 'zip',
+        'temporal_aggregation': 'hourly',
+        'energy_product_type': 'capacity_factor_ratio',
+        'variable': [variable],
+        'spatial_aggregation': aggregation,
+        'month': [month],
+        'year': year,
+        }
+
+
+# Transfer through the CDS API, a client per request as the client is not
+# meant to be shared between threads
+def cds_transfer(dataset, request, target):
+
+    import cdsapi
+    cdsapi.Client().retrieve(dataset, request, target)
+
+
+# Function making a transfer that gets the pieces from a plain web server, the
+# request is sent as query, this is used to test against a local server
+def url_transfer(base_url, timeout=60):
+
+    def transfer(dataset, request, target):
+        query = urllib.parse.urlencode({key: ','.join(value) if isinstance(value, list) else value
+                                        for key, value in request.items()})
+        with urllib.request.urlopen(base_url+'/'+dataset+'?'+query, timeout=timeout) as response:
+            with open(target, 'wb') as file:
+                shutil.copyfileobj(response, file)
+
+    return transfer
+
+
+# Function to get one piece, a failed transfer is retried after a wait that
+# doubles every time (with some random spread so the retries do not line up).
+# The piece is downloaded to a temporary file that replaces the target when done
+def fetch_piece(transfer, request, target, retries=5, backoff=30.):
+
+    for attempt in range(retries + 1):
+        try:
+            transfer(dataset, request, target+'.part')
+            os.replace(target+'.part', target)
+            return os.path.getsize(target)
+        except Exception:
+            if os.path.isfile(target+'.part'):
+                os.remove(target+'.part')
+            if attempt == retries:
+                raise
+            wait = backoff * 2**attempt * random.uniform(0.5, 1.5)
+            _notify('Retry {} of {} in {:.0f} s'.format(attempt + 1, os.path.basename(target), wait))
+            time.sleep(wait)
+
+
+# Function to check if a piece is done: in the state file and still on disk
+def piece_done(state, key, target):
+
+    return key in state and os.path.isfile(target) and os.path.getsize(target) == state[key]['size']
+
+
+# Function to download all pieces with at most in_flight requests at the same
+# time. The finished pieces are kept in the state file, pieces that are in it
+# and still on disk are skipped, as are the pieces of years that were downloaded
+# as one yearly zip before (these are kept in the state file as well). Any function transfer(dataset, request, target)
+# can do the transfer, by default the CDS API
+def download_all(pieces, file_path, aggregation='original_grid', transfer=cds_transfer, in_flight=4,
+                 retries=5, backoff=30., state_file=None):
+
+    # The state of earlier runs
+    if state_file is None:
+        state_file = os.path.join(file_path, 'download_state.json')
+    state = load_manifest(state_file)
+
+    # The pieces that still have to be done, a yearly zip holds all pieces of its year
+    todo = []
+    for year, month, variable in pieces:
+        yearly = yearly_file(file_path, aggregation, year)
+        if os.path.isfile(yearly):
+            if year not in state:
+                state[year] = dict(file=os.path.basename(yearly), size=os.path.getsize(yearly), yearly=True)
+                save_manifest(state, state_file)
+                _notify('Year '+year+' is complete in '+os.path.basename(yearly))
+            continue
+        key = piece_key(year, month, variable)
+        target = piece_file(file_path, aggregation, year, month, variable)
+        if piece_done(state, key, target):
+            continue
+        todo.append((key, target, piece_request(aggregation, year, month, variable)))
+    _notify('{} of {} pieces to download'.format(len(todo), len(pieces)))
+
+    # Run the requests on a pool of threads, the waiting is done by the server
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=in_flight) as pool:
+        futures = {pool.submit(fetch_piece, transfer, request, target, retries, backoff): (key, target)
+                   for key, target, request in todo}
+        for future in concurrent.futures.as_completed(futures):
+            key, target = futures[future]
+            try:
+                size = future.result()
+            except Exception:
+                _notify('Failed on '+key+'\n'+traceback.format_exc())
+                failed.append(key)
+                continue
+
+            # Keep track of the finished pieces, only this thread writes the state
+            state[key] = dict(file=os.path.basename(target), size=size,
+                              finished=dt.datetime.now().isoformat(timespec='seconds'))
+            save_manifest(state, state_file)
+            _notify('Finished with '+key)
+
+    _notify('{} pieces downloaded, {} failed'.format(len(todo) - len(failed), len(failed)))
+
+    return failed
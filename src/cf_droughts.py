@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 20:30
+
+Detection of energy droughts (Dunkelflaute) in the national capacity factor
+series: periods of several days with very low combined wind and solar output,
+optionally relative to the demand. All window lengths and countries are done
+at once with running sums
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import pandas as pd
+
+
+# The share of each capacity factor in the combined output
+default_mix = dict(solarCF=1/3, windCF_on=1/3, windCF_off=1/3)
+
+# The window lengths in days
+default_durations = list(range(1, 15))
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to make the daily energy index (time, country): the combined output
+# of the mix, divided by the demand relative to its mean when a demand is given
+def daily_index(ds, mix=default_mix, demand=None):
+
+    # The combined capacity factor of the mix
+    total = sum(mix.values())
+    combined = sum(ds[name] * (share / total) for name, share in mix.items())
+
+    # Relative to the demand, low output on a high demand day counts more
+    if demand is not None:
+        combined, demand = xr.align(combined, demand, join='inner')
+        combined = combined / (demand / demand.mean(dim='time'))
+
+    return combined.transpose('time', 'country').resample(time='1D').mean()
+
+
+# Function giving the mean of all windows (duration, start day, country) from
+# running sums, windows that run past the end or hold missing days are NaN
+def window_means(values, durations):
+
+    values = np.asarray(values, dtype=np.float64)
+    durations = np.asarray(durations)
+    steps = values.shape[0]
+
+    # The running sums of the values and of the missing days
+    missing = np.isnan(values)
+    running = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(np.where(missing, 0., values), axis=0)])
+    running_missing = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(missing, axis=0)])
+
+    # The sum of every window is the difference of two running sums
+    starts = np.arange(steps)
+    ends = np.minimum(starts[None, :] + durations[:, None], steps)
+    means = (running[ends] - running[starts][None]) / durations[:, None, None]
+
+    # Windows that are not complete
+    incomplete = (starts[None, :] + durations[:, None] > steps)[..., None] | (running_missing[ends] - running_missing[starts][None] > 0)
+    means[incomplete] = np.nan
+
+    return means
+
+
+# Function to find the runs of True along the last axis of a boolean array, for
+# all other positions at once. Gives the position of every run and its start
+# and end (exclusive) along the last axis
+def _runs(mask):
+
+    padded = np.zeros(mask.shape[:-1] + (mask.shape[-1] + 2,), dtype=np.int8)
+    padded[..., 1:-1] = mask
+    change = np.diff(padded, axis=-1)
+
+    # The starts and ends come in the same order, one of each per run
+    start = np.nonzero(change == 1)
+    end = np.nonzero(change == -1)
+
+    return start[:-1], start[-1], end[-1]
+
+
+# Function to detect the energy droughts of every country and window length. A
+# window is in drought below a fixed threshold of the index ('threshold', in the
+# unit of the index) or below a percentile (0 to 100) of all windows of the same
+# length in that country ('percentile'). Consecutive windows in drought form one
+# event, its severity is the largest deficit (limit minus window mean) times the
+# window length in days
+def detect_events(index, durations=default_durations, definition='percentile', percentile=5., threshold=None):
+
+    index = index.transpose('time', 'country')
+    durations = np.asarray(durations)
+    means = window_means(index.values, durations)
+
+    # The limit of every window length and country
+    if definition == 'threshold':
+        if threshold is None:
+            raise ValueError('The threshold definition needs a threshold')
+        limit = np.full((len(durations), 1, index.sizes['country']), float(threshold))
+    elif definition == 'percentile':
+        limit = np.nanpercentile(means, percentile, axis=1, keepdims=True)
+    else:
+        raise ValueError('Unknown drought definition '+definition)
+
+    # The windows in drought and their deficit, as (duration, country, start)
+    below = (means < limit).transpose(0, 2, 1)
+    deficit = np.where(below, (limit - means).transpose(0, 2, 1), 0.) * durations[:, None, None]
+
+    # The runs of windows in drought
+    (duration, country), first, last = _runs(below)
+
+    # The largest deficit of every run
+    flat = np.append(deficit.ravel(), 0.)
+    offset = (duration * below.shape[1] + country) * below.shape[2]
+    bounds = np.empty(2 * len(first), dtype=np.int64)
+    bounds[0::2] = offset + first
+    bounds[1::2] = offset + last
+    severity = np.maximum.reduceat(flat, bounds)[0::2] if len(first) > 0 else np.zeros(0)
+
+    # The table of events, an event ends with its last window
+    days = pd.DatetimeIndex(index.time.values)
+    events = pd.DataFrame(dict(
+            country = index.country.values[country],
+            duration_days = durations[duration],
+            start = days[first],
+            end = days[last - 1] + pd.to_timedelta(durations[duration], unit='D'),
+            severity = severity,
+            lowest_mean = limit[duration, 0, country] - severity / durations[duration],
+            limit = limit[duration, 0, country],
+            ))
+
+    return events.sort_values(['duration_days', 'start', 'country']).reset_index(drop=True)
+
+
+# Function to combine the events of the countries that overlap in time into
+# events over several countries, per window length
+def concurrent_events(events):
+
+    events = events.sort_values(['duration_days', 'start'])
+
+    # A new event starts when it begins after all earlier ones of the same length ended
+    end_so_far = events.groupby('duration_days')['end'].cummax()
+    previous_end = end_so_far.groupby(events['duration_days']).shift()
+    group = (previous_end.isnull() | (events['start'] >= previous_end)).cumsum()
+
+    combined = events.groupby(group).agg(
+            duration_days = ('duration_days', 'first'),
+            start = ('start', 'min'),
+            end = ('end', 'max'),
+            countries = ('country', lambda codes: ','.join(sorted(set(codes)))),
+            n_countries = ('country', 'nunique'),
+            severity = ('severity', 'sum'),
+            )
+
+    return combined.sort_values(['duration_days', 'start']).reset_index(drop=True)
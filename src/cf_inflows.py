@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 17:05
+
+Loader of the ScaledInflows country files in one (time x country x technology)
+array, cached as numpy files that are memory mapped and made again when one
+of the csv files changed
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import pandas as pd
+import scipy.signal
+import json
+import os
+from cf_countries import countries
+from cf_manifest import file_info, file_matches, atomic_save_array
+
+
+# The file of a country in the data folder
+inflow_pattern = os.path.join('ScaledInflows', '{code}', '1h', 'ScaledInflows_ProRes1_2050.csv')
+
+# The hydro technologies in the files: dams and pumped hydro
+technologies = ['HDAM', 'HPHS']
+
+# The format of the time stamps in the files
+stamp_format = '%m/%d/%Y %H:%M'
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to parse the time stamps of the files, these are M/D/YYYY H:MM with
+# and without leading zeros, so the numbers are split out of the text at once
+# instead of parsing every stamp on its own
+def parse_stamps(stamps):
+
+    parts = pd.Series(stamps).str.extract(r'^(\d{1,2})/(\d{1,2})/(\d{4}) (\d{1,2}):(\d{2})$')
+    if parts.isnull().values.any():
+        raise ValueError('Unknown time stamp '+str(np.asarray(stamps)[parts.isnull().any(axis=1).values][0]))
+    parts = parts.astype(np.int64).values
+
+    return pd.to_datetime(dict(year=parts[:, 2], month=parts[:, 0], day=parts[:, 1],
+                               hour=parts[:, 3], minute=parts[:, 4])).values
+
+
+# Function to read the csv files of all countries in one array
+def read_inflows(data_path, codes=countries):
+
+    values = None
+    stamps = None
+    for i, code in enumerate(codes):
+        table = pd.read_csv(os.path.join(data_path, inflow_pattern.format(code=code)), index_col=0)
+
+        # All files share the time axis, it is parsed once
+        if stamps is None:
+            stamps = table.index.values
+            values = np.empty((len(stamps), len(codes), len(technologies)), dtype=np.float32)
+        elif not np.array_equal(stamps, table.index.values):
+            raise ValueError('The time axis of '+code+' differs from that of '+codes[0])
+
+        values[:, i, :] = table[technologies].values
+
+    return parse_stamps(stamps), values
+
+
+# Function to load the inflows of all countries as (time, country, technology),
+# from the cache in cache_path when none of the csv files changed
+def load_inflows(data_path, cache_path, codes=countries):
+
+    # The files and the cache
+    files = [os.path.join(data_path, inflow_pattern.format(code=code)) for code in codes]
+    key_file = os.path.join(cache_path, 'ScaledInflows.json')
+    value_file = os.path.join(cache_path, 'ScaledInflows_values.npy')
+    time_file = os.path.join(cache_path, 'ScaledInflows_time.npy')
+
+    # Check the cache, the same countries and unchanged files
+    key = {}
+    if os.path.isfile(key_file):
+        with open(key_file) as file:
+            key = json.load(file)
+    current = (key.get('countries') == list(codes) and os.path.isfile(value_file) and os.path.isfile(time_file) and
+               all(file_matches(path, key['files'].get(path)) for path in files))
+
+    # Make the cache again
+    if not current:
+        times, values = read_inflows(data_path, codes)
+        os.makedirs(cache_path, exist_ok=True)
+        atomic_save_array(value_file, values)
+        atomic_save_array(time_file, times)
+        with open(key_file+'.tmp', 'w') as file:
+            json.dump(dict(countries=list(codes), technologies=technologies,
+                           files={path: file_info(path) for path in files}), file, indent=1)
+        os.replace(key_file+'.tmp', key_file)
+
+    # The cache is mapped in memory, nothing is read until it is used
+    return xr.DataArray(np.load(value_file, mmap_mode='r'), dims=('time', 'country', 'technology'), name='inflow',
+                        coords=dict(time=np.load(time_file), country=list(codes), technology=technologies))
+
+
+# Function to route an inflow (time, ...) through a linear reservoir with a time
+# constant in hours: out[t] = a out[t-1] + (1 - a) in[t] with a = exp(-1/k). The
+# whole series is filtered at once and the reservoir starts in balance with the
+# mean inflow of the first days
+def linear_reservoir(inflow, time_constant, spin_up=7 * 24):
+
+    inflow = np.asarray(inflow, dtype=np.float64)
+    if time_constant <= 0:
+        return inflow
+
+    a = np.exp(-1. / time_constant)
+    b_coef, a_coef = [1. - a], [1., -a]
+
+    # The state of the filter in balance with the first inflows
+    start = inflow[:spin_up].mean(axis=0)
+    state = scipy.signal.lfilter_zi(b_coef, a_coef)[:, None] * start.reshape(1, -1)
+    state = state.reshape((1,) + inflow.shape[1:])
+
+    routed, _ = scipy.signal.lfilter(b_coef, a_coef, inflow, axis=0, zi=state)
+
+    return routed
+
+
+# Function to write inflows (time, country, technology) as csv files in the
+# layout of ScaledInflows, one file per country in <out_path>/<CC>/1h/
+def write_inflow_tables(da, out_path, name):
+
+    stamps = pd.DatetimeIndex(da.time.values).strftime(stamp_format)
+    for code in da.country.values:
+        folder = os.path.join(out_path, str(code), '1h')
+        os.makedirs(folder, exist_ok=True)
+        table = pd.DataFrame(da.sel(country=code).transpose('time', 'technology').values,
+                             index=stamps, columns=list(da.technology.values))
+        table.to_csv(os.path.join(folder, name+'.csv'))
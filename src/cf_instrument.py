@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 11:10
+
+Timing and memory of the stages of the year/month jobs, written as JSON lines
+so a long run can be summarised afterwards
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import contextlib
+import datetime as dt
+import json
+import os
+import resource
+import time
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function giving the bytes this process read and wrote so far, from the
+# kernel counters where these are available (Linux)
+def _io_bytes():
+
+    try:
+        with open('/proc/self/io') as file:
+            counters = dict(line.split(':') for line in file if ':' in line)
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return 0, 0
+
+
+# Function giving the peak memory of this process so far in MiB, the kernel
+# only keeps the peak over the lifetime of the process
+def _peak_rss_mb():
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+
+# Function to write one record to the log, every record is one line so the
+# workers can all append to the same file
+def log_record(log_file, record):
+
+    if log_file is None:
+        return
+
+    with open(log_file, 'a') as file:
+        file.write(json.dumps(record)+'\n')
+
+
+# Context manager measuring one stage of a job: wall time, the cpu time of the
+# thread running the stage and of the whole process, bytes read and written by
+# the process and its peak memory. The peak is that of the process so far, the
+# growth of the peak during the stage tells what the stage added to it. The
+# labels (year, month, ...) are added to the record. With chunked data the work
+# happens in the threads of dask at the write, so that is where the time of the
+# calculations shows up, as process cpu time
+@contextlib.contextmanager
+def stage(log_file, name, **labels):
+
+    # The counters at the start
+    started = dt.datetime.now().isoformat(timespec='milliseconds')
+    read_start, written_start = _io_bytes()
+    peak_start = _peak_rss_mb()
+    cpu_start = time.thread_time()
+    process_cpu_start = time.process_time()
+    time_start = time.perf_counter()
+
+    status = 'done'
+    try:
+        yield
+    except Exception:
+        status = 'failed'
+        raise
+    finally:
+        read_end, written_end = _io_bytes()
+        peak_end = _peak_rss_mb()
+        log_record(log_file, dict(
+            labels,
+            stage = name,
+            status = status,
+            started = started,
+            wall_time = time.perf_counter() - time_start,
+            cpu_time = time.thread_time() - cpu_start,
+            process_cpu_time = time.process_time() - process_cpu_start,
+            bytes_read = read_end - read_start,
+            bytes_written = written_end - written_start,
+            process_peak_rss_mb = peak_end,
+            peak_growth_mb = peak_end - peak_start,
+            pid = os.getpid(),
+            ))
+
+
+# Function giving the current time in the form of the start of the records, to
+# select the records of a run with load_log
+def run_start():
+
+    return dt.datetime.now().isoformat(timespec='milliseconds')
+
+
+# Function to read the records of a log, only those of stages that started at
+# or after since when it is given
+def load_log(log_file, since=None):
+
+    records = []
+    if os.path.isfile(log_file):
+        with open(log_file) as file:
+            for line in file:
+                if line.strip():
+                    records.append(json.loads(line))
+
+    if since is not None:
+        records = [record for record in records if record['started'] >= since]
+
+    return records
+
+
+# Function to summarise a log: the time per stage over all jobs and the slowest
+# jobs, a job being all records with the same year and month. Stages inside
+# another stage have that stage as parent label, these are shown but not added
+# to the job totals, as their time is already in the parent
+def summarise(records, top=5):
+
+    # The totals per stage
+    stages = {}
+    for record in records:
+        total = stages.setdefault(record['stage'], dict(count=0, wall_time=0., cpu_time=0., process_cpu_time=0.,
+                                                        bytes_read=0, bytes_written=0, process_peak_rss_mb=0.,
+                                                        parent=record.get('parent')))
+        total['count'] += 1
+        for key in ['wall_time', 'cpu_time', 'process_cpu_time', 'bytes_read', 'bytes_written']:
+            total[key] += record[key]
+        total['process_peak_rss_mb'] = max(total['process_peak_rss_mb'], record['process_peak_rss_mb'])
+
+    # The totals per job
+    jobs = {}
+    for record in [record for record in records if record.get('parent') is None]:
+        job = jobs.setdefault((record.get('year'), record.get('month')), dict(wall_time=0., stages={}))
+        job['wall_time'] += record['wall_time']
+        job['stages'][record['stage']] = job['stages'].get(record['stage'], 0.) + record['wall_time']
+
+    slowest = sorted(jobs.items(), key=lambda item: item[1]['wall_time'], reverse=True)[:top]
+
+    return dict(stages=stages, slowest=[dict(year=year, month=month, **job) for (year, month), job in slowest])
+
+
+# Function to print the summary of a log, of the records since a start time
+# (see run_start) or of the whole log
+def print_summary(log_file, top=5, since=None):
+
+    summary = summarise(load_log(log_file, since), top)
+    wall_total = sum(total['wall_time'] for total in summary['stages'].values() if total['parent'] is None) or 1.
+
+    # The stages inside another stage are indented, their share is part of it
+    print(dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')+' NOTIFY: Time per stage')
+    for name, total in summary['stages'].items():
+        print('                 {:14s} {:10.1f} s ({:4.1f}%) cpu {:10.1f} s read {:8.2f} GiB written {:8.2f} GiB process peak {:8.1f} MiB'.format(
+            name if total['parent'] is None else '  '+name, total['wall_time'], 100 * total['wall_time'] / wall_total, total['cpu_time'],
+            total['bytes_read'] / 2**30, total['bytes_written'] / 2**30, total['process_peak_rss_mb']))
+
+    print(dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')+' NOTIFY: Slowest months')
+    for job in summary['slowest']:
+        slowest_stage = max(job['stages'], key=job['stages'].get)
+        print('                 {}{} {:10.1f} s, most in {} ({:.1f} s)'.format(
+            job['year'], job['month'], job['wall_time'], slowest_stage, job['stages'][slowest_stage]))
+
+    return summary
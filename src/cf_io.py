@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Sun 18 Oct 2026 13:40
+
+Loading and storing of the ERA5 fields and capacity factors
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+
+
+# Bytes per grid value that are in memory during the CF calculation of one
+# chunk: the ERA5 inputs, the derived windspeeds, the CF outputs and the
+# temporaries of the kernels, all as float32
+bytes_per_value = 4 * 24
+
+
+# The fields in the ERA5-EU monthly files
+era5_fields = ['u10', 'v10', 'u100', 'v100', 't2m', 'ssrd', 'msl', 'ro', 'sro']
+
+# The ERA5 fields each product reads and the fields it uses after cleaning the
+# units, only these are read and derived for a run
+products = dict(
+        # Solar after Jerez et al., 2015, the 10 meter wind cools the cells
+        solar_jerez = dict(inputs=['t2m', 'ssrd', 'u10', 'v10'], derived=['t2m', 'ssrd', 'wspd']),
+        # Solar after Bett & Thornton, 2016
+        solar_bett = dict(inputs=['t2m', 'ssrd'], derived=['t2m', 'ssrd']),
+        # Wind on- and offshore from the 100 meter wind
+        wind = dict(inputs=['u100', 'v100'], derived=['wspd100m']),
+        # The shear of the wind from the 10 and 100 meter wind
+        wind_shear = dict(inputs=['u10', 'v10', 'u100', 'v100'], derived=['wspd', 'wspd100m']),
+        # Runoff for the water resources
+        runoff = dict(inputs=['ro', 'sro'], derived=['ro', 'sro']),
+        # Mean sea level pressure
+        pressure = dict(inputs=['msl'], derived=['mpsl']),
+        )
+
+
+# The encoding profiles of the capacity factors in the output files. The CFs
+# are bounded by [0, maxCF], so packing them as int16 with a scale factor of
+# 1e-4 gives a round trip error of at most half the scale factor. The default
+# is plain float32, packing changes the dtype of the files and is opt-in
+encoding_profiles = dict(
+        # Plain float32 without compression
+        float = dict(dtype='float32', compression=None),
+        # Scaled int16 with zlib compression, chunked per month of 32x32 cells
+        packed = dict(dtype='int16', scale_factor=1e-4, compression='zlib', complevel=4,
+                      chunks=dict(time=744, latitude=32, longitude=32, cell_land=1024, cell_sea=1024)),
+        # Scaled int16 with zstd compression, needs netCDF4 >= 1.6 for netcdf output
+        packed_zstd = dict(dtype='int16', scale_factor=1e-4, compression='zstd', complevel=3,
+                           chunks=dict(time=744, latitude=32, longitude=32, cell_land=1024, cell_sea=1024)),
+        )
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to pick the chunk sizes that keep a job within the memory budget,
+# the spatial dimensions are kept whole as long as possible and the remaining
+# budget is used for the time dimension
+def pick_chunks(sizes, memory_budget, threads=1, time_dim='time'):
+
+    # The number of grid values one thread may handle at once
+    values = max(1, int(memory_budget // (bytes_per_value * threads)))
+
+    # Fill the chunks starting from the innermost spatial dimension
+    chunks = {}
+    for dim in reversed([dim for dim in sizes if dim != time_dim]):
+        chunks[dim] = max(1, min(sizes[dim], values))
+        values = values // chunks[dim]
+
+    # What is left goes to the time dimension
+    if time_dim in sizes:
+        chunks[time_dim] = max(1, min(sizes[time_dim], values))
+
+    return chunks
+
+
+# Function giving the ERA5 fields and derived fields of a list of products,
+# all fields when no products are given
+def product_fields(names=None):
+
+    if names is None:
+        names = list(products)
+
+    inputs = [field for field in era5_fields if any(field in products[name]['inputs'] for name in names)]
+    derived = sorted(set(field for name in names for field in products[name]['derived']))
+
+    return inputs, derived
+
+
+# Function to open an ERA5 month, lazily in chunks when a memory budget in
+# bytes is given and in memory otherwise. With a list of products only the
+# fields these products need are read
+def open_era5(data_file, memory_budget=None, threads=1, products=None):
+
+    # The fields that are not needed are never decoded
+    inputs, _ = product_fields(products)
+    drop = [field for field in era5_fields if field not in inputs]
+
+    # Open the file, no data is read yet
+    ds = xr.open_dataset(data_file, drop_variables=drop)
+
+    # Without a budget we keep the in memory behaviour
+    if memory_budget is None:
+        return ds
+
+    # Split the data in chunks that fit the budget
+    return ds.chunk(pick_chunks(dict(ds.sizes), memory_budget, threads))
+
+
+# Function to clean the units of the ERA5 fields, only the derived fields of
+# the products are made and the raw fields that are used up are dropped
+def clean_units(ds, products=None):
+
+    # The fields to make
+    inputs, derived = product_fields(products)
+
+    # Combine the u&v component for easiness
+    if 'wspd' in derived:
+        ds['wspd'] = np.sqrt(ds.u10**2 + ds.v10**2)
+        ds.wspd.attrs.update(long_name = '10 meter wind speed', units = 'm s**-1')
+    if 'wspd100m' in derived:
+        ds['wspd100m'] = np.sqrt(ds.u100**2 + ds.v100**2)
+        ds.wspd100m.attrs.update(long_name = '100 meter wind speed', units = 'm s**-1')
+
+    # Conversion to celsius
+    if 't2m' in derived:
+        ds['t2m'] = ds.t2m - 273.4
+        ds['t2m'].attrs.update(units = 'degree C')
+
+    # Setting windspeed in hPa
+    if 'mpsl' in derived:
+        ds['mpsl'] = ds.msl/1e2
+        ds.mpsl.attrs.update(units = 'hPa')
+
+    # Getting ssrd fixed in units
+    if 'ssrd' in derived:
+        ds['ssrd'] = ds.ssrd/3600.
+        ds['ssrd'].attrs.update(units = 'W m**-2')
+
+    # Drop the raw fields that are not used as such
+    return ds.drop_vars([field for field in inputs if field not in derived])
+
+
+# Function to make the chunks of a variable in the output, the chunks of the
+# profile but never larger than the data. Along the dimensions that dask splits
+# in several chunks the chunks of dask are used, so every dask chunk writes whole
+# chunks of the file and no chunk is written in parts (a file chunk that spans
+# two dask chunks would be compressed and written once for each of them)
+def _output_chunks(da, chunks):
+
+    sizes = []
+    for dim in da.dims:
+        size = min(chunks.get(dim, da.sizes[dim]), da.sizes[dim])
+        if da.chunks is not None and len(da.chunksizes[dim]) > 1:
+            size = da.chunksizes[dim][0]
+        sizes.append(size)
+
+    return tuple(sizes)
+
+
+# Function to make the encoding of the capacity factors for netcdf or zarr
+# output following one of the encoding profiles
+def cf_encoding(ds, variables, profile='float', backend='netcdf'):
+
+    # The settings of the profile
+    settings = encoding_profiles[profile]
+
+    encoding = {}
+    for name in variables:
+
+        # The data type, packed data also gets its scaling and fill value
+        var_encoding = dict(dtype=settings['dtype'])
+        if 'scale_factor' in settings:
+            var_encoding.update(scale_factor=settings['scale_factor'], add_offset=0.,
+                                _FillValue=np.iinfo(settings['dtype']).min)
+
+        # The chunks, never larger than the data itself
+        chunks = None
+        if 'chunks' in settings:
+            chunks = _output_chunks(ds[name], settings['chunks'])
+
+        # The chunks and compression for netcdf files
+        if backend == 'netcdf':
+            if chunks is not None:
+                var_encoding.update(chunksizes=chunks)
+            if settings['compression'] == 'zlib':
+                var_encoding.update(zlib=True, complevel=settings['complevel'], shuffle=True)
+            elif settings['compression'] is not None:
+                var_encoding.update(compression=settings['compression'], complevel=settings['complevel'], shuffle=True)
+
+        # The chunks and compression for a zarr store
+        elif backend == 'zarr':
+            if chunks is not None:
+                var_encoding.update(chunks=chunks)
+            # Zarr 3 fills chunks that were never written with the fill_value of
+            # the array, this has to be the missing value of the packing or they
+            # read as zero instead of missing
+            if '_FillValue' in var_encoding and _zarr_format() == 3:
+                var_encoding.update(fill_value=var_encoding['_FillValue'])
+            if settings['compression'] is not None:
+                import numcodecs
+                var_encoding.update(compressor=numcodecs.Blosc(cname=settings['compression'], clevel=settings['complevel'],
+                                                               shuffle=numcodecs.Blosc.SHUFFLE))
+
+        encoding[name] = var_encoding
+
+    return encoding
+
+
+# Function giving the format of the zarr stores that are written, zarr 3 makes
+# stores of format 3 by default
+def _zarr_format():
+
+    import zarr
+    return 3 if int(zarr.__version__.split('.')[0]) >= 3 else 2
+
+
+# Function to check that the missing values survive an encoding: where the array
+# has its own fill value (zarr 3) it should be the missing value of the packing,
+# otherwise chunks that were never written read as valid data. The encodings can
+# be those of cf_encoding or those of a stored array
+def check_fill_values(encoding):
+
+    for name, var_encoding in encoding.items():
+        if '_FillValue' not in var_encoding:
+            continue
+        # NaN is the missing value of float data, it is not equal to itself
+        fill_value = var_encoding.get('fill_value', var_encoding['_FillValue'])
+        both_nan = all(isinstance(value, (float, np.floating)) and np.isnan(value)
+                       for value in [fill_value, var_encoding['_FillValue']])
+        if fill_value != var_encoding['_FillValue'] and not both_nan:
+            raise ValueError('The fill value {} of {} is not its missing value {}, chunks that were never written would not read as missing'.format(
+                var_encoding['fill_value'], name, var_encoding['_FillValue']))
+
+
+# Function giving the largest round trip error an encoding profile allows
+def max_roundtrip_error(profile):
+
+    return encoding_profiles[profile].get('scale_factor', 0.) / 2
+
+
+# Function to check that the capacity factors survive the packing of a profile
+# within the guaranteed error, values outside the int16 range would not. With
+# the encoding the data is written with, its missing values are checked as well
+def check_roundtrip(ds, variables, profile, encoding=None):
+
+    # The missing values
+    if encoding is not None:
+        check_fill_values(encoding)
+
+    # The settings of the profile
+    settings = encoding_profiles[profile]
+    if 'scale_factor' not in settings:
+        return 0.
+
+    # The range that can be stored, the lowest value is the fill value
+    scale = settings['scale_factor']
+    info = np.iinfo(settings['dtype'])
+
+    error = 0.
+    for name in variables:
+
+        # Pack and unpack the data as xarray does when writing
+        data = np.asarray(ds[name].values)
+        packed = np.around(data / scale)
+        if np.nanmin(packed) <= info.min or np.nanmax(packed) > info.max:
+            raise ValueError(name+' does not fit in the range of the '+profile+' encoding')
+        error = max(error, float(np.nanmax(np.abs(packed * scale - data))))
+
+    # Allow for the float32 rounding of the unpacked values
+    if error > max_roundtrip_error(profile) + 4 * np.finfo(np.float32).eps:
+        raise ValueError('Round trip error {} of the {} encoding is too large'.format(error, profile))
+
+    return error
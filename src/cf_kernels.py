@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Sun 18 Oct 2026 10:12
+
+Capacity factor kernels shared by the ERA5 scripts
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import scipy.ndimage
+from cf_landsea import on_grid, at_cells, cell_coords
+
+
+# Number of values handled at once in the fused kernels, small enough for the
+# temporaries of one block to stay in cache
+block_size = 2**18
+
+
+#%%
+# =============================================================================
+# Helper functions
+# =============================================================================
+
+# Function to split an array shape in blocks along the leading (time) axis
+def _time_blocks(shape):
+
+    # Scalars are handled as a single block
+    if len(shape) == 0:
+        yield Ellipsis
+        return
+
+    # The number of values in one time step
+    step_size = int(np.prod(shape[1:]))
+
+    # The number of time steps handled per block
+    steps = max(1, block_size // max(1, step_size))
+
+    # Run over the blocks
+    for start in range(0, shape[0], steps):
+        yield slice(start, min(start + steps, shape[0]))
+
+
+# Function to bring a parameter in the layout of the data without time, a
+# parameter is a number, a field on a grid (latitude, longitude) or a field on
+# the cells of the data. Fields are matched to the data by their coordinates, so
+# a field on another grid or in another order is an error and not misplaced
+def _parameter(value, da):
+
+    # Numbers are used as they are
+    if not isinstance(value, xr.DataArray):
+        return value
+
+    # Fields on a grid are picked at the position of the cells, fields on the
+    # cells at the flat grid index of the cells
+    cell_dim = next((dim for dim in da.dims if dim.startswith('cell')), None)
+    if cell_dim is not None and cell_dim not in value.dims:
+        name_lat, name_lon = cell_coords(cell_dim)
+        if name_lat not in da.coords:
+            raise ValueError('The cells of the data have no latitude and longitude to pick the field at')
+        value = at_cells(value, da[name_lat].values, da[name_lon].values, cell_dim)
+    elif cell_dim is not None:
+        value = value.sel({cell_dim: da[cell_dim].values})
+
+    # Fields on a grid are put on the grid of the data
+    elif 'latitude' in value.dims or 'longitude' in value.dims:
+        value = on_grid(value, da.latitude.values, da.longitude.values)
+
+    # The values in the order of the dimensions of the data after time, missing
+    # dimensions get length one so they broadcast
+    spatial = [dim for dim in da.dims if dim != 'time']
+    value = value.transpose(*[dim for dim in spatial if dim in value.dims])
+
+    return np.asarray(value.values).reshape([value.sizes.get(dim, 1) for dim in spatial])
+
+
+# Function to evaluate a kernel lazily per chunk of the data, the fields of
+# parameters are chunked like the data so each chunk only gets its own part and
+# the chunks of the memory budget are kept. The kernel is called with the blocks
+# of the data and a dictionary with the parameters of the block
+def _map_chunks(kernel, data, params, **kwargs):
+
+    # The fields in the spatial layout and chunks of the data
+    da = data[0]
+    spatial = [dim for dim in da.dims if dim != 'time']
+    fields = [key for key, value in params.items() if np.ndim(value) > 0]
+    values = [xr.DataArray(np.broadcast_to(params[key], [da.sizes[dim] for dim in spatial]), dims=spatial)
+              .chunk({dim: da.chunksizes[dim] for dim in spatial}) for key in fields]
+
+    # Put the blocks of the fields back in the parameters
+    def chunk_kernel(*blocks):
+        return kernel(*blocks[:len(data)], {**params, **dict(zip(fields, blocks[len(data):]))})
+
+    return xr.apply_ufunc(chunk_kernel, *data, *values, dask='parallelized', output_dtypes=[np.float32], **kwargs)
+
+
+# Function to smooth the turbines of a result over space that ask for it, the
+# sigmas are the spatial smoothing of every turbine in cells (0 for none)
+def smooth_turbines(windCF, sigmas):
+
+    if not any(sigma > 0 for sigma in sigmas):
+        return windCF
+
+    return xr.concat([smooth_cells(windCF.isel(turbine=i), sigma) if sigma > 0 else windCF.isel(turbine=i)
+                      for i, sigma in enumerate(sigmas)], dim='turbine').rename(windCF.name)
+
+
+# Function giving a hashable key of a threshold, fields are known by identity
+def _threshold_key(value):
+
+    return float(value) if np.ndim(value) == 0 else id(value)
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to determine the solar capacity factor as from Jerez 2015, the
+# temperature coefficient gamma and the derate (share of the power delivered)
+# can be numbers or fields on the grid
+def solar_potential_jerez2015(ds, gamma=-0.005, derate=1.):
+
+    # The constant definitions
+    # Cell temperature constants in [degree C, unitless, degree C * m**2 /W, degree C *s/m
+    c = np.array([4.3, 0.943, 0.028, -1.528])
+    tref = 25  # Reference temperature in degree C
+    istd = 1000  # Standard solar panel performance benchmark in W/m**2
+
+    # Fields of parameters in the layout of the data
+    spatial = [dim for dim in ds.ssrd.dims if dim != 'time']
+    if isinstance(gamma, xr.DataArray):
+        gamma = xr.DataArray(_parameter(gamma, ds.ssrd), dims=spatial)
+    if isinstance(derate, xr.DataArray):
+        derate = xr.DataArray(_parameter(derate, ds.ssrd), dims=spatial)
+
+    # Zeorth step: Make a dataset
+    ds_temp = xr.Dataset()
+
+    # First step: calculate cell temperature
+    ds_temp['Tcell'] = c[0] + c[1]*ds.t2m + c[2]*ds.ssrd + c[3]*ds.wspd
+
+    # The second step: Performance ratio of the solar cells
+    ds_temp['solarPR'] = 1 + (ds_temp.Tcell - tref)*gamma
+
+    # The solar energy capcaity factor
+    ds_temp['solarCF'] = ds_temp.solarPR*ds.ssrd/istd*derate
+
+    # Force zero as minimal value
+    ds_temp['solarCF'] = ds_temp.solarCF.where(ds_temp.solarCF >= 0, 0)
+
+    return ds_temp.solarCF
+
+
+# Function to determine the solar capacity factor as from bett & thornton 2016
+# on numpy arrays in a single pass, night time values (no irradiance) are masked
+# before the logarithm so no NaN values have to be filled afterwards. The module
+# temperature at nominal operation (tnoct) and the derate are numbers or arrays
+# in the shape of the data without time
+def bett_kernel(t2m, ssrd, out=None, tnoct=48., derate=1.):
+
+    # The constant definitions
+    ALPHA = 4.20 * 10**(-3)  # K**-1
+    BETA = -4.60 * 10**(-3)  # K**-1
+    C1 = 0.033  # [no unit]
+    C2 = -0.092  # [no unit]
+    GSTC = 1000  # W m**-2
+    TSTC = 25  # degree C
+    T0 = 20  # degree C
+    G0 = 800  # W m**-2
+
+    # Make sure we work on arrays
+    t2m = np.asarray(t2m)
+    ssrd = np.asarray(ssrd)
+
+    # The output is stored as float32 in a preallocated array
+    if out is None:
+        out = np.empty(ssrd.shape, dtype=np.float32)
+
+    # The block calculations are done in the precision of the input
+    dtype = np.result_type(t2m.dtype, ssrd.dtype, np.float32)
+
+    # The parameters as arrays over the data without time
+    tnoct = np.asarray(tnoct, dtype=dtype)
+    derate = np.asarray(derate, dtype=dtype)
+
+    # Run over the blocks of the data
+    for block in _time_blocks(ssrd.shape):
+
+        # Only the cells with irradiance produce power
+        ssrd_block = np.asarray(ssrd[block], dtype=dtype)
+        day = ssrd_block > 0
+        irradiance = ssrd_block[day]
+        temperature = np.asarray(t2m[block], dtype=dtype)[day]
+
+        # The parameters of the cells with irradiance
+        TNOCT = np.broadcast_to(tnoct, ssrd_block.shape)[day] if tnoct.ndim > 0 else tnoct
+        DERATE = np.broadcast_to(derate, ssrd_block.shape)[day] if derate.ndim > 0 else derate
+
+        # first step is to combined calculation of module temperature and taking the difference between that and the STC conditions
+        DTmod = temperature + (TNOCT - T0)*irradiance/G0 - TSTC
+
+        # The logarithm of the reletive irradiance is needed twice
+        log_irradiance = np.log(irradiance/GSTC)
+
+        # In the second step the Reletive efficiency is calculated basedon an empirical law, where the derive irradience in taken into account
+        Nrel = (1 + ALPHA * DTmod) * (1 + C1*log_irradiance + C2*log_irradiance**2 + BETA*DTmod)
+
+        # In the final step the capacity factor is calculated based on the reletive efficiency and the STC irradience conditions
+        solarCF = DERATE * Nrel * irradiance / GSTC
+
+        # Force zero as minimal value, this also sets missing temperatures to zero
+        solarCF[~(solarCF >= 0)] = 0
+
+        # Store the block, with zero at night
+        out[block] = 0
+        out[block][day] = solarCF
+
+    return out
+
+
+# Function to determine the solar capacity factor as from bett & thornton 2016,
+# tnoct and derate can be numbers or fields on the grid
+def solar_potential_bett2016(ds, out=None, tnoct=48., derate=1.):
+
+    # Both inputs should be on the same grid
+    t2m, ssrd = xr.broadcast(ds.t2m, ds.ssrd)
+
+    # Chunked data is evaluated lazily per chunk
+    if ssrd.chunks is not None:
+        t2m = t2m.chunk(ssrd.chunksizes)
+        return _map_chunks(lambda t2m, ssrd, params: bett_kernel(t2m, ssrd, **params), [t2m, ssrd],
+                           dict(tnoct=_parameter(tnoct, ssrd), derate=_parameter(derate, ssrd))).rename('solarCF')
+
+    # Apply the fused kernel on the data
+    solarCF = bett_kernel(t2m.values, ssrd.values, out=out, tnoct=_parameter(tnoct, ssrd), derate=_parameter(derate, ssrd))
+
+    return xr.DataArray(solarCF, coords=ssrd.coords, dims=ssrd.dims, name='solarCF')
+
+
+# Function to determine the windpotential on a numpy array in a single pass
+# over the data, all regimes of the power curve are evaluated per block. The
+# turbine parameters are numbers or arrays in the shape of the data without time
+def wind_kernel(wspd, height, alpha, cut_in_wspd, cut_out_start, cut_out_end, rated_wspd, maxCF, out=None):
+
+    # Make sure we work on an array
+    wspd = np.asarray(wspd)
+
+    # The output is stored as float32 in a preallocated array
+    if out is None:
+        out = np.empty(wspd.shape, dtype=np.float32)
+
+    # The block calculations are done in the precision of the input
+    dtype = np.result_type(wspd.dtype, np.float32)
+
+    # Rescaling factor for the windspeed to the requested height
+    scale = (height / 100)**alpha
+
+    # Run over the blocks of the data
+    for block in _time_blocks(wspd.shape):
+
+        # Rescaling the windspeed to the requested height
+        wspd_height = np.multiply(wspd[block], scale, dtype=dtype)
+
+        # The windpotential without considering the information of the wind turbine
+        windCF = wspd_height**3
+        windCF -= cut_in_wspd**3
+        windCF /= (rated_wspd**3 - cut_in_wspd**3)
+        windCF *= maxCF
+
+        # Now we reduce the wind potential to 1 above the rated windspeed
+        np.copyto(windCF, maxCF, where=~(wspd_height <= rated_wspd))
+
+        # Now we set the wind potential to 0 below the cut-in windspeed
+        np.copyto(windCF, 0, where=~(wspd_height >= cut_in_wspd))
+
+        # Now we linearly reduce the wind potential above the cut-out windspeed,
+        # the ramp is only evaluated where it applies so no full block is made
+        ramp = ~(wspd_height <= cut_out_start)
+        np.subtract(cut_out_end, wspd_height, out=windCF, where=ramp)
+        np.divide(windCF, cut_out_end - cut_out_start, out=windCF, where=ramp)
+        np.multiply(windCF, maxCF, out=windCF, where=ramp)
+
+        # And set it to 0 above the end of the cut-out
+        np.copyto(windCF, 0, where=~(wspd_height <= cut_out_end))
+
+        # Store the block
+        out[block] = windCF
+
+    return out
+
+
+# Function to determine the windpotential (this is adjusted based on expert judgement),
+# the turbine parameters can be numbers or fields on the grid (latitude, longitude)
+# so e.g. the hub height or shear exponent differ per cell in one evaluation
+def wind_potential(wspd, height, alpha, cut_in_wspd, cut_out_start, cut_out_end, rated_wspd, maxCF, out=None):
+
+    # The parameters in the layout of the data
+    params = dict(height=height, alpha=alpha, cut_in_wspd=cut_in_wspd, cut_out_start=cut_out_start,
+                  cut_out_end=cut_out_end, rated_wspd=rated_wspd, maxCF=maxCF)
+    params = {key: _parameter(value, wspd) for key, value in params.items()}
+
+    # Chunked data is evaluated lazily per chunk
+    if wspd.chunks is not None:
+        return _map_chunks(lambda data, params: wind_kernel(data, **params), [wspd], params).rename('windCF')
+
+    # Apply the fused kernel on the data
+    windCF = wind_kernel(wspd.values, out=out, **params)
+
+    return xr.DataArray(windCF, coords=wspd.coords, dims=wspd.dims, name='windCF')
+
+
+# Function to determine the windpotential of several turbines at once on a
+# numpy array, the 100 meter windspeed and its cube are computed once per block
+# and every turbine is evaluated on them with its thresholds rescaled to 100
+# meter, so the results agree with wind_potential up to float rounding
+def wind_kernel_batch(wspd, turbines, out=None):
+
+    # Make sure we work on an array
+    wspd = np.asarray(wspd)
+
+    # The output is stored as float32 in a preallocated array with the turbines first
+    if out is None:
+        out = np.empty((len(turbines),) + wspd.shape, dtype=np.float32)
+
+    # The block calculations are done in the precision of the input
+    dtype = np.result_type(wspd.dtype, np.float32)
+
+    # Per turbine the power curve is written in terms of the 100 meter windspeed
+    curves = []
+    for turbine in turbines:
+
+        # Rescaling factor for the windspeed to the requested height
+        scale = (turbine['height'] / 100)**turbine['alpha']
+
+        # The shorthands for the turbine definitions
+        maxCF = turbine['maxCF']
+        cut_in3 = turbine['cut_in_wspd']**3
+        rated3 = turbine['rated_wspd']**3
+        cut_out_start = turbine['cut_out_start']
+        cut_out_end = turbine['cut_out_end']
+
+        curves.append(dict(
+            # The cubic part as factor times the cube of the 100 meter windspeed plus offset
+            cubic_factor = maxCF * scale**3 / (rated3 - cut_in3),
+            cubic_offset = -maxCF * cut_in3 / (rated3 - cut_in3),
+            # The linear cut-out ramp as offset plus factor times the 100 meter windspeed
+            ramp_offset = maxCF * cut_out_end / (cut_out_end - cut_out_start),
+            ramp_factor = -maxCF * scale / (cut_out_end - cut_out_start),
+            # The windspeed thresholds rescaled to 100 meter
+            cut_in_wspd = turbine['cut_in_wspd'] / scale,
+            rated_wspd = turbine['rated_wspd'] / scale,
+            cut_out_start = cut_out_start / scale,
+            cut_out_end = cut_out_end / scale,
+            maxCF = maxCF))
+
+    # Run over the blocks of the data
+    for block in _time_blocks(wspd.shape):
+
+        # The 100 meter windspeed and its cube, shared by all turbines
+        wspd_block = np.asarray(wspd[block], dtype=dtype)
+        wspd_cube = wspd_block**3
+
+        # Masks are shared between turbines with the same thresholds
+        masks = {}
+        for curve in curves:
+            for key in ['rated_wspd', 'cut_out_start', 'cut_out_end']:
+                if ('above', _threshold_key(curve[key])) not in masks:
+                    masks[('above', _threshold_key(curve[key]))] = ~(wspd_block <= curve[key])
+            if ('below', _threshold_key(curve['cut_in_wspd'])) not in masks:
+                masks[('below', _threshold_key(curve['cut_in_wspd']))] = ~(wspd_block >= curve['cut_in_wspd'])
+
+        # Work array for one turbine
+        windCF = np.empty(wspd_block.shape, dtype=dtype)
+
+        # Run over the turbines
+        for i, curve in enumerate(curves):
+
+            # The windpotential without considering the information of the wind turbine
+            np.multiply(wspd_cube, curve['cubic_factor'], out=windCF)
+            windCF += curve['cubic_offset']
+
+            # Now we reduce the wind potential to 1 above the rated windspeed
+            np.copyto(windCF, curve['maxCF'], where=masks[('above', _threshold_key(curve['rated_wspd']))])
+
+            # Now we set the wind potential to 0 below the cut-in windspeed
+            np.copyto(windCF, 0, where=masks[('below', _threshold_key(curve['cut_in_wspd']))])
+
+            # Now we linearly reduce the wind potential above the cut-out windspeed,
+            # only evaluated where the ramp applies
+            ramp = masks[('above', _threshold_key(curve['cut_out_start']))]
+            np.multiply(wspd_block, curve['ramp_factor'], out=windCF, where=ramp)
+            np.add(windCF, curve['ramp_offset'], out=windCF, where=ramp)
+
+            # And set it to 0 above the end of the cut-out
+            np.copyto(windCF, 0, where=masks[('above', _threshold_key(curve['cut_out_end']))])
+
+            # Store the block
+            out[i][block] = windCF
+
+    return out
+
+
+# Function to determine the windpotential of a list of turbines, the turbines
+# are dictionaries with the arguments of wind_potential and optionally a name
+# and a spatial smoothing in cells (see smooth_cells), the parameters can be
+# numbers or fields on the grid
+def wind_potential_batch(wspd, turbines, out=None):
+
+    # The turbine names are used as coordinate
+    names = [turbine.get('name', str(i)) for i, turbine in enumerate(turbines)]
+
+    # The spatial smoothing of every turbine
+    sigmas = [turbine.get('spatial_sigma', 0) for turbine in turbines]
+
+    # The parameters in the layout of the data
+    turbines = [{key: _parameter(value, wspd) for key, value in turbine.items() if key not in ['name', 'spatial_sigma']}
+                for turbine in turbines]
+
+    # Chunked data is evaluated lazily per chunk, the turbines come out as last
+    # dimension of each chunk and are moved to the front afterwards
+    if wspd.chunks is not None:
+        params = {(i, key): value for i, turbine in enumerate(turbines) for key, value in turbine.items()}
+        kernel = lambda data, params: np.moveaxis(wind_kernel_batch(data, [{key: params[(i, key)] for key in turbine}
+                                                                           for i, turbine in enumerate(turbines)]), 0, -1)
+        windCF = _map_chunks(kernel, [wspd], params, output_core_dims=[['turbine']],
+                             dask_gufunc_kwargs=dict(output_sizes={'turbine': len(turbines)}))
+        return smooth_turbines(windCF.transpose('turbine', *wspd.dims).rename('windCF').assign_coords(turbine=names), sigmas)
+
+    # Apply the batch kernel on the data
+    windCF = wind_kernel_batch(wspd.values, turbines, out=out)
+    windCF = xr.DataArray(windCF, coords=wspd.coords, dims=('turbine',) + wspd.dims, name='windCF').assign_coords(turbine=names)
+
+    return smooth_turbines(windCF, sigmas)
+
+
+# Function to determine the shear exponent of the wind profile per cell from the
+# 10 and 100 meter windspeed, using their means over time so the calm hours do
+# not dominate: alpha = ln(mean wspd100m / mean wspd) / ln(100 / 10). The result
+# can be used as field of alpha in wind_potential and wind_potential_batch
+def shear_exponent(wspd, wspd100m, dim='time', bounds=(0., 0.6)):
+
+    alpha = np.log(wspd100m.mean(dim=dim) / wspd.mean(dim=dim)) / np.log(100. / 10.)
+
+    return alpha.clip(*bounds).rename('alpha')
+
+
+# Function to smooth fields on a numpy array over the last two (spatial) axes
+# with a normal distribution of sigma cells, every time step on its own. Missing
+# cells get no weight, so the smoothing is renormalised over the valid cells
+# around a cell and missing cells stay missing
+def smooth_kernel(data, sigma, out=None):
+
+    # Make sure we work on an array
+    data = np.asarray(data)
+
+    # The output is stored as float32 in a preallocated array
+    if out is None:
+        out = np.empty(data.shape, dtype=np.float32)
+
+    # Only the spatial axes are smoothed
+    sigmas = (0,) * (data.ndim - 2) + (sigma, sigma)
+
+    # Run over the blocks of the data
+    for block in _time_blocks(data.shape):
+
+        # The smoothed values and the smoothed weight of the valid cells
+        values = np.asarray(data[block], dtype=np.float32)
+        valid = ~np.isnan(values)
+        total = scipy.ndimage.gaussian_filter(np.where(valid, values, 0), sigmas, mode='constant')
+        weight = scipy.ndimage.gaussian_filter(valid.astype(np.float32), sigmas, mode='constant')
+
+        # Store the block, renormalised over the valid cells
+        out[block] = np.where(valid, total / np.maximum(weight, np.finfo(np.float32).tiny), np.nan)
+
+    return out
+
+
+# Function to smooth a capacity factor over the neighbouring cells, for the
+# spread of the turbines over the cells around a site. Sigma is the standard
+# deviation of the normal distribution in cells along latitude and longitude,
+# the spatial dimensions are taken whole in every chunk. The sparse cells have no
+# neighbours, so they can not be smoothed
+def smooth_cells(da, sigma, dims=('latitude', 'longitude')):
+
+    if not all(dim in da.dims for dim in dims):
+        raise ValueError('Spatial smoothing needs the dimensions '+', '.join(dims)+' of the grid, '+str(da.name)+' has '+
+                         ', '.join(da.dims))
+
+    smoothed = xr.apply_ufunc(smooth_kernel, da, sigma, input_core_dims=[list(dims), []], output_core_dims=[list(dims)],
+                              dask='parallelized', output_dtypes=[np.float32], dask_gufunc_kwargs=dict(allow_rechunk=True))
+
+    return smoothed.transpose(*da.dims).rename(da.name)
+
+
+# Function to evaluate tabulated power curves on a numpy array of 100 meter
+# windspeeds, the curves are given as lookup table (curve, bucket) on buckets of
+# step m/s of the 100 meter windspeed (see cf_power_curves.build_lut). The bucket
+# of every value is found once per block, after that each curve is one gather
+def curve_kernel_batch(wspd, lut, step, out=None):
+
+    # Make sure we work on arrays
+    wspd = np.asarray(wspd)
+    lut = np.asarray(lut, dtype=np.float32)
+
+    # The output is stored as float32 in a preallocated array with the curves first
+    if out is None:
+        out = np.empty((lut.shape[0],) + wspd.shape, dtype=np.float32)
+
+    # Run over the blocks of the data
+    for block in _time_blocks(wspd.shape):
+
+        # The nearest bucket, windspeeds above the table get the last bucket
+        wspd_block = np.asarray(wspd[block], dtype=np.float32)
+        missing = np.isnan(wspd_block)
+        bucket = np.rint(np.where(missing, 0, wspd_block) / step)
+        bucket = np.minimum(bucket, lut.shape[1] - 1).astype(np.intp)
+
+        # One gather per curve, missing windspeeds stay missing
+        for i in range(lut.shape[0]):
+            windCF = lut[i].take(bucket)
+            windCF[missing] = np.nan
+            out[i][block] = windCF
+
+    return out
+
+
+# Function to determine the windpotential of tabulated power curves, the
+# lookup table has a row per curve with the given names
+def curve_potential_batch(wspd, lut, step, names, out=None):
+
+    # Chunked data is evaluated lazily per chunk, the curves come out as last
+    # dimension of each chunk and are moved to the front afterwards
+    if wspd.chunks is not None:
+        windCF = xr.apply_ufunc(lambda data: np.moveaxis(curve_kernel_batch(data, lut, step), 0, -1), wspd,
+                                dask='parallelized', output_dtypes=[np.float32], output_core_dims=[['turbine']],
+                                dask_gufunc_kwargs=dict(output_sizes={'turbine': len(names)}))
+        return windCF.transpose('turbine', *wspd.dims).rename('windCF').assign_coords(turbine=list(names))
+
+    # Apply the lookup kernel on the data
+    windCF = curve_kernel_batch(wspd.values, lut, step, out=out)
+
+    return xr.DataArray(windCF, coords=wspd.coords, dims=('turbine',) + wspd.dims, name='windCF').assign_coords(turbine=list(names))
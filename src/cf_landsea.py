@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Sun 18 Oct 2026 17:20
+
+Land and sea cells from the land-sea mask, to compute the capacity factors
+only where the technology can be built
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+
+
+# Tolerance in degrees when the coordinates of two grids are matched
+grid_tolerance = 1e-3
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to grow a mask with a number of grid cells in all directions
+def _grow(mask, cells):
+
+    for _ in range(cells):
+        padded = np.pad(mask, 1, mode='constant', constant_values=False)
+        grown = np.zeros_like(mask)
+        for i in range(3):
+            for j in range(3):
+                grown |= padded[i:i + mask.shape[0], j:j + mask.shape[1]]
+        mask = grown
+
+    return mask
+
+
+# Function giving the position of target coordinates along a coordinate of a
+# field, matched within the tolerance. A target that is not there is an error
+def _grid_index(da, name, target, tolerance=grid_tolerance):
+
+    index = da.indexes[name].get_indexer(np.asarray(target), method='nearest', tolerance=tolerance)
+    if np.any(index < 0):
+        raise ValueError('The '+name+' of '+str(da.name or 'the field')+' does not match the grid of the data')
+
+    return index
+
+
+# Function to put a field on the grid (latitude, longitude) of the data, the
+# coordinates are matched within the tolerance in any order (e.g. ascending or
+# descending latitude). A field that does not cover the grid is an error
+def on_grid(da, latitude, longitude, tolerance=grid_tolerance):
+
+    da = da.isel(latitude=_grid_index(da, 'latitude', latitude, tolerance),
+                 longitude=_grid_index(da, 'longitude', longitude, tolerance))
+
+    return da.assign_coords(latitude=np.asarray(latitude), longitude=np.asarray(longitude))
+
+
+# Function to pick a field on a grid at the cells of the data, given by the
+# latitude and longitude of every cell. A cell that is not on the grid of the
+# field is an error
+def at_cells(da, latitude, longitude, cell_dim='cell', tolerance=grid_tolerance):
+
+    index_lat = xr.DataArray(_grid_index(da, 'latitude', latitude, tolerance), dims=cell_dim)
+    index_lon = xr.DataArray(_grid_index(da, 'longitude', longitude, tolerance), dims=cell_dim)
+
+    return da.isel(latitude=index_lat, longitude=index_lon).drop_vars(['latitude', 'longitude'])
+
+
+# Function to read the land and sea cells from a land-sea mask file, with a
+# coastal buffer the cells near the coast are in both the land and the sea set.
+# The mask is put on the grid of the data, as the flat index of the cells is
+# only valid on that grid
+def land_sea_cells(lsm_file, latitude, longitude, variable='lsm', threshold=0.5, coastal_buffer=0):
+
+    # Read the mask, files made with cdo use lon and lat as names
+    with xr.open_dataset(lsm_file) as ds:
+        ds = ds.rename({name: new for name, new in [('lon', 'longitude'), ('lat', 'latitude')] if name in ds.dims})
+        lsm = ds[variable].squeeze(drop=True).transpose('latitude', 'longitude').load()
+    lsm = on_grid(lsm, latitude, longitude)
+
+    # The land cells, missing values are neither land nor sea
+    land = lsm.values >= threshold
+    sea = lsm.values < threshold
+
+    # Add the coastal buffer
+    land = _grow(land, coastal_buffer)
+    sea = _grow(sea, coastal_buffer)
+
+    return xr.Dataset(dict(land=(('latitude', 'longitude'), land), sea=(('latitude', 'longitude'), sea)),
+                      coords=dict(latitude=lsm.latitude, longitude=lsm.longitude))
+
+
+# Function giving the names of the coordinates with the latitude and longitude
+# of every cell along a cell dimension
+def cell_coords(cell_dim):
+
+    return cell_dim+'_latitude', cell_dim+'_longitude'
+
+
+# Function to select the cells of a mask from a gridded field, the result has
+# a cell dimension with the flat grid index of each cell as coordinate and the
+# latitude and longitude of each cell. Chunked data stays chunked
+def to_cells(da, mask, cell_dim='cell'):
+
+    # The mask has to be on the grid of the field
+    if not (np.array_equal(mask.latitude.values, da.latitude.values) and
+            np.array_equal(mask.longitude.values, da.longitude.values)):
+        raise ValueError('The mask is not on the grid of '+str(da.name))
+
+    # The flat index of the cells in the grid
+    index = np.flatnonzero(mask.transpose('latitude', 'longitude').values)
+
+    # Pick the cells from the flattened grid
+    flat = da.stack({cell_dim: ('latitude', 'longitude')}).isel({cell_dim: index})
+    latitude, longitude = flat.latitude.values, flat.longitude.values
+    flat = flat.drop_vars([cell_dim, 'latitude', 'longitude'])
+
+    # The flat index and the position of the cells as coordinates
+    name_lat, name_lon = cell_coords(cell_dim)
+    return flat.assign_coords({cell_dim: index, name_lat: (cell_dim, latitude), name_lon: (cell_dim, longitude)})
+
+
+# Function to select the cells of a mask from all variables of a dataset
+def dataset_to_cells(ds, mask, cell_dim='cell'):
+
+    return xr.Dataset({name: to_cells(ds[name], mask, cell_dim) for name in ds.data_vars})
+
+
+# Function giving the grid coordinates that are stored with data on cells, the
+# grid of the flat cell index is needed to put the cells back on the grid
+def grid_coords(latitude, longitude):
+
+    return dict(grid_latitude=('grid_latitude', np.asarray(latitude)),
+                grid_longitude=('grid_longitude', np.asarray(longitude)))
+
+
+# Function giving the grid (latitude, longitude) of a dataset, on the grid or
+# on cells with the grid coordinates
+def dataset_grid(ds):
+
+    if 'grid_latitude' in ds.coords:
+        return ds.grid_latitude.values, ds.grid_longitude.values
+
+    return ds.latitude.values, ds.longitude.values
+
+
+# Function to put the cells back on the grid, with NaN for the other cells
+def to_grid(da, latitude, longitude, cell_dim='cell'):
+
+    # The shape of the data on the grid
+    lead = [dim for dim in da.dims if dim != cell_dim]
+    da = da.transpose(*lead, cell_dim)
+    values = np.full(da.shape[:-1] + (len(latitude) * len(longitude),), np.nan, dtype=da.dtype if da.dtype.kind == 'f' else np.float32)
+
+    # Fill the cells at their flat index
+    values[..., da[cell_dim].values] = da.values
+
+    coords = {name: coord for name, coord in da.coords.items() if cell_dim not in coord.dims}
+    coords.update(latitude=np.asarray(latitude), longitude=np.asarray(longitude))
+
+    return xr.DataArray(values.reshape(da.shape[:-1] + (len(latitude), len(longitude))),
+                        dims=tuple(lead) + ('latitude', 'longitude'), coords=coords, name=da.name, attrs=da.attrs)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Sun 18 Oct 2026 15:10
+
+Atomic writes and the output manifest that makes runs resumable, files are
+known by size and modification time and optionally by their sha256 checksum
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import numpy as np
+import hashlib
+import json
+import os
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to determine the sha256 checksum of a file, read in blocks
+def file_hash(path, block=2**24):
+
+    checksum = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for data in iter(lambda: file.read(block), b''):
+            checksum.update(data)
+
+    return checksum.hexdigest()
+
+
+# Function to describe a file by size and modification time, with checksum the
+# sha256 is added so a touched file can be recognised later. Hashing reads the
+# whole file, so the checksum of a known description is reused when size and
+# time did not change
+def file_info(path, known=None, checksum=False):
+
+    stat = os.stat(path)
+    info = dict(size=stat.st_size, mtime=stat.st_mtime)
+    if not checksum:
+        return info
+
+    if known is not None and 'sha256' in known and known.get('size') == info['size'] and known.get('mtime') == info['mtime']:
+        info['sha256'] = known['sha256']
+    else:
+        info['sha256'] = file_hash(path)
+
+    return info
+
+
+# Function to check if a file still matches its description, a file that was
+# only touched is recognised by its checksum if the description has one. The
+# file is only hashed when its time changed
+def file_matches(path, known):
+
+    # Files that are gone or changed in size are never the same
+    if known is None or not os.path.isfile(path) or os.path.getsize(path) != known['size']:
+        return False
+
+    # Same time means unchanged, otherwise compare the content
+    if os.path.getmtime(path) == known['mtime']:
+        return True
+
+    return 'sha256' in known and file_hash(path) == known['sha256']
+
+
+# Function to bring parameters in the form they have in the manifest
+def normalise(params):
+
+    return json.loads(json.dumps(params, sort_keys=True))
+
+
+# Function to load the manifest, an empty manifest if there is none yet
+def load_manifest(path):
+
+    if not os.path.isfile(path):
+        return {}
+
+    with open(path) as file:
+        return json.load(file)
+
+
+# Function to write a json file atomically
+def save_manifest(manifest, path):
+
+    with open(path+'.tmp', 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(path+'.tmp', path)
+
+
+# Function to write a dataset to netcdf atomically, a killed job leaves at
+# most a temporary file behind and never a truncated output
+def atomic_to_netcdf(ds, path, **kwargs):
+
+    ds.to_netcdf(path+'.tmp', **kwargs)
+    os.replace(path+'.tmp', path)
+
+
+# Function to write a numpy array atomically, the file can later be memory
+# mapped with np.load(path, mmap_mode='r')
+def atomic_save_array(path, array):
+
+    with open(path+'.tmp', 'wb') as file:
+        np.save(file, array)
+    os.replace(path+'.tmp', path)
+
+
+# Function to make the manifest entry of a finished job, by default the files
+# are known by size and time, with checksum also by their sha256
+def manifest_entry(inputs, params, outputs, known=None, checksum=False):
+
+    # Reuse the checksums of the previous entry where possible
+    known = known or {}
+
+    return dict(
+        inputs = {path: file_info(path, known.get('inputs', {}).get(path), checksum) for path in inputs},
+        params = normalise(params),
+        outputs = {path: file_info(path, checksum=checksum) for path in outputs},
+        )
+
+
+# Function to check if a job is still up to date: same parameters, unchanged
+# inputs and outputs that are still there as written
+def is_current(entry, inputs, params, outputs):
+
+    # Jobs that never finished are not current
+    if entry is None or entry['params'] != normalise(params):
+        return False
+
+    # The same inputs and outputs should be there
+    if sorted(entry['inputs']) != sorted(inputs) or sorted(entry['outputs']) != sorted(outputs):
+        return False
+
+    return (all(file_matches(path, entry['inputs'][path]) for path in inputs) and
+            all(file_matches(path, entry['outputs'][path]) for path in outputs))
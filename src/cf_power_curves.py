@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 21:45
+
+Library of tabulated wind turbine power curves (hub height windspeed to
+capacity factor), evaluated on the 100 meter windspeed with one shared lookup
+table so every extra curve costs one gather over the grid. The curves can be
+smoothed over the windspeed and the capacity factors over the neighbouring cells
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import numpy as np
+import pandas as pd
+from cf_kernels import curve_potential_batch, smooth_turbines
+
+
+# Width of the buckets of the lookup table in m/s of the 100 meter windspeed,
+# with the nearest bucket the windspeed is off by at most half of this
+lut_step = 0.01
+
+# Highest 100 meter windspeed in the lookup table, above it the last value is used
+lut_max_wspd = 50.
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to tabulate the idealised power curve of wind_potential: cubic
+# between cut-in and rated windspeed and a linear or cubic reduction between
+# the start and end of the cut-out
+def idealised_curve(cut_in_wspd=3.0, rated_wspd=11.0, cut_out_start=20.0, cut_out_end=25.0, maxCF=1.,
+                    cut_out='linear', step=0.05):
+
+    speeds = np.arange(0, cut_out_end + 2 * step, step)
+
+    power = maxCF * (speeds**3 - cut_in_wspd**3) / (rated_wspd**3 - cut_in_wspd**3)
+    power[speeds > rated_wspd] = maxCF
+    power[speeds < cut_in_wspd] = 0
+    ramp = speeds > cut_out_start
+    if cut_out == 'linear':
+        power[ramp] = maxCF * (cut_out_end - speeds[ramp]) / (cut_out_end - cut_out_start)
+    elif cut_out == 'cubic':
+        power[ramp] = maxCF * (cut_out_end**3 - speeds[ramp]**3) / (cut_out_end**3 - cut_out_start**3)
+    else:
+        raise ValueError('Unknown cut-out '+cut_out)
+    power[speeds > cut_out_end] = 0
+
+    return speeds, power
+
+
+# Function to load power curves from a csv file with the hub height windspeed
+# in m/s in the first column and the normalised power (0 to 1) of a turbine per
+# column, e.g. manufacturer curves divided by the rated power
+def load_power_curves(csv_file):
+
+    table = pd.read_csv(csv_file, index_col=0).sort_index()
+    speeds = table.index.values.astype(np.float64)
+
+    return {name: (speeds, table[name].values.astype(np.float64)) for name in table.columns}
+
+
+# Function to smooth a power curve with a normal distribution of the windspeed
+# with standard deviation sigma in m/s, for the spread of the windspeed over
+# the turbines in a grid cell. This smooths the curve itself, the smoothing over
+# the neighbouring cells is done on the capacity factors (see curve_potential)
+def smooth_curve(speeds, power, sigma, step=0.05):
+
+    # The curve on a regular grid, wide enough for the tails of the distribution
+    grid = np.arange(0, speeds[-1] + 4 * sigma + step, step)
+    values = np.interp(grid, speeds, power, left=0., right=0.)
+    if sigma <= 0:
+        return grid, values
+
+    # The weights of the normal distribution
+    offsets = np.arange(-int(4 * sigma / step), int(4 * sigma / step) + 1) * step
+    weights = np.exp(-0.5 * (offsets / sigma)**2)
+    weights /= weights.sum()
+
+    # The expected power at every windspeed, below zero the curve is zero
+    padded = np.concatenate([np.zeros(len(offsets) // 2), values, np.zeros(len(offsets) // 2)])
+
+    return grid, np.convolve(padded, weights, mode='valid')
+
+
+# Function to build the lookup table (curve, bucket) on the 100 meter windspeed.
+# The curves are dictionaries with the windspeeds and power of the curve, the hub
+# height and shear exponent to scale the 100 meter windspeed, and optionally a
+# loss factor (the share of the power that is delivered) and the windspeed
+# spread wspd_sigma in m/s of smooth_curve
+def build_lut(curves, step=lut_step, max_wspd=lut_max_wspd):
+
+    # The 100 meter windspeed of every bucket
+    wspd = np.arange(0, max_wspd + step / 2, step)
+
+    lut = np.empty((len(curves), len(wspd)), dtype=np.float32)
+    for i, curve in enumerate(curves):
+
+        # The curve with its smoothing
+        speeds, power = curve['speeds'], curve['power']
+        if curve.get('wspd_sigma', 0) > 0:
+            speeds, power = smooth_curve(speeds, power, curve['wspd_sigma'])
+
+        # The hub height windspeed of every bucket
+        scale = (curve['height'] / 100)**curve['alpha']
+        lut[i] = np.interp(wspd * scale, speeds, power, left=0., right=0.) * curve.get('loss', 1.)
+
+    return lut
+
+
+# Function to determine the capacity factors of a list of curves on the 100
+# meter windspeed, the names of the curves are used as turbine coordinate. The
+# capacity factors of curves with a spatial_sigma are smoothed over that many
+# cells around every cell (see cf_kernels.smooth_cells)
+def curve_potential(wspd, curves, step=lut_step, max_wspd=lut_max_wspd, out=None):
+
+    names = [curve.get('name', str(i)) for i, curve in enumerate(curves)]
+    windCF = curve_potential_batch(wspd, build_lut(curves, step, max_wspd), step, names, out=out)
+
+    return smooth_turbines(windCF, [curve.get('spatial_sigma', 0) for curve in curves])
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Sun 18 Oct 2026 14:25
+
+Scheduler running the year/month jobs of the ERA5 scripts on a process pool
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import concurrent.futures
+import datetime as dt
+import time
+import traceback
+
+
+# The months of the year as used in the file names
+months = ['01', '02', '03', '04', '05', '06', '07', '08', '09', '10', '11', '12']
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to expand a range of years (both included) in year/month jobs
+def expand_jobs(first_year, last_year, months=months):
+
+    return [(str(year), month) for year in range(int(first_year), int(last_year) + 1) for month in months]
+
+
+# Function that runs one job and measures its wall time, this is what the
+# workers of the pool execute
+def _timed(task, year, month):
+
+    time_start = time.perf_counter()
+    result = task(year, month)
+
+    return result, time.perf_counter() - time_start
+
+
+# Function to tell the terminal where we are
+def _notify(message):
+
+    print(dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')+' NOTIFY: '+message)
+
+
+# Function to run independent tasks (functions without arguments) on a pool of
+# threads and give the result of each, numpy releases the GIL in its array
+# operations so tasks on large arrays really run at the same time
+def run_threads(tasks, threads=1):
+
+    # Run in this thread
+    if threads == 1:
+        return {name: task() for name, task in tasks.items()}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = {name: pool.submit(task) for name, task in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+# Function to run the jobs on a pool of worker processes, jobs for which
+# is_done(year, month) is True are skipped, with one worker the jobs run in
+# this process so the scripts can still be debugged in Spyder. The result of
+# each finished job is handed to on_done(year, month, result) in this process
+def run_jobs(task, jobs, workers=1, is_done=None, on_done=None):
+
+    # The report of all jobs
+    report = []
+
+    # Check which jobs still have to be done
+    todo = []
+    for year, month in jobs:
+        if is_done is not None and is_done(year, month):
+            _notify('Allready applied for year '+year+month+'!')
+            report.append(dict(year=year, month=month, status='skipped', wall_time=0.))
+        else:
+            todo.append((year, month))
+
+    # Function to add a finished job to the report
+    def finish(year, month, future):
+        try:
+            result, wall_time = future.result()
+            if on_done is not None:
+                on_done(year, month, result)
+            _notify('Finished with '+year+month+' in {:.1f} s'.format(wall_time))
+            report.append(dict(year=year, month=month, status='done', wall_time=wall_time, result=result))
+        except Exception:
+            _notify('Failed on '+year+month+'\n'+traceback.format_exc())
+            report.append(dict(year=year, month=month, status='failed', wall_time=None))
+
+    # Run in this process
+    if workers == 1:
+        for year, month in todo:
+            future = concurrent.futures.Future()
+            try:
+                future.set_result(_timed(task, year, month))
+            except Exception as error:
+                future.set_exception(error)
+            finish(year, month, future)
+
+    # Or run on the pool of processes
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_timed, task, year, month): (year, month) for year, month in todo}
+            for future in concurrent.futures.as_completed(futures):
+                finish(*futures[future], future)
+
+    # Give a short summary
+    done = [job for job in report if job['status'] == 'done']
+    _notify('{} jobs done, {} skipped, {} failed, {:.1f} s of work'.format(
+        len(done),
+        sum(job['status'] == 'skipped' for job in report),
+        sum(job['status'] == 'failed' for job in report),
+        sum(job['wall_time'] for job in done)))
+
+    return report
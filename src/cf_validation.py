@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 14:40
+
+Validation of the ERA5 capacity factors against the C3S-SIS capacity factors,
+both archives are walked month by month and the statistics are kept in running
+(Welford) sums, so the memory use does not grow with the number of years
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import datetime as dt
+import glob
+import os.path
+from cf_countries import countries, country_weights, aggregate, surfaces, surface_cache
+from cf_landsea import to_grid, on_grid, dataset_grid
+
+
+# The capacity factors that are compared
+variables = ['solarCF', 'windCF_on', 'windCF_off']
+
+# Hours added to the running sums at once
+time_block = 24
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to tell the terminal where we are
+def _notify(message):
+
+    print(dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')+' NOTIFY: '+message)
+
+
+# Function to make empty running sums for pairs (x, y) of the given shape: the
+# count, the means, the sums of squared deviations, the co-moment and the sum
+# of the squared differences
+def new_moments(shape):
+
+    return {key: np.zeros(shape, dtype=np.float64) for key in ['count', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'c_xy', 'sq_diff']}
+
+
+# Function to add a block of pairs (time, ...) to the running sums, the block
+# statistics are merged with the running ones (Chan et al.) so a whole block is
+# added at once, pairs with a missing value are left out
+def update_moments(moments, x, y):
+
+    # The pairs that are both there
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x = np.where(valid, x, 0.)
+    y = np.where(valid, y, 0.)
+
+    # The statistics of the block
+    count = valid.sum(axis=0)
+    safe = np.maximum(count, 1)
+    mean_x = x.sum(axis=0) / safe
+    mean_y = y.sum(axis=0) / safe
+    dev_x = np.where(valid, x - mean_x, 0.)
+    dev_y = np.where(valid, y - mean_y, 0.)
+
+    # Merge them with the running sums
+    total = moments['count'] + count
+    share = count / np.maximum(total, 1)
+    delta_x = mean_x - moments['mean_x']
+    delta_y = mean_y - moments['mean_y']
+    cross = moments['count'] * share
+
+    moments['m2_x'] += (dev_x**2).sum(axis=0) + delta_x**2 * cross
+    moments['m2_y'] += (dev_y**2).sum(axis=0) + delta_y**2 * cross
+    moments['c_xy'] += (dev_x * dev_y).sum(axis=0) + delta_x * delta_y * cross
+    moments['mean_x'] += delta_x * share
+    moments['mean_y'] += delta_y * share
+    moments['sq_diff'] += ((x - y)**2).sum(axis=0)
+    moments['count'] = total
+
+    return moments
+
+
+# Function to add pairs (time, ...) to running sums per group, e.g. per hour of
+# the day, the moments have the group as leading dimension
+def update_groups(moments, x, y, groups):
+
+    for group in np.unique(groups):
+        select = groups == group
+        part = {key: value[group] for key, value in moments.items()}
+        update_moments(part, x[select], y[select])
+        for key, value in part.items():
+            moments[key][group] = value
+
+    return moments
+
+
+# Function giving the statistics of the running sums: the bias (x - y), the
+# root mean squared error and the correlation, NaN where there was no data
+def moment_stats(moments):
+
+    # No data gives NaN for all statistics
+    empty = moments['count'] == 0
+    nan_if_empty = lambda values: np.where(empty, np.nan, values)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return dict(
+            count = moments['count'],
+            bias = nan_if_empty(moments['mean_x'] - moments['mean_y']),
+            rmse = nan_if_empty(np.sqrt(moments['sq_diff'] / moments['count'])),
+            correlation = nan_if_empty(moments['c_xy'] / np.sqrt(moments['m2_x'] * moments['m2_y'])),
+            mean = nan_if_empty(moments['mean_x']),
+            mean_reference = nan_if_empty(moments['mean_y']),
+            )
+
+
+# Function to read one capacity factor of a month on the grid of the reference,
+# sparse output is put back on its own grid first
+def _on_grid(ds, name, latitude, longitude):
+
+    da = ds[name]
+    cell_dim = next((dim for dim in da.dims if dim.startswith('cell')), None)
+    if cell_dim is not None:
+        da = to_grid(da, *dataset_grid(ds), cell_dim)
+
+    return on_grid(da, latitude, longitude).transpose('time', 'latitude', 'longitude').astype(np.float32)
+
+
+# Function to compare the monthly capacity factor files with the C3S-SIS store,
+# the file pattern ends in {year}{month}.nc. The statistics are made per cell
+# and per country, the countries also per hour of the day and month of the year
+def validate_archive(file_pattern, reference_store, cache_file, variables=variables, codes=countries):
+
+    # The months of our archive and the reference
+    files = sorted(glob.glob(file_pattern.format(year='[0-9]'*4, month='[0-9]'*2)))
+    reference = xr.open_zarr(reference_store, consolidated=True)
+    latitude, longitude = reference.latitude.values, reference.longitude.values
+    shape = (len(latitude), len(longitude))
+
+    # The country weights on the grid of the reference, per surface
+    surface = {name: surfaces.get(name, 'land') for name in variables}
+    weights = {area: country_weights(surface_cache(cache_file, area), latitude, longitude, codes, surface=area)
+               for area in set(surface.values())}
+
+    # The running sums
+    cells = {name: new_moments(shape) for name in variables}
+    nations = {name: new_moments(len(codes)) for name in variables}
+    diurnal = {name: new_moments((24, len(codes))) for name in variables}
+    seasonal = {name: new_moments((12, len(codes))) for name in variables}
+
+    # Walk both archives a month at a time
+    for file in files:
+        with xr.open_dataset(file) as ds:
+            for name in variables:
+
+                # The month of both, on the same grid and times
+                ours = _on_grid(ds, name, latitude, longitude).load()
+                ref = reference[name].reindex(time=ours.time.values).astype(np.float32).load()
+
+                # Only compare where both have data
+                ours = ours.where(ref.notnull())
+                ref = ref.where(ours.notnull())
+
+                # The cells, a block of hours at a time
+                for start in range(0, ours.sizes['time'], time_block):
+                    block = slice(start, start + time_block)
+                    update_moments(cells[name], ours.values[block], ref.values[block])
+
+                # The countries, hours without reference data are left out
+                available = ref.notnull().any(dim=['latitude', 'longitude']).values
+                x = aggregate(ours, weights[surface[name]], codes).values
+                y = aggregate(ref, weights[surface[name]], codes).values
+                x[~available] = np.nan
+                y[~available] = np.nan
+                update_moments(nations[name], x, y)
+                update_groups(diurnal[name], x, y, ours.time.dt.hour.values)
+                update_groups(seasonal[name], x, y, ours.time.dt.month.values - 1)
+
+        _notify('Compared '+os.path.basename(file))
+
+    # The summary of the comparison
+    summary = xr.Dataset(coords=dict(latitude=latitude, longitude=longitude, country=list(codes),
+                                     hour=np.arange(24), month=np.arange(1, 13)))
+    for name in variables:
+        for stat, values in moment_stats(cells[name]).items():
+            summary[name+'_'+stat] = (('latitude', 'longitude'), values.astype(np.float32))
+        for stat, values in moment_stats(nations[name]).items():
+            summary[name+'_country_'+stat] = (('country',), values)
+        for stat in ['bias', 'rmse']:
+            summary[name+'_diurnal_'+stat] = (('hour', 'country'), moment_stats(diurnal[name])[stat])
+            summary[name+'_seasonal_'+stat] = (('month', 'country'), moment_stats(seasonal[name])[stat])
+    summary.attrs.update(reference='C3S-SIS energy derived reanalysis', bias='ERA5 CF minus reference',
+                         first_file=os.path.basename(files[0]), last_file=os.path.basename(files[-1]))
+
+    return summary
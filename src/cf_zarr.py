@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Sun 18 Oct 2026 16:05
+
+One chunked Zarr store along time for all monthly capacity factors
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import pandas as pd
+import dask.array
+import functools
+import glob
+import os.path
+import uuid
+from cf_scheduler import run_jobs
+from cf_io import cf_encoding, check_fill_values
+
+
+# Hours per chunk along time, every month starts at the start of a day so
+# each month covers whole chunks and workers never write to the same chunk
+time_chunk = 24
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to make the hourly time axis of a range of years (both included)
+def hourly_times(first_year, last_year):
+
+    return pd.date_range(str(first_year)+'-01-01 00:00', str(last_year)+'-12-31 23:00', freq='h')
+
+
+# Function to make an empty (lazy) dataset with the layout of the store, the
+# variables are encoded following one of the encoding profiles of cf_io
+def store_template(times, latitude, longitude, variables, attrs=None, profile='float'):
+
+    # The shape and chunks of all variables
+    shape = (len(times), len(latitude), len(longitude))
+    chunks = (time_chunk, len(latitude), len(longitude))
+
+    # The dataset with lazy data that is never computed
+    ds = xr.Dataset(coords=dict(time=times, latitude=latitude, longitude=longitude))
+    for name, var_attrs in variables.items():
+        ds[name] = (('time', 'latitude', 'longitude'), dask.array.zeros(shape, chunks=chunks, dtype=np.float32))
+        ds[name].attrs.update(var_attrs)
+
+    # The encoding, along time the chunks always stay at whole days
+    for name, var_encoding in cf_encoding(ds, variables, profile, backend='zarr').items():
+        ds[name].encoding.update(var_encoding)
+        ds[name].encoding.update(chunks=(time_chunk,) + ds[name].encoding.get('chunks', chunks)[1:])
+
+    # The global attributes
+    ds.attrs.update(attrs or {})
+    ds.time.encoding.update(units='hours since 1900-01-01', dtype='int64')
+
+    return ds
+
+
+# Function to create the store, or append the missing time steps to an
+# existing store. Only the metadata is written, the data is filled per month
+def create_store(store, times, latitude, longitude, variables, attrs=None, profile='float'):
+
+    # A new store gets the complete time axis and an id, so the months written
+    # in it are not mistaken for those of an earlier store at the same place
+    if not os.path.exists(store):
+        template = store_template(times, latitude, longitude, variables, attrs, profile)
+        template.attrs.update(store_id=uuid.uuid4().hex)
+        template.to_zarr(store, compute=False, consolidated=True)
+        return
+
+    # An existing store can only be extended at the end, times before its start
+    # would fail later at every write
+    stored = xr.open_zarr(store, consolidated=True)
+    times_store = stored.time.values
+    if times[0] < times_store[0]:
+        raise ValueError('The store '+store+' starts at '+str(times_store[0])+' and can not be extended back to '+
+                         str(times[0])+', make a new store for the whole period')
+    # The appended part carries the attributes of the store, the id included,
+    # as appending replaces them
+    times_new = times[times > times_store[-1]]
+    if len(times_new) > 0:
+        store_template(times_new, latitude, longitude, variables, stored.attrs, profile).to_zarr(
+            store, compute=False, append_dim='time', consolidated=True)
+
+
+# Function giving the encoding of the variables in a store, as stored
+def store_encoding(store, variables):
+
+    stored = xr.open_zarr(store, consolidated=True)
+
+    return {name: stored[name].encoding for name in variables}
+
+
+# Function to check that the chunks of a store that were never written read as
+# missing, stores made before the fill value was set read these as zero
+def check_store(store, variables):
+
+    check_fill_values(store_encoding(store, variables))
+
+
+# Function to write a month (or any range of whole days) in its region of the
+# store, this is safe to do from several workers at the same time. Gives the
+# description of the region for the manifest
+def write_region(store, ds):
+
+    # Find the region of the month along time
+    stored = xr.open_zarr(store, consolidated=True)
+    times_store = stored.time.values
+    start = int(np.searchsorted(times_store, ds.time.values[0]))
+    region = dict(time=slice(start, start + ds.sizes['time']))
+
+    # The month has to line up with the store
+    if not np.array_equal(times_store[region['time']], ds.time.values):
+        raise ValueError('The time axis does not match the store at '+str(ds.time.values[0]))
+
+    # Only the data along time is written, the coordinates are already stored
+    ds = ds.drop_vars([name for name in ds.variables if 'time' not in ds[name].dims])
+    for var in ds.variables.values():
+        var.encoding = {}
+
+    ds.chunk(dict(time=time_chunk)).to_zarr(store, region=region, consolidated=False)
+
+    return dict(store_id=stored.attrs.get('store_id'), start=str(times_store[start]), steps=ds.sizes['time'])
+
+
+# Function to check if a region described by write_region is in the store,
+# the same store (not one made again at the same place) with those times
+def is_written(store, region):
+
+    if region is None or not os.path.exists(store):
+        return False
+
+    stored = xr.open_zarr(store, consolidated=True)
+    start = int(np.searchsorted(stored.time.values, np.datetime64(region['start'])))
+
+    return (stored.attrs.get('store_id') == region['store_id'] and start + region['steps'] <= stored.sizes['time'] and
+            stored.time.values[start] == np.datetime64(region['start']))
+
+
+# Function that moves one monthly netcdf file into the store
+def _convert_month(store, file_pattern, year, month):
+
+    with xr.open_dataset(file_pattern.format(year=year, month=month)) as ds:
+        write_region(store, ds.load())
+
+
+# Function to convert an archive of monthly netcdf files into the store, the
+# file pattern ends in {year}{month}.nc, e.g. '/data/ERA5_CF_{year}{month}.nc'
+def netcdf_to_store(file_pattern, store, workers=1, profile='float'):
+
+    # Find the months of the archive
+    files = sorted(glob.glob(file_pattern.format(year='[0-9]'*4, month='[0-9]'*2)))
+    jobs = [(os.path.basename(file)[-9:-5], os.path.basename(file)[-5:-3]) for file in files]
+
+    # Make the store from the first file
+    with xr.open_dataset(files[0]) as ds:
+        variables = {name: ds[name].attrs for name in ds.data_vars}
+        create_store(store, hourly_times(jobs[0][0], jobs[-1][0]), ds.latitude.values, ds.longitude.values,
+                     variables, ds.attrs, profile)
+
+    # Fill the store with all months
+    return run_jobs(functools.partial(_convert_month, store, file_pattern), jobs, workers)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spyder Editor
+
+Created on Mon 19 Oct 2026 09:15
+
+Synthetic ERA5-EU monthly files, with the layout of the real files and a
+realistic diurnal and seasonal structure, to test and benchmark offline
+"""
+
+
+#%%
+# =============================================================================
+# Dependencies
+# =============================================================================
+
+
+# Importing modules
+import xarray as xr
+import numpy as np
+import pandas as pd
+
+
+# The ERA5-EU grid at 0.25 degree
+latitude_eu = 72. - 0.25 * np.arange(183)
+longitude_eu = -22. + 0.25 * np.arange(422)
+
+# The attributes of the ERA5 fields
+era5_attrs = dict(
+        u10 = dict(units='m s**-1', long_name='10 metre U wind component'),
+        v10 = dict(units='m s**-1', long_name='10 metre V wind component'),
+        u100 = dict(units='m s**-1', long_name='100 metre U wind component'),
+        v100 = dict(units='m s**-1', long_name='100 metre V wind component'),
+        t2m = dict(units='K', long_name='2 metre temperature'),
+        ssrd = dict(units='J m**-2', long_name='Surface solar radiation downwards'),
+        msl = dict(units='Pa', long_name='Mean sea level pressure'),
+        ro = dict(units='m', long_name='Runoff'),
+        sro = dict(units='m', long_name='Surface runoff'),
+        )
+
+
+#%%
+# =============================================================================
+# Function definitions
+# =============================================================================
+
+# Function to determine the cosine of the solar zenith angle (time, lat, lon)
+def _cos_zenith(times, latitude, longitude):
+
+    # Day of year and hour in UTC
+    day = times.dayofyear.values[:, None, None]
+    hour = (times.hour.values + times.minute.values / 60.)[:, None, None]
+
+    # Declination and hour angle
+    declination = np.deg2rad(23.44) * np.sin(2 * np.pi * (284 + day) / 365.)
+    hour_angle = np.deg2rad(15. * (hour - 12.) + longitude[None, None, :])
+    lat = np.deg2rad(latitude)[None, :, None]
+
+    return np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+
+
+# Function to make a field that is smooth in time: an AR(1) process per cell
+def _red_noise(rng, shape, memory=0.95):
+
+    noise = np.empty(shape, dtype=np.float32)
+    noise[0] = rng.standard_normal(shape[1:])
+    for i in range(1, shape[0]):
+        noise[i] = memory * noise[i - 1] + np.sqrt(1 - memory**2) * rng.standard_normal(shape[1:])
+
+    return noise
+
+
+# Function to make a synthetic ERA5-EU month, hours limits the number of time
+# steps (a full month when None)
+def synthetic_era5_month(year, month, latitude=latitude_eu, longitude=longitude_eu, hours=None, seed=0):
+
+    # The random generator, different per month
+    rng = np.random.default_rng([seed, int(year), int(month)])
+
+    # The hourly time axis of the month
+    start = pd.Timestamp(str(year)+'-'+str(month).zfill(2)+'-01')
+    times = pd.date_range(start, start + pd.offsets.MonthBegin(1), freq='h', inclusive='left')
+    if hours is not None:
+        times = times[:hours]
+    shape = (len(times), len(latitude), len(longitude))
+
+    ds = xr.Dataset(coords=dict(time=times, latitude=latitude, longitude=longitude))
+    dims = ('time', 'latitude', 'longitude')
+
+    # Windspeeds that are Weibull like, with a direction that turns slowly
+    speed = 7.5 * np.exp(0.45 * _red_noise(rng, shape))
+    direction = np.pi * _red_noise(rng, shape, memory=0.98)
+    ds['u100'] = (dims, (speed * np.cos(direction)).astype(np.float32))
+    ds['v100'] = (dims, (speed * np.sin(direction)).astype(np.float32))
+    ds['u10'] = (dims, (0.72 * ds.u100.values).astype(np.float32))
+    ds['v10'] = (dims, (0.72 * ds.v100.values).astype(np.float32))
+    del speed, direction
+
+    # The sun, with clouds that take away part of the clear sky radiation
+    cos_zenith = np.clip(_cos_zenith(times, latitude, longitude), 0, None)
+    clouds = 1 / (1 + np.exp(-1.5 * _red_noise(rng, shape)))
+    ds['ssrd'] = (dims, (3600. * 1000. * cos_zenith * (1 - 0.75 * clouds)).astype(np.float32))
+
+    # Temperature with a north-south gradient, a season and the daily cycle
+    season = -np.cos(2 * np.pi * (times.dayofyear.values - 15) / 365.)[:, None, None]
+    ds['t2m'] = (dims, (288. - 0.6 * (latitude[None, :, None] - 45.) + 10. * season +
+                           6. * cos_zenith + 2. * _red_noise(rng, shape)).astype(np.float32))
+    del cos_zenith, clouds
+
+    # Pressure and runoff
+    ds['msl'] = (dims, (101325. + 1200. * _red_noise(rng, shape, memory=0.99)).astype(np.float32))
+    ds['ro'] = (dims, (1e-4 * rng.exponential(1., shape)).astype(np.float32))
+    ds['sro'] = (dims, (0.3 * ds.ro.values).astype(np.float32))
+
+    # The attributes of the fields
+    for name, attrs in era5_attrs.items():
+        ds[name].attrs.update(attrs)
+
+    return ds
+
+
+# Function to write a synthetic month packed as int16, as in the ERA5 files
+def write_synthetic_month(path, year, month, **kwargs):
+
+    ds = synthetic_era5_month(year, month, **kwargs)
+
+    # Pack every field over its own range
+    encoding = {}
+    for name in era5_attrs:
+        low, high = float(ds[name].min()), float(ds[name].max())
+        scale = (high - low) / (2**16 - 4) or 1.
+        encoding[name] = dict(dtype='int16', scale_factor=scale, add_offset=(high + low) / 2, _FillValue=-32768)
+    encoding['time'] = dict(units='hours since 1900-01-01 00:00:00.0', calendar='gregorian', dtype='int32')
+
+    ds.to_netcdf(path, encoding=encoding)
+
+    return path
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+Test setup: the modules live in src/ next to the scripts and are imported from
+there, as the scripts do
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the temporal aggregates of the capacity factors
+"""
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+import pytest
+from cf_aggregates import aggregate_periods, check_period
+
+
+# Two days of hourly capacity factors on a small grid
+def capacity_factors(seed=0):
+
+    times = pd.date_range('2000-01-01', periods=48, freq='h')
+    values = np.random.default_rng(seed).random((48, 2, 3)).astype(np.float32)
+    ds = xr.Dataset(dict(windCF_on=(('time', 'latitude', 'longitude'), values)),
+                    coords=dict(time=times, latitude=[52., 51.75], longitude=[3., 3.25, 3.5]))
+    ds.windCF_on.attrs.update(units=' ', long_name='Capacity factor for wind onshore')
+    ds.attrs.update(author='test')
+    return ds
+
+
+def test_statistics_per_period():
+
+    ds = capacity_factors()
+    daily = aggregate_periods(ds, ['windCF_on'], '1D')
+
+    assert set(daily.data_vars) == {'windCF_on_mean', 'windCF_on_min', 'windCF_on_max', 'windCF_on_flh'}
+    assert daily.sizes['time'] == 2 and daily.time.values[1] == np.datetime64('2000-01-02')
+    first = ds.windCF_on.values[:24]
+    np.testing.assert_allclose(daily.windCF_on_mean.values[0], first.mean(axis=0), rtol=1e-6)
+    np.testing.assert_allclose(daily.windCF_on_min.values[0], first.min(axis=0))
+    np.testing.assert_allclose(daily.windCF_on_max.values[0], first.max(axis=0))
+    np.testing.assert_allclose(daily.windCF_on_flh.values[0], first.sum(axis=0), rtol=1e-5)
+
+    # The attributes are kept, the full load hours are in hours
+    assert daily.windCF_on_flh.attrs['units'] == 'h'
+    assert daily.windCF_on_mean.attrs['long_name'] == 'Capacity factor for wind onshore'
+    assert daily.attrs == dict(author='test', period='1D')
+
+
+def test_full_load_hours_of_longer_time_steps():
+
+    ds = capacity_factors().isel(time=slice(None, None, 3))
+    three_hourly = aggregate_periods(ds, ['windCF_on'], '1D', statistics=['flh'])
+
+    np.testing.assert_allclose(three_hourly.windCF_on_flh.values[0], 3 * ds.windCF_on.values[:8].sum(axis=0), rtol=1e-5)
+    with pytest.raises(ValueError):
+        aggregate_periods(ds, ['windCF_on'], '1D', statistics=['median'])
+
+
+def test_periods_that_fit_in_a_month():
+
+    for freq in ['3h', '1h', '1D', 'D', '1MS', 'ME']:
+        check_period(freq)
+    for freq in ['7h', '2D', '1W', '2MS']:
+        with pytest.raises(ValueError):
+            check_period(freq)
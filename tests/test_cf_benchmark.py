@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the synthetic ERA5 months and the benchmark of the CF pipeline
+"""
+
+import numpy as np
+import xarray as xr
+from era5_synthetic import era5_attrs, write_synthetic_month
+from bench_cf_pipeline import run_stages
+
+
+# A small grid
+latitude = 60. - 0.25 * np.arange(6)
+longitude = 5. + 0.25 * np.arange(8)
+
+
+def test_synthetic_month_is_packed_like_era5(tmp_path):
+
+    path = write_synthetic_month(str(tmp_path / 'ERA5-EU_200002.nc'), '2000', '02', latitude=latitude, longitude=longitude)
+
+    with xr.open_dataset(path) as ds:
+        assert set(ds.data_vars) == set(era5_attrs)
+        assert ds.sizes['time'] == 29 * 24
+        assert ds.time.values[-1] == np.datetime64('2000-02-29T23:00')
+        assert ds.u100.encoding['dtype'] == np.int16
+        assert (ds.ssrd.values >= 0).all()
+        assert float(ds.ssrd.max()) > 0
+
+
+def test_stages_are_timed_with_the_growth_of_the_peak(tmp_path):
+
+    path = write_synthetic_month(str(tmp_path / 'ERA5-EU_200001.nc'), '2000', '01', latitude=latitude, longitude=longitude,
+                                 hours=48)
+    stages, cell_hours = run_stages(path, str(tmp_path / 'ERA5_CF_200001.nc'), 'float', str(tmp_path / 'timing.jsonl'))
+
+    assert cell_hours == 48 * len(latitude) * len(longitude)
+    assert [result['stage'] for result in stages] == ['load', 'units', 'solar_jerez', 'solar_bett', 'wind', 'attributes', 'write']
+    assert all(result['peak_growth_mb'] >= 0 for result in stages)
+
+    # The peak of the process is that of all stages up to it
+    peaks = [result['process_peak_rss_mb'] for result in stages]
+    assert peaks == sorted(peaks)
+    with xr.open_dataset(tmp_path / 'ERA5_CF_200001.nc') as ds:
+        assert set(ds.data_vars) == {'solarCF', 'solarCF_bett', 'windCF_on', 'windCF_off'}
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the C3S-SIS ingest: the members of the zip files end up on the ERA5
+grid in the store, and the hours of a year are ingested only once
+"""
+
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+import xarray as xr
+from cf_c3s import ingest_archive, drop_covered, zip_year
+
+
+# The ERA5 grid of the store
+latitude = np.array([52.0, 51.75, 51.5])
+longitude = np.array([3.0, 3.25])
+
+
+# Function to write a zip file with a solar member of two days, the C3S grid
+# runs south to north as the files do
+def write_zip(path, value, start='2000-01-01'):
+
+    member = str(path)+'.nc'
+    times = pd.date_range(start, periods=48, freq='h')
+    xr.Dataset(dict(cf=(('time', 'lat', 'lon'), np.full((48, 3, 2), value, dtype=np.float32))),
+               coords=dict(time=times, lat=latitude[::-1], lon=longitude)).to_netcdf(member, engine='scipy')
+    with zipfile.ZipFile(str(path), 'w') as archive:
+        archive.write(member, 'H_ERA5_ECMW_T639_SPV_0000m_Euro_025d_S200001010000_CFR.nc')
+        archive.writestr('README.txt', 'not a field')
+    os.remove(member)
+
+
+def test_years_of_the_file_names():
+
+    assert zip_year('C3S-SIS_original_grid_2000.zip') == '2000'
+    assert zip_year('C3S-SIS_original_grid_200001_wind_power_generation_onshore.zip') == '2000'
+
+
+def test_pieces_of_a_yearly_zip_are_dropped():
+
+    zip_files = ['C3S-SIS_original_grid_2000.zip',
+                 'C3S-SIS_original_grid_200001_solar_photovoltaic_power_generation.zip',
+                 'C3S-SIS_original_grid_200101_solar_photovoltaic_power_generation.zip']
+
+    assert drop_covered(zip_files) == [zip_files[0], zip_files[2]]
+
+
+def test_ingest_puts_a_year_in_the_store_once(tmp_path):
+
+    write_zip(tmp_path / 'C3S-SIS_original_grid_2000.zip', 0.5)
+    write_zip(tmp_path / 'C3S-SIS_original_grid_200001_solar_photovoltaic_power_generation.zip', 0.9)
+    store = str(tmp_path / 'c3s.zarr')
+
+    ingested = ingest_archive(str(tmp_path), store, latitude, longitude, profile='float')
+
+    assert sorted(ingested) == ['C3S-SIS_original_grid_2000.zip']
+    ds = xr.open_zarr(store, consolidated=True)
+    assert ds.sizes['time'] == 366 * 24
+    np.testing.assert_array_equal(ds.solarCF.isel(time=slice(0, 48)).values, 0.5)
+    assert np.isnan(ds.solarCF.isel(time=48).values).all()
+    assert np.isnan(ds.windCF_on.isel(time=0).values).all()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the one-pass climatology: merged monthly states against the moments
+and percentiles of all data at once
+"""
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from cf_climatology import new_state, update_state, merge_states, save_state, load_state, state_percentiles, climatology
+
+
+# Two months of hourly capacity factors (time, cell) with missing values
+def capacity_factors(seed=0, cells=5):
+
+    rng = np.random.default_rng(seed)
+    times = pd.date_range('2001-01-01', '2001-02-28 23:00', freq='h')
+    values = rng.beta(0.5, 2., (len(times), cells)).astype(np.float32)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    return xr.DataArray(values, dims=('time', 'cell'), coords=dict(time=times))
+
+
+def test_merged_states_match_one_state():
+
+    da = capacity_factors()
+    whole = update_state(new_state((da.sizes['cell'],)), da)
+    parts = [update_state(new_state((da.sizes['cell'],)), da.sel(time=month)) for month in ['2001-01', '2001-02']]
+    merged = merge_states(parts[0], parts[1])
+
+    assert sorted(merged['groups']) == sorted(whole['groups'])
+    for key, moments in whole['groups'].items():
+        for name in ['count', 'mean', 'm2']:
+            np.testing.assert_allclose(merged['groups'][key][name], moments[name], rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(merged['histogram'], whole['histogram'])
+
+
+def test_group_moments_match_direct_statistics():
+
+    da = capacity_factors(1)
+    ds = climatology(update_state(new_state((da.sizes['cell'],)), da), da.isel(time=0, drop=True))
+
+    select = (da.time.dt.month == 2) & (da.time.dt.hour == 12)
+    np.testing.assert_allclose(ds['mean'].sel(month=2, hour=12).values, np.nanmean(da.values[select.values], axis=0), rtol=1e-6)
+    np.testing.assert_allclose(ds['std'].sel(month=2, hour=12).values, np.nanstd(da.values[select.values], axis=0, ddof=1), rtol=1e-5)
+    assert np.isnan(ds['mean'].sel(month=3).values).all()
+
+
+def test_percentiles_within_one_bin():
+
+    da = capacity_factors(2)
+    state = update_state(new_state((da.sizes['cell'],)), da)
+    quantiles = (0.01, 0.1, 0.5, 0.9, 0.99)
+    expected = np.nanpercentile(da.values, [100 * quantile for quantile in quantiles], axis=0)
+    error = np.abs(state_percentiles(state, quantiles) - expected).max()
+    assert error <= state['upper'] / state['bins']
+
+
+def test_saved_state_loads_the_same(tmp_path):
+
+    da = capacity_factors(3)
+    state = update_state(new_state((da.sizes['cell'],)), da)
+    save_state(state, str(tmp_path / 'state.npz'))
+    loaded = load_state(str(tmp_path / 'state.npz'))
+
+    assert sorted(loaded['groups']) == sorted(state['groups'])
+    assert sorted(loaded['years']) == sorted(state['years'])
+    np.testing.assert_array_equal(loaded['histogram'], state['histogram'])
+    np.testing.assert_array_equal(loaded['groups'][(1, 0)]['m2'], state['groups'][(1, 0)]['m2'])
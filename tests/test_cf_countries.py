@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the country masks, the weight matrices and the aggregation of the
+capacity factors to countries
+"""
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+from cf_countries import (nearest_coast, region_fractions, build_weights, country_weights, surface_cache,
+                          aggregate, aggregate_archive)
+from cf_landsea import dataset_to_cells
+
+
+# A grid of 1 degree with two countries next to each other and sea around them
+def country_grid():
+
+    latitude = np.arange(56., 47., -1.)
+    longitude = np.arange(-3., 10., 1.)
+    regions = np.full((len(latitude), len(longitude)), np.nan)
+    regions[3:6, 3:6] = 0
+    regions[3:6, 6:9] = 1
+    return xr.DataArray(regions, dims=('latitude', 'longitude'), coords=dict(latitude=latitude, longitude=longitude))
+
+
+# Capacity factors on the grid of the countries
+def capacity_factors(regions, hours=30, seed=0):
+
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 1, (hours,) + regions.shape).astype(np.float32)
+    return xr.DataArray(values, dims=('time', 'latitude', 'longitude'), name='windCF_on',
+                        coords=dict(time=pd.date_range('2000-01-01', periods=hours, freq='h'),
+                                    latitude=regions.latitude, longitude=regions.longitude))
+
+
+def test_sea_cells_belong_to_the_nearest_coast():
+
+    regions = country_grid()
+    sea = nearest_coast(regions, max_distance=200e3)
+
+    # Land is not sea and the sea next to each country is that country's
+    assert sea.where(regions.notnull()).isnull().all()
+    assert sea.sel(latitude=52, longitude=-1).item() == 0
+    assert sea.sel(latitude=52, longitude=7).item() == 1
+    assert sea.sel(latitude=54, longitude=4).item() == 1
+
+    # The open sea beyond the distance belongs to nobody
+    assert np.isnan(sea.sel(latitude=52, longitude=-3).item())
+
+
+def test_aggregate_is_the_area_weighted_mean():
+
+    regions = country_grid()
+    fractions = region_fractions(regions, dict(NL=0, DE=1))
+    weights = build_weights(fractions)
+    da = capacity_factors(regions)
+
+    result = aggregate(da, weights, ['NL', 'DE'])
+    area = np.cos(np.deg2rad(regions.latitude))
+    expected = (da * area).where(regions == 1).sum(['latitude', 'longitude']) / (area * (regions == 1)).sum()
+    np.testing.assert_allclose(result.sel(country='DE').values, expected.values, rtol=1e-5)
+
+
+def test_missing_cells_do_not_pull_the_mean_to_zero():
+
+    regions = country_grid()
+    weights = build_weights(region_fractions(regions, dict(NL=0, DE=1)))
+    da = capacity_factors(regions)
+
+    # A value of one in all cells of DE, some missing and one hour all missing
+    da = da.where(regions != 1, 1.)
+    da[:, 3, 6] = np.nan
+    da[5] = da[5].where(regions != 1)
+
+    result = aggregate(da, weights, ['NL', 'DE']).sel(country='DE').values
+    np.testing.assert_allclose(np.delete(result, 5), 1., rtol=1e-6)
+    assert np.isnan(result[5])
+
+
+def test_aggregate_on_cells_matches_the_grid():
+
+    regions = country_grid()
+    weights = build_weights(region_fractions(regions, dict(NL=0, DE=1)))
+    da = capacity_factors(regions)
+    cells = dataset_to_cells(xr.Dataset(dict(windCF_on=da)), regions.notnull(), 'cell_land').windCF_on
+
+    np.testing.assert_allclose(aggregate(cells, weights, ['NL', 'DE'], 'cell_land').values,
+                               aggregate(da, weights, ['NL', 'DE']).values, rtol=1e-5)
+
+
+def test_country_outside_the_grid_is_missing(capsys):
+
+    regions = country_grid()
+    weights = build_weights(region_fractions(regions, dict(NL=0, DE=1, PT=None)))
+    assert 'PT' in capsys.readouterr().out
+
+    result = aggregate(capacity_factors(regions), weights, ['NL', 'DE', 'PT'])
+    assert np.isnan(result.sel(country='PT').values).all()
+    assert not np.isnan(result.sel(country=['NL', 'DE']).values).any()
+
+
+def test_sums_count_missing_cells_as_zero():
+
+    regions = country_grid()
+    weights = build_weights(region_fractions(regions, dict(NL=0, DE=1)), 'sum')
+    da = xr.ones_like(capacity_factors(regions))
+    da[:, 3, 3] = np.nan
+
+    result = aggregate(da, weights, ['NL', 'DE'], mean=False)
+    area = weights.sum(axis=0).A1
+    np.testing.assert_allclose(result.sel(country='DE').values, area[1], rtol=1e-5)
+    assert (result.sel(country='NL').values < area[0]).all()
+
+
+def test_weights_are_cached_per_surface(tmp_path):
+
+    regions = country_grid()
+    land = region_fractions(regions, dict(NL=0, DE=1))
+    sea = region_fractions(nearest_coast(regions), dict(NL=0, DE=1))
+    cache_file = str(tmp_path / 'weights.npz')
+
+    for surface, fractions in [('land', land), ('sea', sea)]:
+        weights = country_weights(surface_cache(cache_file, surface), regions.latitude.values, regions.longitude.values,
+                                  ['NL', 'DE'], fractions=fractions, surface=surface)
+        np.testing.assert_allclose(weights.toarray(), build_weights(fractions).toarray())
+    assert surface_cache(cache_file, 'sea') == str(tmp_path / 'weights_sea.npz')
+
+
+def test_offshore_wind_is_aggregated_over_the_sea(tmp_path):
+
+    regions = country_grid()
+    fractions = dict(land=region_fractions(regions, dict(NL=0, DE=1)),
+                     sea=region_fractions(nearest_coast(regions), dict(NL=0, DE=1)))
+
+    # Onshore wind of one on land and zero at sea, offshore wind the other way
+    land = regions.notnull().astype(np.float32)
+    for month, hours in [('01', 31 * 24), ('02', 29 * 24)]:
+        time = pd.date_range('2000-'+month+'-01', periods=hours, freq='h')
+        ds = xr.Dataset(dict(windCF_on=land.expand_dims(time=time), windCF_off=(1 - land).expand_dims(time=time)))
+        ds.to_netcdf(tmp_path / ('ERA5_CF_2000'+month+'.nc'))
+
+    series = aggregate_archive(str(tmp_path / 'ERA5_CF_{year}{month}.nc'), str(tmp_path / 'weights.npz'),
+                               ['windCF_on', 'windCF_off'], ['NL', 'DE'], fractions=fractions)
+    assert series.sizes['time'] == 60 * 24
+    np.testing.assert_allclose(series.windCF_on.values, 1.)
+    np.testing.assert_allclose(series.windCF_off.values, 1.)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the calendar alignment and the hourly demand scaling
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from cf_demand import align_calendar, hourly_demand
+
+
+# An hourly series (time, country) with the time as its value
+def series(year):
+
+    times = pd.date_range(str(year)+'-01-01', str(year)+'-12-31 23:00', freq='h')
+    key = (times.month * 10000 + times.day * 100 + times.hour).values.astype(np.float64)
+    return xr.DataArray(np.stack([key, -key], axis=1), dims=('time', 'country'),
+                        coords=dict(time=times, country=['NL', 'DE']))
+
+
+def test_align_calendar_same_month_day_hour():
+
+    target = pd.date_range('2001-01-01', '2001-12-31 23:00', freq='h')
+    aligned = align_calendar(series(2016), target)
+
+    assert np.array_equal(aligned.time.values, target.values)
+    expected = (target.month * 10000 + target.day * 100 + target.hour).values
+    np.testing.assert_array_equal(aligned.sel(country='NL').values, expected)
+    np.testing.assert_array_equal(aligned.sel(country='DE').values, -expected)
+
+
+def test_align_calendar_leap_day_from_28_february():
+
+    target = pd.date_range('2016-02-29', periods=24, freq='h')
+    aligned = align_calendar(series(2015), target)
+
+    np.testing.assert_array_equal(aligned.sel(country='NL').values, 22800 + np.arange(24))
+
+
+def test_align_calendar_missing_hours_is_an_error():
+
+    with pytest.raises(ValueError):
+        align_calendar(series(2015).isel(time=slice(0, 100)), pd.date_range('2015-06-01', periods=24, freq='h'))
+
+
+def test_hourly_demand_sums_to_the_yearly_total():
+
+    profile = series(2015).clip(min=1.) + 0.
+    table = pd.DataFrame({'Total_Base_GWh': [100., 30., 20.]}, index=['NL', 'DE', 'XX'])
+    demand = hourly_demand(profile.assign_coords(country=['NL', 'DE']), table)
+
+    np.testing.assert_allclose(demand.astype(np.float64).sum(dim='time').values, [100., 30.], rtol=1e-5)
+    assert demand.attrs['units'] == 'GW'
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the C3S-SIS downloader: finished pieces and years of a yearly zip are
+skipped, failed transfers are retried and leave no partial files behind
+"""
+
+import os
+import threading
+from cf_download import split_pieces, piece_file, yearly_file, piece_key, download_all, fetch_piece
+from cf_manifest import load_manifest
+
+
+# A transfer that writes the request as the piece and counts the calls, the
+# first failures of every piece raise
+class FakeTransfer:
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, dataset, request, target):
+        key = request['year']+request['month'][0]+'_'+request['variable'][0]
+        with self.lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            calls = self.calls[key]
+        with open(target, 'w') as file:
+            file.write(repr(request))
+        if calls <= self.failures:
+            raise OSError('connection reset')
+
+
+def test_pieces_are_downloaded_once(tmp_path):
+
+    pieces = split_pieces(['2000'], ['01', '02'])
+    transfer = FakeTransfer()
+
+    assert download_all(pieces, str(tmp_path), transfer=transfer, backoff=0.) == []
+    assert len(transfer.calls) == len(pieces)
+    for year, month, variable in pieces:
+        assert os.path.isfile(piece_file(str(tmp_path), 'original_grid', year, month, variable))
+    assert set(load_manifest(str(tmp_path / 'download_state.json'))) == set(piece_key(*piece) for piece in pieces)
+
+    # A second run finds everything done
+    assert download_all(pieces, str(tmp_path), transfer=transfer, backoff=0.) == []
+    assert all(calls == 1 for calls in transfer.calls.values())
+
+    # A piece that went missing is downloaded again
+    os.remove(piece_file(str(tmp_path), 'original_grid', *pieces[0]))
+    download_all(pieces, str(tmp_path), transfer=transfer, backoff=0.)
+    assert transfer.calls[piece_key(*pieces[0])] == 2
+
+
+def test_years_of_a_yearly_zip_are_complete(tmp_path):
+
+    with open(yearly_file(str(tmp_path), 'original_grid', '2000'), 'wb') as file:
+        file.write(b'all of 2000')
+    transfer = FakeTransfer()
+
+    download_all(split_pieces(['2000', '2001'], ['01']), str(tmp_path), transfer=transfer, backoff=0.)
+
+    assert sorted(transfer.calls) == sorted(piece_key('2001', '01', variable) for _, _, variable in split_pieces(['2001'], ['01']))
+    state = load_manifest(str(tmp_path / 'download_state.json'))
+    assert state['2000'] == dict(file='C3S-SIS_original_grid_2000.zip', size=11, yearly=True)
+
+
+def test_failed_transfers_are_retried_without_partial_files(tmp_path):
+
+    target = str(tmp_path / 'piece.zip')
+    request = dict(year='2000', month=['01'], variable=['wind_power_generation_onshore'])
+
+    # Retried until it works
+    transfer = FakeTransfer(failures=2)
+    assert fetch_piece(transfer, request, target, retries=2, backoff=0.) > 0
+    assert os.listdir(str(tmp_path)) == ['piece.zip']
+
+    # Failing pieces are reported and leave nothing on disk
+    os.remove(target)
+    transfer = FakeTransfer(failures=10)
+    failed = download_all(split_pieces(['2000'], ['01'], ['wind_power_generation_onshore']), str(tmp_path),
+                          transfer=transfer, retries=1, backoff=0.)
+    assert failed == [piece_key('2000', '01', 'wind_power_generation_onshore')]
+    assert transfer.calls[failed[0]] == 2
+    assert not any(name.endswith('.part') or name.endswith('.zip') for name in os.listdir(str(tmp_path)))
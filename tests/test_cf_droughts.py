@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the running-sum windows and the runs of the drought detection against
+plain loops
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+from cf_droughts import window_means, _runs, detect_events
+
+
+def test_window_means_match_loop():
+
+    rng = np.random.default_rng(0)
+    values = rng.random((40, 3))
+    values[10, 1] = np.nan
+    durations = [1, 3, 7]
+    means = window_means(values, durations)
+
+    assert means.shape == (len(durations), 40, 3)
+    for i, duration in enumerate(durations):
+        for start in range(40):
+            for country in range(3):
+                window = values[start:start + duration, country]
+                if start + duration > 40 or np.isnan(window).any():
+                    assert np.isnan(means[i, start, country])
+                else:
+                    np.testing.assert_allclose(means[i, start, country], window.mean())
+
+
+def test_runs_match_loop():
+
+    rng = np.random.default_rng(1)
+    mask = rng.random((2, 3, 25)) < 0.4
+    mask[0, 0, :] = True
+    mask[0, 1, :] = False
+    (first, second), start, end = _runs(mask)
+
+    expected = []
+    for i in range(mask.shape[0]):
+        for j in range(mask.shape[1]):
+            k = 0
+            while k < mask.shape[2]:
+                if mask[i, j, k]:
+                    begin = k
+                    while k < mask.shape[2] and mask[i, j, k]:
+                        k += 1
+                    expected.append((i, j, begin, k))
+                else:
+                    k += 1
+
+    assert sorted(zip(first, second, start, end)) == expected
+
+
+# A daily index with a clear drought of five days in one country
+def drought_index():
+
+    index = np.full((60, 2), 0.5)
+    index[20:25, 0] = 0.05
+    return xr.DataArray(index, dims=('time', 'country'),
+                        coords=dict(time=pd.date_range('2001-01-01', periods=60), country=['NL', 'DE']))
+
+
+def test_threshold_events():
+
+    events = detect_events(drought_index(), durations=[1, 5], definition='threshold', threshold=0.1)
+
+    assert set(events.country) == {'NL'}
+    five = events[events.duration_days == 5].iloc[0]
+    assert five.start == pd.Timestamp('2001-01-21')
+    assert five.end == pd.Timestamp('2001-01-26')
+    np.testing.assert_allclose(five.lowest_mean, 0.05)
+    np.testing.assert_allclose(five.severity, (0.1 - 0.05) * 5)
+
+
+def test_threshold_definition_needs_a_threshold():
+
+    with pytest.raises(ValueError):
+        detect_events(drought_index(), definition='threshold')
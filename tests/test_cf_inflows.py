@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the ScaledInflows loader: the stamps are parsed in one go and the
+cache is used until a country file changes
+"""
+
+import os
+import numpy as np
+import xarray as xr
+import pytest
+import cf_inflows
+from cf_inflows import parse_stamps, read_inflows, load_inflows, inflow_pattern, technologies, linear_reservoir, write_inflow_tables
+
+
+# Function to write the file of a country with two days of inflows, the stamps
+# without leading zeros as in the original files
+def write_country(data_path, code, offset=0., stamps=None):
+
+    if stamps is None:
+        stamps = ['1/{}/2050 {}:00'.format(1 + hour // 24, hour % 24) for hour in range(48)]
+    path = os.path.join(str(data_path), inflow_pattern.format(code=code))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write('time,HDAM,HPHS,HROR\n')
+        for hour, stamp in enumerate(stamps):
+            file.write('{},{},{},0\n'.format(stamp, hour + offset, 2 * hour + offset))
+
+
+def test_stamps_with_and_without_leading_zeros():
+
+    times = parse_stamps(['1/2/2050 3:00', '01/02/2050 03:00', '12/31/2050 23:30'])
+
+    np.testing.assert_array_equal(times, np.array(['2050-01-02T03:00', '2050-01-02T03:00', '2050-12-31T23:30'],
+                                                  dtype='datetime64[ns]'))
+    with pytest.raises(ValueError):
+        parse_stamps(['1/2/2050 3:00', '2050-01-02 03:00'])
+
+
+def test_countries_in_one_array(tmp_path):
+
+    write_country(tmp_path, 'NL')
+    write_country(tmp_path, 'BE', offset=100.)
+
+    times, values = read_inflows(str(tmp_path), ['NL', 'BE'])
+
+    assert times[25] == np.datetime64('2050-01-02T01:00')
+    assert values.shape == (48, 2, 2) and values.dtype == np.float32
+    np.testing.assert_array_equal(values[3, 1], [103., 106.])
+
+    # The countries have to share the time axis
+    write_country(tmp_path, 'BE', stamps=['1/1/2050 {}:00'.format(hour % 24) for hour in range(48)])
+    with pytest.raises(ValueError):
+        read_inflows(str(tmp_path), ['NL', 'BE'])
+
+
+def test_cache_is_used_until_a_file_changes(tmp_path, monkeypatch):
+
+    write_country(tmp_path, 'NL')
+    cache = str(tmp_path / 'cache')
+    expected = load_inflows(str(tmp_path), cache, ['NL'])
+
+    # The cache is read without the csv files
+    def no_read(data_path, codes):
+        raise AssertionError('the csv files were read')
+    with monkeypatch.context() as patch:
+        patch.setattr(cf_inflows, 'read_inflows', no_read)
+        cached = load_inflows(str(tmp_path), cache, ['NL'])
+    np.testing.assert_array_equal(cached.values, expected.values)
+    assert list(cached.technology.values) == ['HDAM', 'HPHS']
+
+    # A changed file makes the cache again
+    write_country(tmp_path, 'NL', offset=1000.)
+    assert float(load_inflows(str(tmp_path), cache, ['NL']).isel(time=0, country=0, technology=0)) == 1000.
+
+
+def test_reservoir_keeps_the_volume_and_delays_it():
+
+    # A steady inflow stays as it is, the reservoir starts in balance
+    steady = np.full((100, 2), 5.)
+    np.testing.assert_allclose(linear_reservoir(steady, 24.), steady)
+
+    # A pulse is released over time, with the volume kept
+    pulse = np.zeros((2000, 1))
+    pulse[200] = 24.
+    routed = linear_reservoir(pulse, 24., spin_up=100)
+    assert routed[199, 0] == 0. and 0. < routed[200, 0] < 24. and routed[201, 0] < routed[200, 0]
+    np.testing.assert_allclose(routed.sum(), 24., rtol=1e-6)
+
+    # Without a time constant nothing is routed
+    np.testing.assert_array_equal(linear_reservoir(pulse, 0), pulse)
+
+
+def test_tables_in_the_layout_of_scaled_inflows(tmp_path):
+
+    write_country(tmp_path, 'NL')
+    times, values = read_inflows(str(tmp_path), ['NL'])
+    da = xr.DataArray(values, dims=('time', 'country', 'technology'),
+                      coords=dict(time=times, country=['NL'], technology=list(technologies)))
+
+    write_inflow_tables(da, str(tmp_path / 'out'), 'ScaledInflows_ERA5_2050')
+
+    table = str(tmp_path / 'out' / 'NL' / '1h' / 'ScaledInflows_ERA5_2050.csv')
+    with open(table) as file:
+        assert file.readline().strip() == ',HDAM,HPHS'
+        assert file.readline().startswith('01/01/2050 00:00,')
+    os.makedirs(str(tmp_path / 'again' / 'ScaledInflows' / 'NL' / '1h'))
+    os.replace(table, os.path.join(str(tmp_path / 'again'), inflow_pattern.format(code='NL')))
+    times_again, values_again = read_inflows(str(tmp_path / 'again'), ['NL'])
+    np.testing.assert_array_equal(times_again, times)
+    np.testing.assert_array_equal(values_again, values)
+
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the stage log: every stage is one record with its labels, and the
+summary adds the stages per job
+"""
+
+import time
+import pytest
+from cf_instrument import stage, load_log, summarise, print_summary, run_start
+
+
+# Function to write a record of a stage by hand, with a wall time
+def record(stage_name, wall_time, **labels):
+
+    return dict(labels, stage=stage_name, status='done', started='2026-10-19T10:00:00.000', wall_time=wall_time,
+                cpu_time=wall_time, process_cpu_time=wall_time, bytes_read=0, bytes_written=0,
+                process_peak_rss_mb=100., peak_growth_mb=0.)
+
+
+def test_stages_are_logged_with_their_labels(tmp_path):
+
+    log_file = str(tmp_path / 'timing.jsonl')
+    with stage(log_file, 'load', year='2000', month='01'):
+        time.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        with stage(log_file, 'write', year='2000', month='01'):
+            raise RuntimeError('disk full')
+
+    load, write = load_log(log_file)
+    assert (load['stage'], load['status'], load['year'], load['month']) == ('load', 'done', '2000', '01')
+    assert load['wall_time'] >= 0.01 and load['process_peak_rss_mb'] > 0 and load['peak_growth_mb'] >= 0
+    assert (write['stage'], write['status']) == ('write', 'failed')
+
+
+def test_records_of_a_run(tmp_path):
+
+    log_file = str(tmp_path / 'timing.jsonl')
+    with stage(log_file, 'load'):
+        pass
+    # The start times are in milliseconds
+    time.sleep(0.01)
+    since = run_start()
+    with stage(log_file, 'units'):
+        pass
+
+    assert [record['stage'] for record in load_log(log_file, since)] == ['units']
+    assert len(load_log(log_file)) == 2
+    assert load_log(str(tmp_path / 'other.jsonl')) == []
+    with stage(None, 'unlogged'):
+        pass
+
+
+def test_summary_per_stage_and_job():
+
+    records = [record('load', 2., year='2000', month='01'), record('write', 1., year='2000', month='01'),
+               record('load', 5., year='2000', month='02'), record('write', 1., year='2000', month='02')]
+
+    summary = summarise(records, top=1)
+
+    assert summary['stages']['load']['count'] == 2
+    assert summary['stages']['load']['wall_time'] == 7.
+    assert summary['slowest'] == [dict(year='2000', month='02', wall_time=6., stages=dict(load=5., write=1.))]
+
+
+def test_summary_of_a_log_file(tmp_path, capsys):
+
+    log_file = str(tmp_path / 'timing.jsonl')
+    with stage(log_file, 'load', year='2000', month='01'):
+        pass
+
+    summary = print_summary(log_file)
+
+    assert list(summary['stages']) == ['load']
+    assert '200001' in capsys.readouterr().out
+
+
+def test_stages_inside_a_stage_are_not_counted_twice():
+
+    records = [record('solar_jerez', 2., year='2000', month='01', parent='products'),
+               record('wind_grid', 3., year='2000', month='01', parent='products'),
+               record('products', 3.5, year='2000', month='01')]
+
+    summary = summarise(records)
+
+    assert summary['stages']['wind_grid']['parent'] == 'products'
+    assert summary['slowest'][0]['wall_time'] == 3.5
+    assert summary['slowest'][0]['stages'] == dict(products=3.5)
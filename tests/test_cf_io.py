@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the encodings of the capacity factors in the output files
+"""
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+import pytest
+from cf_io import cf_encoding, check_roundtrip, max_roundtrip_error, check_fill_values
+
+
+# A month of capacity factors on a small grid, with a missing value
+def capacity_factors(hours=96, seed=0):
+
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 0.95, (hours, 6, 7)).astype(np.float32)
+    values[0, 0, 0] = np.nan
+    return xr.Dataset(dict(windCF_on=(('time', 'latitude', 'longitude'), values)),
+                      coords=dict(time=pd.date_range('2000-01-01', periods=hours, freq='h'),
+                                  latitude=np.linspace(60, 55, 6), longitude=np.linspace(0, 6, 7)))
+
+
+def test_default_encoding_is_float():
+
+    ds = capacity_factors()
+    assert cf_encoding(ds, ['windCF_on']) == dict(windCF_on=dict(dtype='float32'))
+
+
+def test_packed_roundtrip_within_the_guaranteed_error(tmp_path):
+
+    ds = capacity_factors()
+    encoding = cf_encoding(ds, ['windCF_on'], 'packed')
+    assert check_roundtrip(ds, ['windCF_on'], 'packed', encoding) <= max_roundtrip_error('packed') + 1e-6
+
+    ds.to_netcdf(tmp_path / 'packed.nc', encoding=encoding)
+    with xr.open_dataset(tmp_path / 'packed.nc') as stored:
+        assert stored.windCF_on.encoding['dtype'] == np.int16
+        assert np.isnan(stored.windCF_on.values[0, 0, 0])
+        np.testing.assert_allclose(stored.windCF_on.values, ds.windCF_on.values, atol=max_roundtrip_error('packed') + 1e-6)
+
+
+def test_values_outside_the_packing_are_an_error():
+
+    ds = capacity_factors()
+    ds['windCF_on'][1, 1, 1] = 4.
+    with pytest.raises(ValueError):
+        check_roundtrip(ds, ['windCF_on'], 'packed')
+
+
+def test_file_chunks_follow_the_dask_chunks():
+
+    # A month in memory gets the chunks of the profile, never larger than the data
+    ds = capacity_factors()
+    assert cf_encoding(ds, ['windCF_on'], 'packed')['windCF_on']['chunksizes'] == (96, 6, 7)
+
+    # Split by dask along time every dask chunk writes whole file chunks
+    chunked = ds.chunk(dict(time=24))
+    assert cf_encoding(chunked, ['windCF_on'], 'packed')['windCF_on']['chunksizes'] == (24, 6, 7)
+    chunked = ds.chunk(dict(time=10, longitude=3))
+    assert cf_encoding(chunked, ['windCF_on'], 'packed')['windCF_on']['chunksizes'] == (10, 6, 3)
+
+
+def test_fill_values_of_float_data_are_missing():
+
+    check_fill_values(dict(solarCF=dict(_FillValue=np.nan, fill_value=np.nan)))
+    check_fill_values(dict(solarCF=dict(_FillValue=-32768, fill_value=-32768)))
+    with pytest.raises(ValueError):
+        check_fill_values(dict(solarCF=dict(_FillValue=-32768, fill_value=0)))
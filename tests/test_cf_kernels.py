@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the capacity factor kernels against the xarray implementations of the
+original mega loop
+"""
+
+import numpy as np
+import xarray as xr
+import pytest
+from cf_kernels import wind_potential, wind_potential_batch, solar_potential_bett2016, solar_potential_jerez2015, smooth_cells
+from cf_landsea import dataset_to_cells
+
+
+# The turbines of the mega loop
+offshore = dict(height=150.0, alpha=0.11, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=0.95)
+onshore = dict(height=120.0, alpha=0.143, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=0.95)
+
+
+# The wind potential of the original mega loop
+def baseline_wind_potential(wspd, height, alpha, cut_in_wspd, cut_out_start, cut_out_end, rated_wspd, maxCF):
+
+    wspd_height = wspd * (height / 100)**alpha
+    windCF = maxCF * ((wspd_height**3 - cut_in_wspd**3) / (rated_wspd**3 - cut_in_wspd**3))
+    windCF = windCF.where(wspd_height <= rated_wspd, maxCF)
+    windCF = windCF.where(wspd_height >= cut_in_wspd, 0)
+    windCF = windCF.where(wspd_height <= cut_out_start, maxCF*((cut_out_end-wspd_height)/(cut_out_end-cut_out_start)))
+    windCF = windCF.where(wspd_height <= cut_out_end, 0)
+
+    return windCF
+
+
+# The Bett & Thornton 2016 solar capacity factor of the original mega loop
+def baseline_solar_potential_bett2016(ds):
+
+    ALPHA = 4.20 * 10**(-3)
+    BETA = -4.60 * 10**(-3)
+    C1 = 0.033
+    C2 = -0.092
+    GSTC = 1000
+    TSTC = 25
+    T0 = 20
+    G0 = 800
+    TNOCT = 48
+
+    DTmod = ds.t2m + (TNOCT - T0)*ds.ssrd/G0 - TSTC
+    Nrel = (1 + ALPHA * DTmod) * (1 + C1*np.log(ds.ssrd/GSTC) + C2*np.log(ds.ssrd/GSTC)**2 + BETA*DTmod)
+    solarCF = (Nrel * ds.ssrd / GSTC).fillna(0)
+
+    return solarCF.where(solarCF >= 0, 0)
+
+
+# The Jerez 2015 solar capacity factor of the original mega loop
+def baseline_solar_potential_jerez2015(ds):
+
+    c = np.array([4.3, 0.943, 0.028, -1.528])
+    Tcell = c[0] + c[1]*ds.t2m + c[2]*ds.ssrd + c[3]*ds.wspd
+    solarCF = (1 + -0.005*(Tcell - 25))*ds.ssrd/1000
+
+    return solarCF.where(solarCF >= 0, 0)
+
+
+# Windspeeds over all regimes of the power curve, on a small grid
+def windspeed(seed=0, shape=(30, 4, 5)):
+
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 30, shape)
+    values[0, 0, :] = [0., 3., 11., 20., 25.]
+    return xr.DataArray(values, dims=('time', 'latitude', 'longitude'),
+                        coords=dict(latitude=np.linspace(50, 49, shape[1]), longitude=np.linspace(0, 1, shape[2])))
+
+
+def test_wind_potential_matches_baseline():
+
+    wspd = windspeed()
+    for turbine in [offshore, onshore]:
+        expected = baseline_wind_potential(wspd, **turbine)
+        result = wind_potential(wspd, **turbine)
+        assert result.dtype == np.float32
+        assert result.dims == wspd.dims
+        np.testing.assert_allclose(result.values, expected.values, atol=1e-6)
+
+
+def test_wind_potential_chunked_matches_in_memory():
+
+    wspd = windspeed(1)
+    expected = wind_potential(wspd, **onshore)
+    result = wind_potential(wspd.chunk(time=7), **onshore).compute()
+    np.testing.assert_array_equal(result.values, expected.values)
+
+
+def test_wind_potential_missing_windspeed_as_baseline():
+
+    # The original gives zero where the windspeed is missing
+    wspd = windspeed(2)
+    wspd[3, 1, 1] = np.nan
+    result = wind_potential(wspd, **offshore)
+    expected = baseline_wind_potential(wspd, **offshore)
+    assert result.values[3, 1, 1] == expected.values[3, 1, 1] == 0
+
+
+def test_wind_potential_batch_matches_single_turbines():
+
+    wspd = windspeed(3)
+    result = wind_potential_batch(wspd, [dict(offshore, name='offshore'), dict(onshore, name='onshore')])
+    assert result.dims == ('turbine',) + wspd.dims
+    assert list(result.turbine.values) == ['offshore', 'onshore']
+    for name, turbine in [('offshore', offshore), ('onshore', onshore)]:
+        np.testing.assert_allclose(result.sel(turbine=name).values, wind_potential(wspd, **turbine).values, atol=1e-6)
+
+
+def test_wind_potential_batch_chunked_matches_in_memory():
+
+    wspd = windspeed(4)
+    turbines = [dict(offshore, name='offshore'), dict(onshore, name='onshore')]
+    expected = wind_potential_batch(wspd, turbines)
+    result = wind_potential_batch(wspd.chunk(time=7), turbines).compute()
+    np.testing.assert_array_equal(result.values, expected.values)
+
+
+# Weather with night (no irradiance), day and extreme hours, in degree C and W/m2
+def weather(seed=0, shape=(48, 4, 5)):
+
+    rng = np.random.default_rng(seed)
+    ssrd = rng.uniform(-50, 1100, shape)
+    ssrd[ssrd < 100] = 0.
+    coords = dict(latitude=np.linspace(50, 49, shape[1]), longitude=np.linspace(0, 1, shape[2]))
+    dims = ('time', 'latitude', 'longitude')
+    return xr.Dataset(dict(t2m=(dims, rng.uniform(-20, 45, shape)), ssrd=(dims, ssrd),
+                           wspd=(dims, rng.uniform(0, 20, shape))), coords=coords)
+
+
+def test_solar_potential_bett2016_matches_baseline():
+
+    ds = weather()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        expected = baseline_solar_potential_bett2016(ds)
+    result = solar_potential_bett2016(ds)
+    assert result.dtype == np.float32
+    assert not np.isnan(result.values).any()
+    assert (result.values[ds.ssrd.values == 0] == 0).all()
+    np.testing.assert_allclose(result.values, expected.values, atol=1e-6)
+
+
+def test_solar_potential_bett2016_chunked_matches_in_memory():
+
+    ds = weather(1)
+    expected = solar_potential_bett2016(ds)
+    result = solar_potential_bett2016(ds.chunk(time=7)).compute()
+    np.testing.assert_array_equal(result.values, expected.values)
+
+def test_solar_potential_jerez2015_matches_baseline():
+
+    ds = weather(2)
+    np.testing.assert_allclose(solar_potential_jerez2015(ds).values, baseline_solar_potential_jerez2015(ds).values, atol=1e-12)
+
+
+# A field of a parameter on the grid of the weather, with values from 0.5 to 1
+def derate_field(ds, seed=5):
+
+    rng = np.random.default_rng(seed)
+    return xr.DataArray(rng.uniform(0.5, 1., (ds.sizes['latitude'], ds.sizes['longitude'])), dims=('latitude', 'longitude'),
+                        coords=dict(latitude=ds.latitude, longitude=ds.longitude))
+
+
+def test_parameter_field_matched_by_coordinates():
+
+    ds = weather(3)
+    derate = derate_field(ds)
+    flipped = derate.isel(latitude=slice(None, None, -1))
+    expected = solar_potential_bett2016(ds) * derate
+    for field in [derate, flipped]:
+        np.testing.assert_allclose(solar_potential_bett2016(ds, derate=field).values, expected.values, rtol=1e-6)
+        np.testing.assert_allclose(solar_potential_jerez2015(ds, derate=field).values,
+                                   (solar_potential_jerez2015(ds) * derate).values, rtol=1e-12)
+
+
+def test_parameter_field_picked_at_the_cells():
+
+    ds = weather(4)
+    derate = derate_field(ds)
+    mask = xr.DataArray(np.random.default_rng(6).random((ds.sizes['latitude'], ds.sizes['longitude'])) > 0.5,
+                        dims=('latitude', 'longitude'), coords=dict(latitude=ds.latitude, longitude=ds.longitude))
+    cells = dataset_to_cells(ds, mask, 'cell_land')
+    index = np.flatnonzero(mask.values)
+
+    expected = solar_potential_bett2016(ds, derate=derate).values.reshape(ds.sizes['time'], -1)[:, index]
+    result = solar_potential_bett2016(cells, derate=derate.isel(latitude=slice(None, None, -1)))
+    np.testing.assert_allclose(result.values, expected)
+
+    turbine = dict(onshore, alpha=derate - 0.5)
+    expected = wind_potential_batch(ds.wspd, [turbine]).values.reshape(1, ds.sizes['time'], -1)[..., index]
+    np.testing.assert_allclose(wind_potential_batch(cells.wspd, [turbine]).values, expected)
+
+
+def test_parameter_field_on_another_grid_is_an_error():
+
+    ds = weather(5)
+    cropped = derate_field(ds).isel(latitude=slice(0, 2))
+    with pytest.raises(ValueError):
+        solar_potential_bett2016(ds, derate=cropped)
+    shifted = derate_field(ds).assign_coords(longitude=ds.longitude + 0.1)
+    with pytest.raises(ValueError):
+        wind_potential_batch(ds.wspd, [dict(onshore, alpha=shifted)])
+
+
+
+def test_parameter_fields_keep_the_chunks_of_the_data():
+
+    ds = weather(6)
+    derate = derate_field(ds)
+    chunks = dict(time=16, latitude=2, longitude=3)
+    turbines = [dict(onshore, alpha=derate - 0.5), dict(offshore, height=derate * 150)]
+
+    result = solar_potential_bett2016(ds.chunk(chunks), derate=derate)
+    assert result.chunks == ds.ssrd.chunk(chunks).chunks
+    np.testing.assert_array_equal(result.values, solar_potential_bett2016(ds, derate=derate).values)
+
+    result = wind_potential(ds.wspd.chunk(chunks), **turbines[0])
+    assert result.chunks == ds.wspd.chunk(chunks).chunks
+    np.testing.assert_array_equal(result.values, wind_potential(ds.wspd, **turbines[0]).values)
+
+    result = wind_potential_batch(ds.wspd.chunk(chunks), turbines)
+    assert result.chunks[1:] == ds.wspd.chunk(chunks).chunks
+    np.testing.assert_array_equal(result.values, wind_potential_batch(ds.wspd, turbines).values)
+
+
+def test_smoothing_keeps_constant_fields_and_missing_cells():
+
+    field = xr.DataArray(np.full((3, 6, 7), 0.4, dtype=np.float32), dims=('time', 'latitude', 'longitude'))
+    field[:, :, 0] = np.nan
+
+    smoothed = smooth_cells(field, 1.5)
+
+    # Renormalised over the valid cells, so the edges and the coast keep their value
+    assert smoothed.dims == field.dims
+    assert np.isnan(smoothed.values[:, :, 0]).all()
+    np.testing.assert_allclose(smoothed.values[:, :, 1:], 0.4, rtol=1e-5)
+
+
+def test_smoothing_spreads_over_the_neighbours():
+
+    field = xr.DataArray(np.zeros((2, 17, 17), dtype=np.float32), dims=('time', 'latitude', 'longitude'))
+    field[0, 8, 8] = 1.
+
+    smoothed = smooth_cells(field, 1.).values
+
+    # Every time step on its own, the total is kept away from the edges
+    assert smoothed[0, 8, 8] < 1. and smoothed[0, 7, 8] > 0.
+    np.testing.assert_allclose(smoothed[0].sum(), 1., rtol=1e-4)
+    np.testing.assert_array_equal(smoothed[1], 0.)
+
+
+def test_spatial_smoothing_of_the_turbines():
+
+    wspd = windspeed()
+    windCF = wind_potential_batch(wspd, [offshore, dict(onshore, spatial_sigma=1.)])
+
+    np.testing.assert_array_equal(windCF.values[0], wind_potential(wspd, **offshore).values)
+    np.testing.assert_allclose(windCF.values[1], smooth_cells(wind_potential(wspd, **onshore), 1.).values, rtol=1e-6)
+    np.testing.assert_allclose(wind_potential_batch(wspd.chunk(time=7, latitude=2), [offshore, dict(onshore, spatial_sigma=1.)]).values,
+                               windCF.values, rtol=1e-6)
+
+    # The sparse cells have no neighbours
+    mask = xr.DataArray(np.arange(20).reshape(4, 5) % 3 == 0, dims=('latitude', 'longitude'),
+                        coords=dict(latitude=wspd.latitude, longitude=wspd.longitude))
+    cells = dataset_to_cells(xr.Dataset(dict(wspd100m=wspd)), mask, 'cell_land').wspd100m
+    with pytest.raises(ValueError):
+        wind_potential_batch(cells, [dict(onshore, spatial_sigma=1.)])
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the land and sea cells: the mask is matched to the grid of the data
+and the cells go back on the grid where they came from
+"""
+
+import numpy as np
+import xarray as xr
+import pytest
+from cf_landsea import land_sea_cells, to_cells, to_grid, dataset_to_cells, cell_coords
+
+
+# The grid of the data, latitude descending as in ERA5
+latitude = 52. - 0.25 * np.arange(5)
+longitude = 3. + 0.25 * np.arange(6)
+
+
+# Function to write a land-sea mask with ascending latitude as cdo makes them,
+# land in the east and a missing cell in the north west
+def write_lsm(path):
+
+    lsm = np.where(longitude >= 4., 1., 0.)[None, :] * np.ones((len(latitude), 1))
+    lsm[0, 0] = np.nan
+    xr.Dataset(dict(lsm=(('time', 'lat', 'lon'), lsm[None, ::-1])),
+               coords=dict(lat=latitude[::-1], lon=longitude)).to_netcdf(str(path))
+
+    return str(path)
+
+
+# A field of two hours on the grid of the data
+def field(seed=0):
+
+    values = np.random.default_rng(seed).random((2, len(latitude), len(longitude)))
+    return xr.DataArray(values, dims=('time', 'latitude', 'longitude'), name='windCF',
+                        coords=dict(latitude=latitude, longitude=longitude))
+
+
+def test_mask_is_matched_to_the_grid_of_the_data(tmp_path):
+
+    cells = land_sea_cells(write_lsm(tmp_path / 'lsm.nc'), latitude, longitude)
+
+    np.testing.assert_array_equal(cells.latitude.values, latitude)
+    np.testing.assert_array_equal(cells.land.values, longitude[None, :] >= 4. + np.zeros((len(latitude), 1)))
+
+    # The missing cell is neither land nor sea
+    assert not cells.land.values[0, 0] and not cells.sea.values[0, 0]
+    assert cells.sea.values[1, 0]
+
+
+def test_coastal_buffer_is_land_and_sea(tmp_path):
+
+    cells = land_sea_cells(write_lsm(tmp_path / 'lsm.nc'), latitude, longitude, coastal_buffer=1)
+
+    both = cells.land.values & cells.sea.values
+    assert both[:, 3].all() and both[:, 4].all()
+    assert not both[:, [0, 1, 2, 5]].any()
+
+
+def test_mask_on_another_grid_is_an_error(tmp_path):
+
+    with pytest.raises(ValueError):
+        land_sea_cells(write_lsm(tmp_path / 'lsm.nc'), latitude, longitude + 0.1)
+
+
+def test_cells_go_back_on_their_place(tmp_path):
+
+    cells = land_sea_cells(write_lsm(tmp_path / 'lsm.nc'), latitude, longitude)
+    da = field()
+
+    land = to_cells(da, cells.land, 'cell_land')
+    assert land.dims == ('time', 'cell_land')
+    np.testing.assert_array_equal(land.cell_land.values, np.flatnonzero(cells.land.values))
+    name_lat, name_lon = cell_coords('cell_land')
+    np.testing.assert_array_equal(land[name_lon].values >= 4., True)
+
+    grid = to_grid(land, latitude, longitude, 'cell_land')
+    xr.testing.assert_equal(grid, da.where(cells.land))
+
+
+def test_chunked_cells_stay_lazy(tmp_path):
+
+    cells = land_sea_cells(write_lsm(tmp_path / 'lsm.nc'), latitude, longitude)
+    ds = xr.Dataset(dict(windCF=field().chunk(time=1)))
+
+    sea = dataset_to_cells(ds, cells.sea, 'cell_sea')
+
+    assert sea.windCF.chunks is not None
+    xr.testing.assert_equal(sea.windCF.compute(), to_cells(field(), cells.sea, 'cell_sea'))
+
+
+def test_field_on_another_grid_is_an_error(tmp_path):
+
+    cells = land_sea_cells(write_lsm(tmp_path / 'lsm.nc'), latitude, longitude)
+
+    with pytest.raises(ValueError):
+        to_cells(field().isel(latitude=slice(None, None, -1)), cells.land)
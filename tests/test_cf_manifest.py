@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the manifest: a job is current only with the same parameters and
+unchanged inputs and outputs
+"""
+
+import os
+import numpy as np
+import xarray as xr
+import cf_manifest
+from cf_manifest import manifest_entry, is_current, save_manifest, load_manifest, atomic_to_netcdf, atomic_save_array
+
+
+# An input and an output file of a job
+def job_files(tmp_path):
+
+    inputs = [str(tmp_path / 'input.nc')]
+    outputs = [str(tmp_path / 'output.nc')]
+    for path, content in [(inputs[0], b'input data'), (outputs[0], b'output data')]:
+        with open(path, 'wb') as file:
+            file.write(content)
+    return inputs, outputs
+
+
+def test_unchanged_job_is_current(tmp_path):
+
+    inputs, outputs = job_files(tmp_path)
+    params = dict(maxCF=0.95, turbines=[dict(height=150.0)])
+    entry = manifest_entry(inputs, params, outputs)
+
+    assert is_current(entry, inputs, params, outputs)
+
+    # Also after a round trip through the manifest file
+    save_manifest(dict(job=entry), str(tmp_path / 'manifest.json'))
+    assert is_current(load_manifest(str(tmp_path / 'manifest.json'))['job'], inputs, params, outputs)
+
+
+def test_missing_entry_or_other_parameters_are_not_current(tmp_path):
+
+    inputs, outputs = job_files(tmp_path)
+    entry = manifest_entry(inputs, dict(maxCF=0.95), outputs)
+
+    assert not is_current(None, inputs, dict(maxCF=0.95), outputs)
+    assert not is_current(entry, inputs, dict(maxCF=0.9), outputs)
+    assert not is_current(entry, inputs, dict(maxCF=0.95), outputs + [str(tmp_path / 'other.nc')])
+
+
+def test_changed_or_removed_files_are_not_current(tmp_path):
+
+    inputs, outputs = job_files(tmp_path)
+    entry = manifest_entry(inputs, {}, outputs)
+
+    # Same size, other content and time
+    with open(inputs[0], 'wb') as file:
+        file.write(b'INPUT DATA')
+    os.utime(inputs[0], (1, 1))
+    assert not is_current(entry, inputs, {}, outputs)
+
+    inputs, outputs = job_files(tmp_path)
+    entry = manifest_entry(inputs, {}, outputs)
+    os.remove(outputs[0])
+    assert not is_current(entry, inputs, {}, outputs)
+
+
+def test_files_are_not_hashed_by_default(tmp_path, monkeypatch):
+
+    # Any read of a whole file fails the test
+    def no_hash(path):
+        raise AssertionError('hashed '+path)
+    monkeypatch.setattr(cf_manifest, 'file_hash', no_hash)
+
+    inputs, outputs = job_files(tmp_path)
+    entry = manifest_entry(inputs, {}, outputs)
+    assert 'sha256' not in entry['inputs'][inputs[0]]
+    assert is_current(entry, inputs, {}, outputs)
+
+    # Without a checksum a touched file counts as changed
+    os.utime(inputs[0], (1, 1))
+    assert not is_current(entry, inputs, {}, outputs)
+
+
+def test_touched_file_is_recognised_by_checksum(tmp_path):
+
+    inputs, outputs = job_files(tmp_path)
+    entry = manifest_entry(inputs, {}, outputs, checksum=True)
+    os.utime(inputs[0], (1, 1))
+
+    assert is_current(entry, inputs, {}, outputs)
+
+
+def test_known_checksum_is_reused(tmp_path, monkeypatch):
+
+    inputs, outputs = job_files(tmp_path)
+    known = manifest_entry(inputs, {}, outputs, checksum=True)
+
+    # The input did not change, so only the outputs are hashed again
+    hashed = []
+    file_hash = cf_manifest.file_hash
+    monkeypatch.setattr(cf_manifest, 'file_hash', lambda path: hashed.append(path) or file_hash(path))
+    entry = manifest_entry(inputs, {}, outputs, known, checksum=True)
+
+    assert hashed == outputs
+    assert entry['inputs'] == known['inputs']
+
+
+def test_atomic_write_leaves_no_temporary_file(tmp_path):
+
+    path = str(tmp_path / 'values.nc')
+    atomic_to_netcdf(xr.Dataset(dict(values=('x', np.arange(5)))), path)
+
+    with xr.open_dataset(path) as ds:
+        np.testing.assert_array_equal(ds['values'].values, np.arange(5))
+    assert not os.path.exists(path+'.tmp')
+
+
+def test_atomic_save_array_leaves_no_temporary_file(tmp_path):
+
+    path = str(tmp_path / 'values.npy')
+    atomic_save_array(path, np.arange(5))
+
+    np.testing.assert_array_equal(np.load(path, mmap_mode='r'), np.arange(5))
+    assert not os.path.exists(path+'.tmp')
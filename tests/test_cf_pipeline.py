@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the mega loop of 1_CF_ERA5-EU.py on a small synthetic ERA5 month
+"""
+
+import importlib.util
+import os.path
+import numpy as np
+import xarray as xr
+from era5_synthetic import write_synthetic_month
+from cf_kernels import smooth_cells
+from cf_power_curves import idealised_curve
+
+
+# The script of the mega loop
+script = os.path.join(os.path.dirname(__file__), '..', 'src', '1_CF_ERA5-EU.py')
+
+# A small grid
+latitude = 52. - 0.25 * np.arange(8)
+longitude = 3. + 0.25 * np.arange(10)
+
+
+# Function to load the script with its input and output in a folder, settings
+# are changed on the module before a month is processed
+def load_pipeline(folder, **settings):
+
+    spec = importlib.util.spec_from_file_location('cf_era5', script)
+    pipeline = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(pipeline)
+
+    os.makedirs(str(folder), exist_ok=True)
+    folder = str(folder)+'/'
+    pipeline.file_path = folder
+    pipeline.out_path = folder
+    pipeline.timing_log = folder+'timing.jsonl'
+    pipeline.manifest_path = folder+'manifest.json'
+    for name, value in settings.items():
+        setattr(pipeline, name, value)
+
+    write_synthetic_month(pipeline.input_file('2000', '01'), '2000', '01', latitude=latitude, longitude=longitude, hours=48)
+
+    return pipeline
+
+
+# Function to write a land-sea mask of the small grid, land in the east
+def write_lsm(folder):
+
+    lsm = xr.DataArray(np.where(longitude > 4., 1., 0.)[None, :] * np.ones((len(latitude), 1)), dims=('latitude', 'longitude'),
+                       coords=dict(latitude=latitude, longitude=longitude), name='lsm')
+    lsm.to_dataset().to_netcdf(os.path.join(str(folder), 'lsm.nc'))
+
+    return os.path.join(str(folder), 'lsm.nc')
+
+
+# Function to run a month and read its output
+def run_month(pipeline):
+
+    pipeline.process_month('2000', '01')
+    with xr.open_dataset(pipeline.output_file('2000', '01')) as ds:
+        return ds.load()
+
+
+def test_all_products(tmp_path):
+
+    ds = run_month(load_pipeline(tmp_path))
+
+    assert set(ds.data_vars) == {'solarCF', 'solarCF_bett', 'windCF_on', 'windCF_off'}
+    assert ds.solarCF.dims == ('time', 'latitude', 'longitude')
+    assert float(ds.windCF_on.max()) <= 0.95
+
+
+def test_only_the_configured_products(tmp_path):
+
+    # Only wind, so no solar product is run and the solar fields are never read
+    full = load_pipeline(tmp_path / 'full')
+    wind = load_pipeline(tmp_path / 'wind', cf_products=dict(windCF_on='wind', windCF_off='wind'),
+                         cf_attrs={name: full.cf_attrs[name] for name in ['windCF_on', 'windCF_off']})
+    assert wind.read_products(wind.cf_products) == ['wind']
+
+    expected = run_month(full)
+    ds = run_month(wind)
+    assert set(ds.data_vars) == {'windCF_on', 'windCF_off'}
+    xr.testing.assert_equal(ds.windCF_on, expected.windCF_on)
+
+    # Only one solar method
+    solar = load_pipeline(tmp_path / 'solar', cf_products=dict(solarCF_bett='solar_bett'),
+                          cf_attrs=dict(solarCF_bett=full.cf_attrs['solarCF_bett']))
+    ds = run_month(solar)
+    assert set(ds.data_vars) == {'solarCF_bett'}
+    xr.testing.assert_equal(ds.solarCF_bett, expected.solarCF_bett)
+
+
+def test_only_the_configured_products_on_cells(tmp_path):
+
+    # Offshore wind on the sea cells only
+    pipeline = load_pipeline(tmp_path, cf_products=dict(windCF_off='wind'), sparse_cells=True, coastal_buffer=0,
+                             lsm_file=write_lsm(tmp_path))
+    pipeline.cf_attrs = dict(windCF_off=pipeline.cf_attrs['windCF_off'])
+    ds = run_month(pipeline)
+
+    assert set(ds.data_vars) == {'windCF_off'}
+    assert ds.windCF_off.dims == ('time', 'cell_sea')
+    assert ds.sizes['cell_sea'] == (longitude <= 4.).sum() * len(latitude)
+
+
+def test_threaded_products_match_serial(tmp_path):
+
+    serial = run_month(load_pipeline(tmp_path / 'serial', product_threads=1))
+    threaded = run_month(load_pipeline(tmp_path / 'threaded', product_threads=4))
+
+    for name in serial.data_vars:
+        np.testing.assert_array_equal(threaded[name].values, serial[name].values)
+
+
+def test_tabulated_and_smoothed_turbines(tmp_path):
+
+    # The onshore turbine as tabulated idealised curve, smoothed over the cells
+    full = load_pipeline(tmp_path / 'full')
+    onshore = [turbine for turbine in full.turbines if turbine['name'] == 'onshore'][0]
+    curves = dict(onshore=idealised_curve(onshore['cut_in_wspd'], onshore['rated_wspd'], onshore['cut_out_start'],
+                                          onshore['cut_out_end'], onshore['maxCF'], step=0.01))
+    turbines = [turbine if turbine['name'] != 'onshore' else dict(turbine, curve='onshore', spatial_sigma=1.)
+                for turbine in full.turbines]
+    tabulated = load_pipeline(tmp_path / 'tabulated', turbines=turbines, power_curves=curves)
+
+    expected = run_month(full)
+    ds = run_month(tabulated)
+
+    np.testing.assert_array_equal(ds.windCF_off.values, expected.windCF_off.values)
+    np.testing.assert_allclose(ds.windCF_on.values, smooth_cells(expected.windCF_on, 1.).values, atol=5e-3)
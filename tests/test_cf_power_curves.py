@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the tabulated power curves: the lookup table of the idealised curve
+gives the capacity factors of wind_kernel
+"""
+
+import numpy as np
+import xarray as xr
+from cf_power_curves import idealised_curve, build_lut, curve_potential, load_power_curves, lut_step
+from cf_kernels import wind_kernel, wind_potential_batch
+
+
+# The turbines of the mega loop
+offshore = dict(height=150.0, alpha=0.11, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=0.95)
+onshore = dict(height=120.0, alpha=0.143, cut_in_wspd=3.0, cut_out_start=20.0, cut_out_end=25.0, rated_wspd=11.0, maxCF=0.95)
+
+
+# Function giving the idealised curve of a turbine as tabulated curve
+def tabulated(turbine, name, **options):
+
+    speeds, power = idealised_curve(turbine['cut_in_wspd'], turbine['rated_wspd'], turbine['cut_out_start'],
+                                    turbine['cut_out_end'], turbine['maxCF'], step=0.01)
+    return dict(turbine, name=name, speeds=speeds, power=power, **options)
+
+
+# Windspeeds over all regimes of the power curve, on a small grid
+def windspeed(seed=0, shape=(30, 4, 5)):
+
+    rng = np.random.default_rng(seed)
+    return xr.DataArray(rng.uniform(0, 30, shape), dims=('time', 'latitude', 'longitude'),
+                        coords=dict(latitude=np.linspace(50, 49, shape[1]), longitude=np.linspace(0, 1, shape[2])))
+
+
+def test_lookup_table_matches_wind_kernel_on_the_buckets():
+
+    lut = build_lut([tabulated(offshore, 'offshore'), tabulated(onshore, 'onshore')])
+    buckets = np.arange(lut.shape[1]) * lut_step
+
+    for row, turbine in zip(lut, [offshore, onshore]):
+        np.testing.assert_allclose(row, wind_kernel(buckets, **turbine), atol=2e-3)
+
+
+def test_lookup_table_loss_and_windspeed_spread():
+
+    curve = tabulated(onshore, 'onshore')
+    plain, lossy, spread = build_lut([curve, dict(curve, loss=0.9), dict(curve, wspd_sigma=1.)])
+
+    np.testing.assert_allclose(lossy, 0.9 * plain, rtol=1e-6)
+
+    # The spread rounds the corners of the curve but keeps its plateau
+    rated = int(11. / (1.2**0.143) / lut_step)
+    assert spread[rated] < plain[rated]
+    assert abs(spread[int(15. / lut_step)] - 0.95) < 1e-3
+
+
+def test_curve_potential_matches_wind_kernel():
+
+    wspd = windspeed()
+    windCF = curve_potential(wspd, [tabulated(offshore, 'offshore'), tabulated(onshore, 'onshore')])
+
+    assert list(windCF.turbine.values) == ['offshore', 'onshore']
+    for name, turbine in [('offshore', offshore), ('onshore', onshore)]:
+        # The nearest bucket is off by at most half a step of the windspeed
+        np.testing.assert_allclose(windCF.sel(turbine=name).values, wind_kernel(wspd.values, **turbine), atol=5e-3)
+
+
+def test_curve_potential_chunked_and_missing():
+
+    wspd = windspeed()
+    wspd[0, 0, 0] = np.nan
+    curves = [tabulated(offshore, 'offshore')]
+
+    expected = curve_potential(wspd, curves)
+    assert np.isnan(expected.values[0, 0, 0, 0])
+    np.testing.assert_array_equal(curve_potential(wspd.chunk(time=7), curves).values, expected.values)
+
+
+def test_spatial_smoothing_of_the_curves_matches_the_turbines():
+
+    wspd = windspeed()
+    curve = tabulated(onshore, 'onshore', spatial_sigma=1.)
+
+    expected = wind_potential_batch(wspd, [dict(onshore, spatial_sigma=1.)]).values
+    np.testing.assert_allclose(curve_potential(wspd, [curve]).values, expected, atol=5e-3)
+    assert not np.allclose(curve_potential(wspd, [dict(curve, spatial_sigma=0)]).values, expected, atol=5e-3)
+
+
+def test_curves_from_a_csv_file(tmp_path):
+
+    with open(str(tmp_path / 'curves.csv'), 'w') as file:
+        file.write('wspd,small,large\n10,0.5,0.8\n0,0,0\n20,1,1\n')
+
+    curves = load_power_curves(str(tmp_path / 'curves.csv'))
+
+    assert list(curves) == ['small', 'large']
+    np.testing.assert_array_equal(curves['small'][0], [0., 10., 20.])
+    np.testing.assert_array_equal(curves['large'][1], [0., 0.8, 1.])
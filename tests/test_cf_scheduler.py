@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the scheduler: the jobs that are done are skipped and every job ends
+up in the report, also when it fails or runs on the process pool
+"""
+
+from cf_scheduler import expand_jobs, run_jobs, run_threads
+
+
+# A job that gives its year and month, and fails in February
+def job(year, month):
+
+    if month == '02':
+        raise RuntimeError('no data for '+year+month)
+    return year+month
+
+
+def test_jobs_of_a_range_of_years():
+
+    jobs = expand_jobs(1999, '2000', months=['01', '12'])
+
+    assert jobs == [('1999', '01'), ('1999', '12'), ('2000', '01'), ('2000', '12')]
+    assert len(expand_jobs(1950, 1950)) == 12
+
+
+def test_done_jobs_are_skipped_and_failures_reported():
+
+    jobs = expand_jobs(2000, 2000, months=['01', '02', '03'])
+    report = run_jobs(job, jobs, is_done=lambda year, month: month == '03')
+
+    status = {job['month']: job['status'] for job in report}
+    assert status == {'01': 'done', '02': 'failed', '03': 'skipped'}
+    assert [job['result'] for job in report if job['status'] == 'done'] == ['200001']
+
+
+def test_process_pool_gives_the_same_report():
+
+    jobs = expand_jobs(2000, 2001, months=['01', '02'])
+    serial = run_jobs(job, jobs)
+    pooled = run_jobs(job, jobs, workers=2)
+
+    order = lambda report: sorted((job['year'], job['month'], job['status'], job.get('result')) for job in report)
+    assert order(pooled) == order(serial)
+
+
+def test_finished_jobs_are_recorded_in_this_process():
+
+    recorded = []
+    run_jobs(job, expand_jobs(2000, 2000, months=['01', '02']), workers=2,
+             on_done=lambda year, month, result: recorded.append((year, month, result)))
+
+    # Only the jobs that finished
+    assert recorded == [('2000', '01', '200001')]
+
+
+def test_threads_give_the_result_of_every_task():
+
+    tasks = dict(solar=lambda: 'solarCF', wind=lambda: 'windCF')
+
+    assert run_threads(tasks, threads=2) == run_threads(tasks) == dict(solar='solarCF', wind='windCF')
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the running (Chan et al.) moments of the validation against the
+statistics of all data at once
+"""
+
+import numpy as np
+from cf_validation import new_moments, update_moments, update_groups, moment_stats
+
+
+# Pairs (time, cell) with missing values in both series and a cell without data
+def pairs(seed=0, shape=(500, 6)):
+
+    rng = np.random.default_rng(seed)
+    x = rng.random(shape)
+    y = 0.8 * x + 0.2 * rng.random(shape) + 0.05
+    x[rng.random(shape) < 0.1] = np.nan
+    y[rng.random(shape) < 0.1] = np.nan
+    x[:, -1] = np.nan
+    return x, y
+
+
+# The statistics of all pairs of one cell at once
+def direct_stats(x, y):
+
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    return dict(bias=np.mean(x - y), rmse=np.sqrt(np.mean((x - y)**2)), correlation=np.corrcoef(x, y)[0, 1],
+                mean=np.mean(x), mean_reference=np.mean(y))
+
+
+def test_block_updates_match_direct_statistics():
+
+    x, y = pairs()
+    moments = new_moments(x.shape[1])
+    for start in range(0, x.shape[0], 37):
+        update_moments(moments, x[start:start + 37], y[start:start + 37])
+    stats = moment_stats(moments)
+
+    for cell in range(x.shape[1] - 1):
+        for key, value in direct_stats(x[:, cell], y[:, cell]).items():
+            np.testing.assert_allclose(stats[key][cell], value, rtol=1e-10)
+
+    # A cell without data has no pairs and NaN statistics
+    assert stats['count'][-1] == 0
+    assert all(np.isnan(values[-1]) for key, values in stats.items() if key != 'count')
+
+
+def test_block_size_does_not_matter():
+
+    x, y = pairs(1)
+    results = []
+    for block in [1, 24, 500]:
+        moments = new_moments(x.shape[1])
+        for start in range(0, x.shape[0], block):
+            update_moments(moments, x[start:start + block], y[start:start + block])
+        results.append(moments)
+
+    for moments in results[1:]:
+        for key in moments:
+            np.testing.assert_allclose(moments[key], results[0][key], rtol=1e-9, atol=1e-12)
+
+
+def test_group_updates_match_direct_statistics():
+
+    x, y = pairs(2)
+    groups = np.arange(x.shape[0]) % 24
+    moments = new_moments((24, x.shape[1]))
+    for start in range(0, x.shape[0], 100):
+        block = slice(start, start + 100)
+        update_groups(moments, x[block], y[block], groups[block])
+    stats = moment_stats(moments)
+
+    for group in [0, 7, 23]:
+        select = groups == group
+        for key, value in direct_stats(x[select, 0], y[select, 0]).items():
+            np.testing.assert_allclose(stats[key][group, 0], value, rtol=1e-10)
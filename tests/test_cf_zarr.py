@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of the zarr store: months are written in their region along time, the
+manifest knows which regions are in which store
+"""
+
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import xarray as xr
+import pytest
+from cf_zarr import create_store, hourly_times, write_region, is_written, netcdf_to_store, check_store
+from cf_io import max_roundtrip_error
+
+
+# A small grid
+latitude = np.array([52.0, 51.75, 51.5])
+longitude = np.array([3.0, 3.25])
+
+# The attributes of the capacity factors in the store
+variables = dict(windCF_on=dict(units=' '), solarCF=dict(units=' '))
+
+
+# Function to make capacity factors of whole days, starting at a day
+def capacity_factors(start, days=2, seed=0):
+
+    times = pd.date_range(start, periods=24 * days, freq='h')
+    rng = np.random.default_rng(seed)
+    return xr.Dataset({name: (('time', 'latitude', 'longitude'), rng.random((len(times), 3, 2)).astype(np.float32))
+                       for name in variables}, coords=dict(time=times, latitude=latitude, longitude=longitude))
+
+
+def test_months_are_written_in_their_region(tmp_path):
+
+    store = str(tmp_path / 'cf.zarr')
+    create_store(store, hourly_times(2000, 2000), latitude, longitude, variables, profile='float')
+    ds = capacity_factors('2000-01-03')
+
+    region = write_region(store, ds)
+
+    stored = xr.open_zarr(store, consolidated=True)
+    assert stored.sizes['time'] == 366 * 24
+    xr.testing.assert_equal(stored.sel(time=ds.time).load()[list(variables)], ds)
+    assert np.isnan(stored.windCF_on.isel(time=0).values).all()
+    assert region['steps'] == 48 and region['start'].startswith('2000-01-03')
+    assert is_written(store, region)
+
+
+def test_regions_that_do_not_line_up_are_an_error(tmp_path):
+
+    store = str(tmp_path / 'cf.zarr')
+    create_store(store, hourly_times(2000, 2000), latitude, longitude, variables, profile='float')
+    ds = capacity_factors('2000-01-03')
+
+    with pytest.raises(ValueError):
+        write_region(store, ds.assign_coords(time=pd.date_range('2000-01-03', periods=48, freq='30min')))
+
+
+def test_packed_store_keeps_missing_values(tmp_path):
+
+    store = str(tmp_path / 'cf.zarr')
+    create_store(store, hourly_times(2000, 2000), latitude, longitude, variables, profile='packed')
+    check_store(store, variables)
+    ds = capacity_factors('2000-01-03')
+    write_region(store, ds)
+
+    # Packed within the round trip error, chunks that were never written are missing
+    stored = xr.open_zarr(store, consolidated=True)
+    for name in variables:
+        np.testing.assert_allclose(stored[name].sel(time=ds.time).values, ds[name].values, atol=max_roundtrip_error('packed') + 1e-6)
+    assert np.isnan(stored.solarCF.isel(time=slice(0, 48)).values).all()
+
+
+def test_regions_of_another_store_are_not_written(tmp_path):
+
+    store = str(tmp_path / 'cf.zarr')
+    create_store(store, hourly_times(2000, 2000), latitude, longitude, variables, profile='float')
+    region = write_region(store, capacity_factors('2000-01-03'))
+
+    # A store made again at the same place
+    shutil.rmtree(store)
+    create_store(store, hourly_times(2000, 2000), latitude, longitude, variables, profile='float')
+
+    assert not is_written(store, region)
+    assert not is_written(store, None)
+    assert not is_written(str(tmp_path / 'other.zarr'), region)
+
+
+def test_netcdf_archive_to_store(tmp_path):
+
+    months = {}
+    for month in ['01', '02']:
+        ds = capacity_factors('2000-'+month+'-01', seed=int(month))
+        ds.attrs.update(author='test')
+        ds.to_netcdf(str(tmp_path / ('ERA5_CF_2000'+month+'.nc')))
+        months[month] = ds
+
+    store = str(tmp_path / 'cf.zarr')
+    report = netcdf_to_store(str(tmp_path / 'ERA5_CF_{year}{month}.nc'), store)
+
+    assert [job['status'] for job in report] == ['done', 'done']
+    stored = xr.open_zarr(store, consolidated=True)
+    assert stored.attrs['author'] == 'test'
+    for ds in months.values():
+        xr.testing.assert_equal(stored.sel(time=ds.time).load()[list(variables)], ds[list(variables)])
+    assert os.path.isdir(store)
+
+
+def test_store_grows_at_its_end_only(tmp_path):
+
+    store = str(tmp_path / 'cf.zarr')
+    create_store(store, hourly_times(2000, 2000), latitude, longitude, variables, profile='float')
+    region = write_region(store, capacity_factors('2000-12-30'))
+
+    create_store(store, hourly_times(2000, 2001), latitude, longitude, variables, profile='float')
+    assert xr.open_zarr(store, consolidated=True).sizes['time'] == (366 + 365) * 24
+    assert is_written(store, region)
+    write_region(store, capacity_factors('2001-01-01'))
+
+    with pytest.raises(ValueError):
+        create_store(store, hourly_times(1999, 2001), latitude, longitude, variables, profile='float')